@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, status
+
+from app.engine.correlation import event_correlator
+from app.types.schemas import IngestEventRequest, IngestEventResponse
+
+router = APIRouter()
+
+
+@router.post("/", response_model=IngestEventResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_event_endpoint(payload: IngestEventRequest) -> IngestEventResponse:
+    matched, resumed = await event_correlator.deliver(
+        payload.event_name, payload.correlation_key, payload.payload
+    )
+    return IngestEventResponse(
+        event_name=payload.event_name,
+        correlation_key=payload.correlation_key,
+        matched=matched,
+        resumed=resumed,
+    )
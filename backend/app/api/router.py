@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.api.catalog import router as catalog_router
+from app.api.events import router as events_router
 from app.api.runs import router as runs_router
 from app.api.triggers import router as triggers_router
 from app.api.workflows import router as workflows_router
@@ -11,4 +12,5 @@ router.include_router(workflows_router, prefix="/workflows", tags=["workflows"])
 router.include_router(triggers_router, tags=["triggers"])
 router.include_router(runs_router, prefix="/runs", tags=["runs"])
 router.include_router(catalog_router, prefix="/catalog", tags=["catalog"])
+router.include_router(events_router, prefix="/events", tags=["events"])
 router.include_router(ws_router, tags=["websocket"])
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter, BackgroundTasks, Header, HTTPException, Request, status
 
-from app.types.schemas import RunResponse, TriggerRunRequest
-from app.validation import validate_workflow
+from app.types.schemas import RunResponse, TriggerRunRequest, ValidationResult
+from app.validation import validation_cache
 
 router = APIRouter()
 
 
+def _validate_for_trigger(workflow: Any) -> ValidationResult:
+    definition = {"nodes": workflow.definition.nodes, "edges": workflow.definition.edges}
+    if workflow.status == "published":
+        return validation_cache.validate_published(
+            str(workflow.id), workflow.version, definition
+        )
+    return validation_cache.validate(definition)
+
+
 async def _launch_engine(run_id: str) -> None:
     from app.engine.executor import WorkflowEngine
 
@@ -31,9 +42,7 @@ async def start_run_endpoint(
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Only published workflows can be run"
         )
-    validation = validate_workflow(
-        {"nodes": workflow.definition.nodes, "edges": workflow.definition.edges}
-    )
+    validation = _validate_for_trigger(workflow)
     if not validation.valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=validation.errors)
 
@@ -70,9 +79,7 @@ async def webhook_trigger(
     workflow = await wf_core.get_workflow(str(workflow_id))
     if workflow is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found")
-    validation = validate_workflow(
-        {"nodes": workflow.definition.nodes, "edges": workflow.definition.edges}
-    )
+    validation = _validate_for_trigger(workflow)
     if not validation.valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=validation.errors)
 
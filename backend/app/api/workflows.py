@@ -5,8 +5,14 @@ from dataclasses import asdict, is_dataclass
 from fastapi import APIRouter, Header, HTTPException, status
 
 from app.db.custom import wf_core
-from app.types.schemas import ValidationResult, WorkflowCreate, WorkflowResponse, WorkflowUpdate
-from app.validation import validate_workflow
+from app.types.schemas import (
+    IncrementalValidationResult,
+    WorkflowCreate,
+    WorkflowPatch,
+    WorkflowResponse,
+    WorkflowUpdate,
+)
+from app.validation import definition_hash, incremental_validation_store, validation_cache
 
 router = APIRouter()
 
@@ -52,7 +58,10 @@ async def update_workflow_endpoint(workflow_id: str, payload: WorkflowUpdate) ->
             status_code=status.HTTP_409_CONFLICT,
             detail="Published workflows are immutable. Duplicate to create a new draft.",
         )
-    return await wf_core.update_workflow(str(workflow_id), **payload.model_dump(exclude_none=True))
+    updated = await wf_core.update_workflow(str(workflow_id), **payload.model_dump(exclude_none=True))
+    # The editor's delta state describes the old definition; the next patch reseeds it.
+    incremental_validation_store.discard(str(workflow_id))
+    return updated
 
 
 @router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -65,6 +74,7 @@ async def delete_workflow_endpoint(workflow_id: str) -> None:
             status_code=status.HTTP_409_CONFLICT, detail="Cannot delete published workflows"
         )
     await wf_core.delete_workflow(str(workflow_id))
+    incremental_validation_store.discard(str(workflow_id))
 
 
 @router.post("/{workflow_id}/publish", response_model=WorkflowResponse)
@@ -74,14 +84,16 @@ async def publish_workflow_endpoint(workflow_id: str) -> WorkflowResponse:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found")
 
     definition_dict = _definition_to_dict(existing.definition)
-    validation = validate_workflow(definition_dict)
+    digest = definition_hash(definition_dict)
+    validation = validation_cache.validate(definition_dict, digest)
     if not validation.valid:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail={"message": "Workflow validation failed", "errors": validation.errors},
         )
 
-    await wf_core.update_workflow(str(workflow_id), status="published")
+    await wf_core.publish_workflow(str(workflow_id))
+    validation_cache.mark_published(str(workflow_id), existing.version, digest)
     result = await wf_core.get_workflow_response(str(workflow_id))
     if not result:
         raise HTTPException(
@@ -90,13 +102,39 @@ async def publish_workflow_endpoint(workflow_id: str) -> WorkflowResponse:
     return result
 
 
-@router.post("/{workflow_id}/validate", response_model=ValidationResult)
-async def validate_workflow_endpoint(workflow_id: str) -> ValidationResult:
+@router.post("/{workflow_id}/validate", response_model=IncrementalValidationResult)
+async def validate_workflow_endpoint(workflow_id: str) -> IncrementalValidationResult:
     existing = await wf_core.get_workflow(str(workflow_id))
     if not existing:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found")
     definition_dict = _definition_to_dict(existing.definition)
-    return validate_workflow(definition_dict)
+    # Seeds the editor's incremental state so later patches are validated as deltas.
+    state = incremental_validation_store.seed(str(workflow_id), definition_dict)
+    return state.result()
+
+
+@router.post("/{workflow_id}/validate/patch", response_model=IncrementalValidationResult)
+async def validate_workflow_patch_endpoint(
+    workflow_id: str, patch: WorkflowPatch
+) -> IncrementalValidationResult:
+    state = incremental_validation_store.get(str(workflow_id))
+    if state is None:
+        existing = await wf_core.get_workflow(str(workflow_id))
+        if not existing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workflow not found")
+        state = incremental_validation_store.seed(
+            str(workflow_id), _definition_to_dict(existing.definition)
+        )
+    if patch.base_hash is not None and patch.base_hash != state.state_hash:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Patch base does not match the validated state. Re-validate in full.",
+                "state_hash": state.state_hash,
+            },
+        )
+    rechecked = state.apply(patch)
+    return state.result(rechecked)
 
 
 @router.post(
@@ -6,6 +6,7 @@ import structlog
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app.events.bus import event_bus
+from app.serialization import dumps_str
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
@@ -49,11 +50,11 @@ async def run_websocket(websocket: WebSocket, run_id: str) -> None:
     try:
         # Subscribe before snapshot to avoid dropping events during connect.
         snapshot = await _build_snapshot(run_id_str)
-        await websocket.send_json(snapshot)
+        await websocket.send_text(dumps_str(snapshot))
 
         while True:
             event = await queue.get()
-            await websocket.send_json(event)
+            await websocket.send_text(dumps_str(event))
     except WebSocketDisconnect:
         pass
     except Exception:
@@ -0,0 +1,33 @@
+from app.artifacts.offload import (
+    amaterialize,
+    aoffload_large_fields,
+    has_lazy_refs,
+    materialize,
+    offload_large_fields,
+)
+from app.artifacts.store import (
+    ArtifactStore,
+    LocalArtifactStore,
+    MemoryObjectClient,
+    ObjectArtifactStore,
+    artifact_store,
+    build_artifact_store,
+    is_artifact_ref,
+    is_lazy_ref,
+)
+
+__all__ = [
+    "ArtifactStore",
+    "LocalArtifactStore",
+    "MemoryObjectClient",
+    "ObjectArtifactStore",
+    "amaterialize",
+    "aoffload_large_fields",
+    "artifact_store",
+    "build_artifact_store",
+    "has_lazy_refs",
+    "is_artifact_ref",
+    "is_lazy_ref",
+    "materialize",
+    "offload_large_fields",
+]
@@ -0,0 +1,96 @@
+"""Move the largest fields of an oversized step output into the artifact store.
+
+A step output above the inline limit used to be truncated to the handler's
+``CONTEXT_FIELDS`` or rejected.  ``offload_large_fields`` instead replaces its
+biggest top-level values with lazy artifact references, largest first, until
+the rest fits.  Fields the handler lists as context fields are moved last.
+Templates dereference the references on demand (see app.engine.templates);
+code that reads the context directly gets it through ``materialize``.
+
+Both do blocking artifact I/O; the engine calls the ``a``-prefixed variants,
+which run it in a thread so other runs keep going.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from app.artifacts.store import ArtifactStore, artifact_store, is_lazy_ref
+from app.serialization import json_size
+
+
+def materialize(value: Any, store: ArtifactStore | None = None) -> Any:
+    """``value`` with every lazy reference in it loaded.
+
+    Containers are copied only on the path to a reference; a value without
+    any is returned as is.
+    """
+    if is_lazy_ref(value):
+        return (store or artifact_store).load_json(value)
+    if isinstance(value, dict):
+        changed = {k: m for k, v in value.items() if (m := materialize(v, store)) is not v}
+        return {**value, **changed} if changed else value
+    if isinstance(value, list):
+        items = [materialize(v, store) for v in value]
+        return items if any(m is not v for m, v in zip(items, value, strict=True)) else value
+    return value
+
+
+def has_lazy_refs(value: Any) -> bool:
+    """Whether ``materialize`` would load anything for ``value``."""
+    if is_lazy_ref(value):
+        return True
+    if isinstance(value, dict):
+        return any(has_lazy_refs(v) for v in value.values())
+    if isinstance(value, list):
+        return any(has_lazy_refs(v) for v in value)
+    return False
+
+
+async def amaterialize(value: Any, store: ArtifactStore | None = None) -> Any:
+    """``materialize`` with the artifact reads in a thread."""
+    if not has_lazy_refs(value):
+        return value
+    return await asyncio.to_thread(materialize, value, store)
+
+
+def offload_large_fields(
+    output: Any,
+    max_bytes: int,
+    keep: set[str] | frozenset[str] = frozenset(),
+    store: ArtifactStore | None = None,
+) -> Any:
+    """``output`` with fields moved to ``store`` until it serializes to ``max_bytes`` or less."""
+    store = store or artifact_store
+    size = json_size(output, max_bytes)
+    if size <= max_bytes:
+        return output
+    if not isinstance(output, dict):
+        return store.put_json(output)
+
+    # Field sizes are only measured up to the cap: anything bigger is moved
+    # regardless, and is serialized once, by put_json.
+    sizes = {key: json_size(value, max_bytes) for key, value in output.items()}
+    size = sum(sizes.values()) + sum(json_size(str(key)) for key in output) + 2 * len(output) + 1
+    # Largest first, but fields the handler wants inline only when nothing else is left.
+    order = sorted(sizes, key=lambda key: (key in keep, -sizes[key]))
+    result = dict(output)
+    for key in order:
+        ref = store.put_json(output[key])
+        result[key] = ref
+        size += json_size(ref) - sizes[key]
+        if size <= max_bytes:
+            break
+    return result
+
+
+async def aoffload_large_fields(
+    output: Any,
+    max_bytes: int,
+    keep: set[str] | frozenset[str] = frozenset(),
+    store: ArtifactStore | None = None,
+) -> Any:
+    """``offload_large_fields`` with the encoding and writes in a thread."""
+    if json_size(output, max_bytes) <= max_bytes:
+        return output
+    return await asyncio.to_thread(offload_large_fields, output, max_bytes, keep, store)
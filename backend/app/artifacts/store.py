@@ -0,0 +1,372 @@
+"""Content-addressed artifact store for step payloads too large for the run context.
+
+Steps write large bodies here as they stream them and keep only a small
+reference in their output:
+
+    {"artifact_id": "<sha256>", "uri": "artifact://<sha256>", "size_bytes": 1234,
+     "sha256": "<sha256>", "content_type": "application/json"}
+
+An artifact's id is the SHA-256 of its bytes, so identical payloads (the
+same export fetched by every run, a retried step) are stored once and
+artifacts never change after they are written.  References with
+``"lazy": True`` hold JSON that was moved out of a step output (see
+``offload_large_fields``); templates load them on demand.
+
+Backends:
+
+    - ``LocalArtifactStore`` keeps files under ``settings.dirs.artifacts_dir``
+    - ``ObjectArtifactStore`` keeps objects in a bucket through an
+      ``ObjectClient``: ``S3ObjectClient`` for S3-compatible services, or
+      ``MemoryObjectClient`` as an in-process stand-in
+
+``artifact_store`` is built from ``settings.artifacts``.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Protocol
+
+from app.config import ArtifactSettings, settings
+from app.serialization import dumps, loads
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+URI_SCHEME = "artifact://"
+JSON_CONTENT_TYPE = "application/json"
+# Bytes ``ArtifactWriter.awrite`` collects before writing them out in a thread.
+ASYNC_FLUSH_BYTES = 256 * 1024
+
+
+def is_artifact_ref(value: Any) -> bool:
+    return isinstance(value, dict) and str(value.get("uri", "")).startswith(URI_SCHEME)
+
+
+def is_lazy_ref(value: Any) -> bool:
+    return is_artifact_ref(value) and value.get("lazy") is True
+
+
+def _check_id(artifact_id: str) -> str:
+    if not artifact_id.isalnum():
+        raise ValueError(f"Invalid artifact id: {artifact_id!r}")
+    return artifact_id
+
+
+class ArtifactWriter:
+    """Incremental writer; ``commit`` publishes the artifact, ``abort`` discards it.
+
+    Bytes are staged in a local file until the hash, and so the id, is known.
+    Async callers use ``awrite`` / ``acommit`` / ``aabort``, which keep the
+    file I/O and hashing off the event loop.
+    """
+
+    def __init__(self, store: ArtifactStore, content_type: str) -> None:
+        self.content_type = content_type
+        self.size = 0
+        self._store = store
+        self._digest = hashlib.sha256()
+        self._partial = store.staging_dir / f"{uuid.uuid4().hex}.part"
+        # Opened on the first write, so creating a writer does no I/O.
+        self._file: BinaryIO | None = None
+        self._closed = False
+        self._pending = bytearray()
+
+    def write(self, chunk: bytes) -> None:
+        if self._pending:
+            chunk = bytes(self._pending) + chunk
+            self._pending.clear()
+        file = self._open()
+        file.write(chunk)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+
+    async def awrite(self, chunk: bytes) -> None:
+        """``write`` without blocking: small chunks are batched and written in a thread."""
+        assert not self._closed, "writer already closed"
+        self._pending += chunk
+        if len(self._pending) >= ASYNC_FLUSH_BYTES:
+            data = bytes(self._pending)
+            self._pending.clear()
+            await asyncio.to_thread(self.write, data)
+
+    def commit(self) -> dict[str, Any]:
+        self.write(b"")
+        self._close()
+        artifact_id = self._digest.hexdigest()
+        try:
+            self._store._publish(artifact_id, self._partial, self.content_type)
+        finally:
+            self._partial.unlink(missing_ok=True)
+        return {
+            "artifact_id": artifact_id,
+            "uri": f"{URI_SCHEME}{artifact_id}",
+            "size_bytes": self.size,
+            "sha256": artifact_id,
+            "content_type": self.content_type,
+        }
+
+    async def acommit(self) -> dict[str, Any]:
+        return await asyncio.to_thread(self.commit)
+
+    def abort(self) -> None:
+        self._pending.clear()
+        self._close()
+        self._partial.unlink(missing_ok=True)
+
+    async def aabort(self) -> None:
+        await asyncio.to_thread(self.abort)
+
+    def _open(self) -> BinaryIO:
+        assert not self._closed, "writer already closed"
+        if self._file is None:
+            self._file = self._partial.open("wb")
+        return self._file
+
+    def _close(self) -> None:
+        self._closed = True
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ArtifactStore(ABC):
+    # False when artifacts do not survive a restart (ARTIFACTS_BACKEND=memory).
+    durable: bool = True
+
+    def __init__(self, json_cache_size: int = 64) -> None:
+        self._json_cache: OrderedDict[str, bytes] = OrderedDict()
+        self._json_cache_size = json_cache_size
+        # load_json also runs in worker threads (see amaterialize).
+        self._json_cache_lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def staging_dir(self) -> Path:
+        """Local directory writers stage bytes in before publishing."""
+
+    @abstractmethod
+    def _publish(self, artifact_id: str, staged: Path, content_type: str) -> None:
+        """Store the staged file under ``artifact_id`` unless it is already there."""
+
+    @abstractmethod
+    def read_bytes(self, artifact_id: str) -> bytes: ...
+
+    @abstractmethod
+    def exists(self, artifact_id: str) -> bool: ...
+
+    @abstractmethod
+    def delete(self, artifact_id: str) -> None:
+        """Remove an artifact; identical payloads share one, so other runs may still use it."""
+
+    def open_writer(self, content_type: str = "application/octet-stream") -> ArtifactWriter:
+        return ArtifactWriter(self, content_type)
+
+    def put_bytes(self, data: bytes, content_type: str = "application/octet-stream") -> dict[str, Any]:
+        writer = self.open_writer(content_type)
+        try:
+            writer.write(data)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def iter_lines(self, artifact_id: str) -> Iterator[bytes]:
+        """Yield the non-blank lines of a line-delimited artifact (e.g. NDJSON)."""
+        for line in self.read_bytes(artifact_id).splitlines(keepends=True):
+            if line.strip():
+                yield line
+
+    def put_json(self, value: Any) -> dict[str, Any]:
+        """Store ``value`` as JSON and return a lazy reference to it."""
+        return {**self.put_bytes(dumps(value), JSON_CONTENT_TYPE), "lazy": True}
+
+    def load_json(self, ref: dict[str, Any]) -> Any:
+        """The value behind a lazy reference; recently used artifacts are cached.
+
+        The bytes are cached, not the decoded value, so every caller gets its
+        own copy to mutate.
+        """
+        artifact_id = ref["artifact_id"]
+        with self._json_cache_lock:
+            data = self._json_cache.get(artifact_id)
+            if data is not None:
+                self._json_cache.move_to_end(artifact_id)
+        if data is not None:
+            return loads(data)
+        data = self.read_bytes(artifact_id)
+        self._remember(artifact_id, data)
+        return loads(data)
+
+    def _remember(self, artifact_id: str, data: bytes) -> None:
+        # Artifacts are immutable, so cached bytes never go stale.
+        if self._json_cache_size <= 0:
+            return
+        with self._json_cache_lock:
+            self._json_cache[artifact_id] = data
+            self._json_cache.move_to_end(artifact_id)
+            while len(self._json_cache) > self._json_cache_size:
+                self._json_cache.popitem(last=False)
+
+
+class LocalArtifactStore(ArtifactStore):
+    def __init__(self, root: Path | None = None, json_cache_size: int = 64) -> None:
+        super().__init__(json_cache_size)
+        self._root = root
+
+    @property
+    def root(self) -> Path:
+        root = self._root or settings.dirs.artifacts_dir
+        root.mkdir(parents=True, exist_ok=True)
+        return root
+
+    @property
+    def staging_dir(self) -> Path:
+        # Same filesystem as the artifacts, so publishing is an atomic rename.
+        return self.root
+
+    def path(self, artifact_id: str) -> Path:
+        return self.root / _check_id(artifact_id)
+
+    def _publish(self, artifact_id: str, staged: Path, content_type: str) -> None:
+        final = self.path(artifact_id)
+        if final.is_file():
+            return
+        staged.replace(final)
+
+    def read_bytes(self, artifact_id: str) -> bytes:
+        return self.path(artifact_id).read_bytes()
+
+    def iter_lines(self, artifact_id: str) -> Iterator[bytes]:
+        with self.path(artifact_id).open("rb") as fh:
+            for line in fh:
+                if line.strip():
+                    yield line
+
+    def exists(self, artifact_id: str) -> bool:
+        return self.path(artifact_id).is_file()
+
+    def delete(self, artifact_id: str) -> None:
+        self.path(artifact_id).unlink(missing_ok=True)
+
+
+class ObjectClient(Protocol):
+    def put(self, key: str, source: Path, content_type: str) -> None: ...
+    def get(self, key: str) -> bytes: ...
+    def exists(self, key: str) -> bool: ...
+    def delete(self, key: str) -> None: ...
+
+
+class MemoryObjectClient:
+    """In-process stand-in for an S3 bucket."""
+
+    durable = False
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.puts = 0
+
+    def put(self, key: str, source: Path, content_type: str) -> None:
+        self.objects[key] = source.read_bytes()
+        self.puts += 1
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise FileNotFoundError(key) from None
+
+    def exists(self, key: str) -> bool:
+        return key in self.objects
+
+    def delete(self, key: str) -> None:
+        self.objects.pop(key, None)
+
+
+class S3ObjectClient:
+    """``ObjectClient`` over boto3, for AWS S3 or any S3-compatible endpoint."""
+
+    def __init__(self, bucket: str, endpoint_url: str = "", region: str = "") -> None:
+        try:
+            import boto3
+        except ImportError as exc:
+            raise RuntimeError("ARTIFACTS_BACKEND=s3 requires the boto3 package") from exc
+        self._bucket = bucket
+        self._client = boto3.client(
+            "s3", endpoint_url=endpoint_url or None, region_name=region or None
+        )
+
+    def put(self, key: str, source: Path, content_type: str) -> None:
+        # upload_file switches to multipart uploads for large files.
+        self._client.upload_file(
+            str(source), self._bucket, key, ExtraArgs={"ContentType": content_type}
+        )
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._client.get_object(Bucket=self._bucket, Key=key)["Body"].read()
+        except self._client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key) from None
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=key)
+        except self._client.exceptions.ClientError:
+            return False
+        return True
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self._bucket, Key=key)
+
+
+class ObjectArtifactStore(ArtifactStore):
+    def __init__(self, client: ObjectClient, prefix: str = "", json_cache_size: int = 64) -> None:
+        super().__init__(json_cache_size)
+        self._client = client
+        self._prefix = prefix
+        self.durable = getattr(client, "durable", True)
+
+    @property
+    def staging_dir(self) -> Path:
+        return Path(tempfile.gettempdir())
+
+    def key(self, artifact_id: str) -> str:
+        return f"{self._prefix}{_check_id(artifact_id)}"
+
+    def _publish(self, artifact_id: str, staged: Path, content_type: str) -> None:
+        key = self.key(artifact_id)
+        if self._client.exists(key):
+            return
+        self._client.put(key, staged, content_type)
+
+    def read_bytes(self, artifact_id: str) -> bytes:
+        return self._client.get(self.key(artifact_id))
+
+    def exists(self, artifact_id: str) -> bool:
+        return self._client.exists(self.key(artifact_id))
+
+    def delete(self, artifact_id: str) -> None:
+        self._client.delete(self.key(artifact_id))
+
+
+def build_artifact_store(config: ArtifactSettings | None = None) -> ArtifactStore:
+    cfg = config or settings.artifacts
+    if cfg.backend == "local":
+        return LocalArtifactStore(json_cache_size=cfg.json_cache_size)
+    if cfg.backend == "memory":
+        return ObjectArtifactStore(MemoryObjectClient(), json_cache_size=cfg.json_cache_size)
+    if cfg.backend == "s3":
+        if not cfg.s3_bucket:
+            raise ValueError("ARTIFACTS_S3_BUCKET must be set for the s3 artifact backend")
+        client = S3ObjectClient(cfg.s3_bucket, cfg.s3_endpoint_url, cfg.s3_region)
+        return ObjectArtifactStore(client, cfg.s3_prefix, cfg.json_cache_size)
+    raise ValueError(f"Unknown ARTIFACTS_BACKEND: {cfg.backend!r}")
+
+
+artifact_store = build_artifact_store()
@@ -9,13 +9,14 @@ Sub-groups keep related values together and readable:
 
     settings.primary_db.host
     settings.llm.openai_api_key.get_secret_value()
+    settings.http_client.max_connections_per_host
     settings.dirs.logs_dir
 """
 from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import ClassVar
+from typing import Any, ClassVar
 
 from pydantic import Field, SecretStr, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -72,6 +73,189 @@ class RedisSettings(BaseSettings):
     url: str = "redis://localhost:6379"
 
 
+class HttpClientSettings(BaseSettings):
+    """Shared outbound HTTP client pool used by integration steps."""
+
+    model_config = SettingsConfigDict(env_prefix="HTTP_CLIENT_", extra="ignore")
+
+    max_connections: int = 200
+    max_connections_per_host: int = 20
+    min_connections_per_host: int = 1
+    max_keepalive_connections: int = 50
+    keepalive_expiry_seconds: float = 30.0
+    connect_timeout_seconds: float = 10.0
+    http2: bool = False
+    # Default per-host token bucket; 0 disables rate limiting.
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 10
+    # Host limiters kept; the least recently used idle ones are dropped beyond this.
+    rate_limit_max_hosts: int = 10_000
+    # Per-host circuit breaker: opens when at least breaker_min_calls calls in
+    # the window fail at breaker_failure_rate or more.
+    breaker_enabled: bool = True
+    breaker_window_seconds: float = 30.0
+    breaker_min_calls: int = 10
+    breaker_failure_rate: float = 0.5
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_calls: int = 1
+    # Breakers kept; the least recently used idle (closed, no recent failure) ones are dropped beyond this.
+    breaker_max_hosts: int = 10_000
+    # Hedged requests (opt-in per step): at most hedge_budget_ratio duplicates
+    # per hedge-eligible request; the hedge delay defaults to the host's
+    # observed hedge_percentile latency, or hedge_default_delay_ms until
+    # enough samples exist.
+    hedge_budget_ratio: float = 0.1
+    hedge_percentile: float = 95.0
+    hedge_default_delay_ms: float = 100.0
+    # Response bodies are streamed and aborted past this size.
+    max_response_bytes: int = 10 * 1024 * 1024
+    # With spill enabled, bodies above this size go to the artifact store.
+    inline_response_bytes: int = 64 * 1024
+    # Opt-in response cache (per step via ``cache``).
+    cache_max_entries: int = 512
+    cache_max_bytes: int = 32 * 1024 * 1024
+    cache_max_entry_bytes: int = 1024 * 1024
+
+
+class WorkflowDbSettings(BaseSettings):
+    """Dedicated asyncpg pool for ``database_query`` steps (see app.engine.query_pool)."""
+
+    model_config = SettingsConfigDict(env_prefix="WORKFLOW_DB_", extra="ignore")
+
+    # Database workflow queries run against; empty uses the primary database.
+    dsn: SecretStr = SecretStr("")
+    min_size: int = 1
+    max_size: int = 10
+    # asyncpg's per-connection prepared statement LRU.
+    statement_cache_size: int = 256
+    max_cached_statement_lifetime_seconds: float = 300.0
+    max_inactive_connection_lifetime_seconds: float = 300.0
+    command_timeout_seconds: float = 60.0
+    # Rows a query may return inline unless the step sets max_rows; larger
+    # results are truncated (or streamed to an artifact with ``stream``).
+    default_max_rows: int = 10_000
+    # Rows fetched per round trip when reading through a cursor.
+    fetch_size: int = 500
+
+
+class SandboxSettings(BaseSettings):
+    """Worker processes that run ``inline_code`` snippets (see app.sandbox)."""
+
+    model_config = SettingsConfigDict(env_prefix="SANDBOX_", extra="ignore")
+
+    # Warm worker processes; 0 uses one per CPU core.
+    workers: int = 0
+    # A worker is replaced after this many snippets.
+    max_executions_per_worker: int = 100
+    # Compiled snippets cached per worker, keyed by source hash; 0 disables.
+    code_cache_size: int = 256
+    # Per-snippet limits enforced inside the worker (0 disables).  The CPU
+    # limit matches inline_code's default 30s timeout, so a snippet that ran
+    # before the sandbox existed is not cut short by it.
+    cpu_seconds: float = 30.0
+    memory_mb: int = 256
+    start_timeout_seconds: float = 10.0
+
+
+class SmtpSettings(BaseSettings):
+    """Outbound SMTP relay used by ``send_email`` (see app.mail)."""
+
+    model_config = SettingsConfigDict(env_prefix="SMTP_", extra="ignore")
+
+    host: str = ""
+    port: int = 587
+    username: str = ""
+    password: SecretStr = SecretStr("")
+    # Implicit TLS (port 465); otherwise STARTTLS is used when offered.
+    use_tls: bool = False
+    start_tls: bool = True
+    from_address: str = ""
+    timeout_seconds: float = 30.0
+    # Persistent connections per provider, recycled after this many messages
+    # or this long idle.
+    pool_size: int = 4
+    max_messages_per_connection: int = 100
+    idle_timeout_seconds: float = 60.0
+    # Provider throughput cap in messages per second; 0 disables it.
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 10
+    # Named extra providers as JSON, each overriding any field above, e.g.
+    # SMTP_PROVIDERS='{"bulk": {"host": "smtp.bulk.example", "rate_limit_per_second": 50}}'
+    providers: dict[str, dict[str, Any]] = {}
+
+
+class EngineSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="ENGINE_", extra="ignore")
+
+    # Step types whose identical concurrent calls share one execution
+    # (see app.engine.singleflight).  Empty disables coalescing.
+    singleflight_step_types: list[str] = []
+
+
+class TimerSettings(BaseSettings):
+    """Durable timers for delay steps (see app.engine.timers)."""
+
+    model_config = SettingsConfigDict(env_prefix="TIMERS_", extra="ignore")
+
+    # Delays up to this long sleep in the engine; longer ones suspend the run.
+    inline_delay_seconds: float = 1.0
+    tick_seconds: float = 1.0
+    wheel_slots: int = 64
+    wheel_levels: int = 3
+    # Paused runs due within lookahead_seconds are loaded into the wheel
+    # every poll_interval_seconds; later ones stay in the database only.
+    poll_interval_seconds: float = 30.0
+    lookahead_seconds: float = 300.0
+
+
+class EventCorrelationSettings(BaseSettings):
+    """Delivering external events to wait_for_event steps (see app.engine.correlation)."""
+
+    model_config = SettingsConfigDict(env_prefix="EVENT_CORRELATION_", extra="ignore")
+
+    # Keep the open waits in memory so events nobody waits for never reach the
+    # database.  Only exact while a single process runs the engine (waits
+    # registered by another process are invisible), so it is opt-in.
+    hot_index: bool = False
+    # Resumed runs executing at once; the rest queue behind them.
+    resume_concurrency: int = 32
+    # Run ids per bulk UPDATE when claiming resumed runs.
+    run_batch_size: int = 1_000
+
+
+class ArtifactSettings(BaseSettings):
+    """Content-addressed store for large step payloads (see app.artifacts)."""
+
+    model_config = SettingsConfigDict(env_prefix="ARTIFACTS_", extra="ignore")
+
+    # "local" (settings.dirs.artifacts_dir), "s3" (any S3-compatible
+    # endpoint; needs boto3) or "memory" (in-process stand-in for tests/dev).
+    backend: str = "local"
+    s3_bucket: str = ""
+    s3_prefix: str = "artifacts/"
+    s3_endpoint_url: str = ""
+    s3_region: str = ""
+    # Deserialized JSON artifacts kept in memory for template dereferencing.
+    json_cache_size: int = 64
+
+
+class JsonbCompressionSettings(BaseSettings):
+    """zstd compression of large run contexts and step outputs (see app.db.compression)."""
+
+    model_config = SettingsConfigDict(env_prefix="JSONB_COMPRESSION_", extra="ignore")
+
+    # Opt-in; needs the standard library's compression.zstd (Python 3.14+).
+    enabled: bool = False
+    # Values whose JSON encoding is smaller than this are stored as-is.
+    threshold_bytes: int = 16_384
+    level: int = 3
+    # A dictionary is trained per workflow from its first samples.
+    dictionary_size: int = 65_536
+    training_samples: int = 64
+    # Only the head of each sample is used for training.
+    max_sample_bytes: int = 16_384
+
+
 class LLMSettings(BaseSettings):
     """API keys for all supported LLM providers.
 
@@ -142,9 +326,16 @@ class DirectorySettings:
         self.reports_dir: Path = base_dir / "reports"
         self.logs_dir: Path = base_dir / "logs"
         self.sample_data_dir: Path = base_dir / "sample_data"
+        self.artifacts_dir: Path = base_dir / "artifacts"
 
     def create_all(self) -> None:
-        for d in (self.temp_dir, self.reports_dir, self.logs_dir, self.sample_data_dir):
+        for d in (
+            self.temp_dir,
+            self.reports_dir,
+            self.logs_dir,
+            self.sample_data_dir,
+            self.artifacts_dir,
+        ):
             d.mkdir(parents=True, exist_ok=True)
 
     def __repr__(self) -> str:
@@ -154,7 +345,8 @@ class DirectorySettings:
             f"temp={self.temp_dir}, "
             f"reports={self.reports_dir}, "
             f"logs={self.logs_dir}, "
-            f"sample_data={self.sample_data_dir})"
+            f"sample_data={self.sample_data_dir}, "
+            f"artifacts={self.artifacts_dir})"
         )
 
 
@@ -232,6 +424,33 @@ class Settings(BaseSettings):
     redis: RedisSettings = Field(
         default_factory=lambda: RedisSettings(_env_file=".env")  # type: ignore[call-arg]
     )
+    engine: EngineSettings = Field(
+        default_factory=lambda: EngineSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    timers: TimerSettings = Field(
+        default_factory=lambda: TimerSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    event_correlation: EventCorrelationSettings = Field(
+        default_factory=lambda: EventCorrelationSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    workflow_db: WorkflowDbSettings = Field(
+        default_factory=lambda: WorkflowDbSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    sandbox: SandboxSettings = Field(
+        default_factory=lambda: SandboxSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    jsonb_compression: JsonbCompressionSettings = Field(
+        default_factory=lambda: JsonbCompressionSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    artifacts: ArtifactSettings = Field(
+        default_factory=lambda: ArtifactSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    smtp: SmtpSettings = Field(
+        default_factory=lambda: SmtpSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
+    http_client: HttpClientSettings = Field(
+        default_factory=lambda: HttpClientSettings(_env_file=".env")  # type: ignore[call-arg]
+    )
     llm: LLMSettings = Field(
         default_factory=lambda: LLMSettings(_env_file=".env")  # type: ignore[call-arg]
     )
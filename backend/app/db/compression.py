@@ -0,0 +1,208 @@
+"""Transparent zstd compression of large JSONB values at the ``WfCore`` boundary.
+
+``wf_runs.context`` and ``wf_step_runs.output`` regularly reach hundreds of
+KB of repetitive JSON, which Postgres TOAST (pglz) compresses slowly and
+poorly.  With ``JSONB_COMPRESSION_ENABLED`` set, ``JsonbCompressor`` stores
+values above ``threshold_bytes`` as a small JSONB envelope instead:
+
+    {"_zstd": 1, "dict": "<artifact id>" | null, "size": 183204, "data": "<base64>"}
+
+Each workflow gets its own zstd dictionary, trained from its first
+``training_samples`` values and kept in the artifact store (its id is its
+content hash), so envelopes stay decodable after a restart.  Until it is
+trained, values are compressed without one; with a store that does not
+survive restarts (``ARTIFACTS_BACKEND=memory``) no dictionary is ever trained.
+
+Reads decode envelopes when building API responses; ``WfStepRun`` items
+get a ``LazyJSON`` output that only decompresses when accessed, so the
+engine's step-status polling never pays for it.  Readers call
+``load_dictionaries`` first, which reads the dictionaries the values need in
+a thread, so decoding does no I/O.  ``stats`` reports bytes in and out and
+the compression ratio.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+import structlog
+
+from app.artifacts import ArtifactStore, artifact_store
+from app.config import JsonbCompressionSettings, settings
+from app.serialization import dumps, loads
+
+try:
+    from compression import zstd
+except ImportError:  # Python < 3.14
+    zstd = None  # type: ignore[assignment]
+
+logger = structlog.get_logger(__name__)
+
+ENVELOPE_KEY = "_zstd"
+DICTIONARY_CONTENT_TYPE = "application/zstd-dictionary"
+# Values compressed before a workflow's dictionary is trained, or with no
+# workflow known, are grouped here for sampling.
+DEFAULT_SCOPE = "_default"
+
+
+def is_compressed(value: Any) -> bool:
+    return isinstance(value, dict) and value.get(ENVELOPE_KEY) == 1
+
+
+class LazyJSON(Mapping[str, Any]):
+    """A compressed JSONB value that is decompressed on first access."""
+
+    __slots__ = ("_codec", "_envelope", "_value")
+
+    def __init__(self, envelope: dict[str, Any], codec: JsonbCompressor) -> None:
+        self._envelope: dict[str, Any] | None = envelope
+        self._codec = codec
+        self._value: dict[str, Any] | None = None
+
+    def _load(self) -> dict[str, Any]:
+        if self._value is None:
+            self._value = self._codec.decode(self._envelope)
+            self._envelope = None
+        return self._value
+
+    def __getitem__(self, key: str) -> Any:
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __repr__(self) -> str:
+        if self._value is None:
+            return f"LazyJSON(<{self._envelope['size']} bytes compressed>)"  # type: ignore[index]
+        return f"LazyJSON({self._value!r})"
+
+
+class JsonbCompressor:
+    def __init__(
+        self,
+        config: JsonbCompressionSettings | None = None,
+        dictionaries: ArtifactStore | None = None,
+    ) -> None:
+        self._config = config or settings.jsonb_compression
+        self._dictionaries = dictionaries or artifact_store
+        self._samples: dict[str, list[bytes]] = {}
+        self._training: set[str] = set()
+        # scope -> artifact id of its trained dictionary
+        self._scope_dicts: dict[str, str] = {}
+        # artifact id -> loaded dictionary, for compressing and decoding
+        self._loaded: dict[str, Any] = {}
+        self.compressed = 0
+        self.skipped = 0
+        self.decompressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if self._config.enabled and zstd is None:
+            logger.warning("JSONB compression needs compression.zstd (Python 3.14+); disabled")
+        # A dictionary lost on restart would leave every value compressed with
+        # it undecodable, so none are trained on a non-durable store.
+        self._train = self._dictionaries.durable
+        if self._config.enabled and not self._train:
+            logger.warning("JSONB compression: artifact store is not durable; no dictionaries")
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.enabled and zstd is not None
+
+    async def encode(self, value: Any, scope: str | None = None) -> Any:
+        """``value`` as stored: an envelope if it is large enough, else unchanged."""
+        if not self.enabled or not isinstance(value, dict) or is_compressed(value):
+            return value
+        data = dumps(value)
+        if len(data) < self._config.threshold_bytes:
+            self.skipped += 1
+            return value
+
+        scope = scope or DEFAULT_SCOPE
+        dict_id = self._scope_dicts.get(scope)
+        if dict_id is None and self._train:
+            await self._sample(scope, data)
+            dict_id = self._scope_dicts.get(scope)
+        zstd_dict = self._loaded[dict_id].as_digested_dict if dict_id else None
+        compressed = zstd.compress(data, level=self._config.level, zstd_dict=zstd_dict)
+
+        self.compressed += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(compressed)
+        return {
+            ENVELOPE_KEY: 1,
+            "dict": dict_id,
+            "size": len(data),
+            "data": base64.b64encode(compressed).decode("ascii"),
+        }
+
+    def decode(self, value: Any) -> Any:
+        if not is_compressed(value):
+            return value
+        if zstd is None:
+            raise RuntimeError("Decoding compressed JSONB needs compression.zstd (Python 3.14+)")
+        dict_id = value.get("dict")
+        zstd_dict = self._dictionary(dict_id) if dict_id else None
+        data = zstd.decompress(base64.b64decode(value["data"]), zstd_dict=zstd_dict)
+        self.decompressed += 1
+        return loads(data)
+
+    def lazy(self, value: Any) -> Any:
+        return LazyJSON(value, self) if is_compressed(value) else value
+
+    async def load_dictionaries(self, values: Iterable[Any]) -> None:
+        """Load the dictionaries ``values`` were compressed with, reading them in a thread."""
+        if zstd is None:
+            return
+        needed = {v["dict"] for v in values if is_compressed(v) and v.get("dict")}
+        for dict_id in needed - self._loaded.keys():
+            data = await asyncio.to_thread(self._dictionaries.read_bytes, dict_id)
+            self._loaded.setdefault(dict_id, zstd.ZstdDict(data))
+
+    def _dictionary(self, dict_id: str) -> Any:
+        # Normally already loaded by load_dictionaries.
+        if dict_id not in self._loaded:
+            self._loaded[dict_id] = zstd.ZstdDict(self._dictionaries.read_bytes(dict_id))
+        return self._loaded[dict_id]
+
+    async def _sample(self, scope: str, data: bytes) -> None:
+        cfg = self._config
+        samples = self._samples.setdefault(scope, [])
+        samples.append(data[: cfg.max_sample_bytes])
+        if len(samples) < cfg.training_samples or scope in self._training:
+            return
+        self._training.add(scope)
+        try:
+            # Training takes tens of milliseconds or more; keep it off the loop.
+            trained = await asyncio.to_thread(zstd.train_dict, samples, cfg.dictionary_size)
+            ref = await asyncio.to_thread(
+                self._dictionaries.put_bytes, trained.dict_content, DICTIONARY_CONTENT_TYPE
+            )
+        except Exception:
+            logger.exception("zstd dictionary training failed", scope=scope)
+            return
+        finally:
+            self._training.discard(scope)
+            self._samples.pop(scope, None)
+        self._loaded[ref["artifact_id"]] = trained
+        self._scope_dicts[scope] = ref["artifact_id"]
+        logger.info("zstd dictionary trained", scope=scope, dictionary=ref["artifact_id"])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "compressed": self.compressed,
+            "skipped": self.skipped,
+            "decompressed": self.decompressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else None,
+            "dictionaries": len(self._scope_dicts),
+        }
+
+
+jsonb_compressor = JsonbCompressor()
@@ -0,0 +1,152 @@
+"""In-process cache for published workflow definitions.
+
+Published workflows are immutable (the PUT endpoint rejects edits), so once a
+workflow reaches ``status == "published"`` its definition can be served from
+memory for every trigger and resume instead of being re-loaded and re-parsed.
+
+Entries are keyed by ``(workflow_id, version)``.  A secondary ``id -> version``
+map lets ``get`` resolve the current version without a DB round-trip.  Drafts
+are never cached.
+
+An optional shared second tier (e.g. Redis) can be injected via the
+``SharedWorkflowCache`` protocol; the local LRU is always consulted first.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Protocol
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class SharedWorkflowCache(Protocol):
+    """Protocol for a shared (cross-process) cache tier.  Inject a mock for tests."""
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+def _cache_key(workflow_id: str, version: int) -> str:
+    return f"wf:{workflow_id}:v{version}"
+
+
+def _version_key(workflow_id: str) -> str:
+    return f"wf:{workflow_id}:version"
+
+
+class WorkflowDefinitionCache:
+    """Bounded LRU of published workflows keyed by ``(id, version)``."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        shared: SharedWorkflowCache | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._shared = shared
+        self._entries: OrderedDict[tuple[str, int], Any] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # -- lookup ----------------------------------------------------------------
+
+    async def get(self, workflow_id: str) -> Any | None:
+        workflow_id = str(workflow_id)
+        version = self._versions.get(workflow_id)
+        if version is not None:
+            key = (workflow_id, version)
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return item
+
+        if self._shared is not None:
+            item = None
+            try:
+                if version is None:
+                    version = await self._shared.get(_version_key(workflow_id))
+                if version is not None:
+                    item = await self._shared.get(_cache_key(workflow_id, int(version)))
+            except Exception:
+                logger.exception("Shared workflow cache read failed", workflow_id=workflow_id)
+            if item is not None:
+                self._store_local(workflow_id, int(version), item)
+                self.hits += 1
+                return item
+
+        self.misses += 1
+        return None
+
+    # -- population ------------------------------------------------------------
+
+    async def put(self, workflow: Any) -> None:
+        """Cache ``workflow`` if it is published.  Drafts are ignored."""
+        if getattr(workflow, "status", None) != "published":
+            return
+        workflow_id = str(workflow.id)
+        version = int(getattr(workflow, "version", 1) or 1)
+        self._store_local(workflow_id, version, workflow)
+        if self._shared is not None:
+            try:
+                await self._shared.set(_cache_key(workflow_id, version), workflow)
+                await self._shared.set(_version_key(workflow_id), version)
+            except Exception:
+                logger.exception("Shared workflow cache write failed", workflow_id=workflow_id)
+
+    def _store_local(self, workflow_id: str, version: int, workflow: Any) -> None:
+        stale = self._versions.get(workflow_id)
+        if stale is not None and stale != version:
+            self._entries.pop((workflow_id, stale), None)
+        self._versions[workflow_id] = version
+        self._entries[(workflow_id, version)] = workflow
+        self._entries.move_to_end((workflow_id, version))
+        while len(self._entries) > self._max_entries:
+            (evicted_id, _), _ = self._entries.popitem(last=False)
+            self._versions.pop(evicted_id, None)
+
+    # -- invalidation ----------------------------------------------------------
+
+    async def invalidate(self, workflow_id: str) -> None:
+        """Drop every cached version of ``workflow_id`` from both tiers."""
+        workflow_id = str(workflow_id)
+        version = self._versions.pop(workflow_id, None)
+        for key in [k for k in self._entries if k[0] == workflow_id]:
+            del self._entries[key]
+        if self._shared is not None:
+            try:
+                if version is None:
+                    version = await self._shared.get(_version_key(workflow_id))
+                await self._shared.delete(_version_key(workflow_id))
+                if version is not None:
+                    await self._shared.delete(_cache_key(workflow_id, int(version)))
+            except Exception:
+                logger.exception("Shared workflow cache delete failed", workflow_id=workflow_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._versions.clear()
+
+    # -- introspection ---------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, workflow_id: object) -> bool:
+        return str(workflow_id) in self._versions
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from datetime import UTC, datetime
 from typing import TYPE_CHECKING, Any
 
+from app.db.compression import JsonbCompressor, jsonb_compressor
+from app.db.custom.cache import WorkflowDefinitionCache
 from app.db.managers import (
     WfRunBase,
     WfRunEventBase,
@@ -91,7 +94,7 @@ wf_run_event_manager_instance = WfRunEventManager()
 
 
 class WfCore:
-    def __init__(self) -> None:
+    def __init__(self, compressor: JsonbCompressor | None = None) -> None:
         self.workflows = wf_workflow_manager_instance
         self.step_runs = wf_step_run_manager_instance
         self.runs = wf_run_manager_instance
@@ -99,16 +102,52 @@ class WfCore:
         # Cache: run_id -> (org_id, user_id) so we don't re-fetch on every
         # step-run or event insert within a single workflow execution.
         self._run_owner_cache: dict[str, tuple[str, str]] = {}
+        # Published workflows are immutable, so their parsed definitions are
+        # served from memory on every trigger / resume.  Drafts bypass it.
+        self.workflow_cache = WorkflowDefinitionCache()
+        # Large context / output JSONB is stored zstd-compressed when enabled,
+        # with a dictionary per workflow; these map rows to their workflow.
+        self.compressor = compressor or jsonb_compressor
+        self._run_workflow_cache: dict[str, str] = {}
+        self._step_run_run_cache: dict[str, str] = {}
 
     async def _get_run_owner(self, run_id: str) -> tuple[str, str]:
         """Return (org_id, user_id) for a run, fetching once and caching."""
         if run_id not in self._run_owner_cache:
             item = await self.runs.load_by_id(run_id)
             self._run_owner_cache[run_id] = (str(item.org_id), str(item.user_id))
+            self._run_workflow_cache[run_id] = str(item.workflow_id)
         return self._run_owner_cache[run_id]
 
+    async def _run_workflow(self, run_id: str | None) -> str | None:
+        if not run_id:
+            return None
+        if run_id not in self._run_workflow_cache:
+            await self._get_run_owner(run_id)
+        return self._run_workflow_cache.get(run_id)
+
+    async def _compress(self, data: dict[str, Any], key: str, run_id: str | None) -> dict[str, Any]:
+        if not self.compressor.enabled or data.get(key) is None:
+            return data
+        scope = await self._run_workflow(run_id)
+        return {**data, key: await self.compressor.encode(data[key], scope)}
+
+    def _run_response(self, item: WfRun, context: dict[str, Any] | None = None) -> RunResponse:
+        """``item`` as a response; pass the plain ``context`` just written to skip decoding it."""
+        data = item.to_dict()
+        if context is None:
+            context = self.compressor.decode(data.get("context"))
+        data["context"] = context
+        return RunResponse(**data)
+
     async def get_workflow(self, workflow_id: str) -> WfWorkflow:
-        return await self.workflows.load_by_id(workflow_id)
+        cached = await self.workflow_cache.get(workflow_id)
+        if cached is not None:
+            return cached
+        item = await self.workflows.load_by_id(workflow_id)
+        if item is not None:
+            await self.workflow_cache.put(item)
+        return item
 
     async def get_workflow_response(self, workflow_id: str) -> WorkflowResponse | None:
         wf = await self.workflows.load_by_id(workflow_id)
@@ -129,16 +168,30 @@ class WfCore:
 
     async def update_workflow(self, workflow_id: str, **updates: Any) -> WorkflowResponse:
         item = await self.workflows.update_item(workflow_id, **updates)
+        await self.workflow_cache.invalidate(workflow_id)
         return WorkflowResponse(**item.to_dict())
 
+    async def publish_workflow(self, workflow_id: str) -> WorkflowResponse:
+        return await self.update_workflow(workflow_id, status="published")
+
     async def delete_workflow(self, workflow_id: str) -> bool:
-        return await self.workflows.delete_item(workflow_id)
+        deleted = await self.workflows.delete_item(workflow_id)
+        await self.workflow_cache.invalidate(workflow_id)
+        return deleted
 
     async def get_step_run(self, step_run_id: str) -> WfStepRun:
-        return await self.step_runs.load_by_id(step_run_id)
+        item = await self.step_runs.load_by_id(step_run_id)
+        if item is not None:
+            await self.compressor.load_dictionaries([item.output])
+            item.output = self.compressor.lazy(item.output)
+        return item
 
     async def get_step_runs(self, filters: dict[str, Any]) -> list[WfStepRun]:
-        return await self.step_runs.filter_items(**filters)
+        items = await self.step_runs.filter_items(**filters)
+        await self.compressor.load_dictionaries(item.output for item in items)
+        for item in items:
+            item.output = self.compressor.lazy(item.output)
+        return items
 
     async def create_step_run(self, data: dict[str, Any]) -> WfStepRun:
         if "org_id" not in data or "user_id" not in data:
@@ -146,29 +199,91 @@ class WfCore:
             if run_id:
                 org_id, user_id = await self._get_run_owner(str(run_id))
                 data = {**data, "org_id": org_id, "user_id": user_id}
-        return await self.step_runs.create_item(**data)
+        run_id = str(data["run_id"]) if data.get("run_id") else None
+        data = await self._compress(data, "output", run_id)
+        item = await self.step_runs.create_item(**data)
+        if run_id:
+            self._step_run_run_cache[str(item.id)] = run_id
+        return item
 
     async def update_step_run(self, step_run_id: str, updates: dict[str, Any]) -> WfStepRun:
+        run_id = self._step_run_run_cache.get(step_run_id)
+        updates = await self._compress(updates, "output", run_id)
         return await self.step_runs.update_item(step_run_id, **updates)
 
+    async def get_event_waits(self) -> list[tuple[str, str, str | None]]:
+        """(step_run_id, event_name, correlation_key) of every open wait_for_event step."""
+        rows = await self.step_runs.model.filter(
+            status="waiting", event_name__isnull=False
+        ).values_list("id", "event_name", "correlation_key")
+        return [(str(step_run_id), name, key) for step_run_id, name, key in rows]
+
+    async def claim_event_waits(
+        self, event_name: str, correlation_key: str | None, output: dict[str, Any]
+    ) -> list[tuple[str, str, str]]:
+        """Complete every step waiting on the event in one indexed UPDATE.
+
+        Returns (step_run_id, run_id, step_id) for the rows this call completed.
+        """
+        result = await (
+            self.step_runs.model.filter(
+                status="waiting", event_name=event_name, correlation_key=correlation_key
+            )
+            .returning("id", "run_id", "step_id")
+            .update(status="completed", output=output, completed_at=datetime.now(UTC))
+        )
+        return [
+            (str(row["id"]), str(row["run_id"]), row["step_id"]) for row in result.updated_rows
+        ]
+
     async def delete_step_run(self, step_run_id: str) -> bool:
+        self._step_run_run_cache.pop(step_run_id, None)
         return await self.step_runs.delete_item(step_run_id)
 
     async def get_run(self, run_id: str) -> RunResponse:
         item = await self.runs.load_by_id(run_id)
-        return RunResponse(**item.to_dict())
+        await self.compressor.load_dictionaries([item.context])
+        return self._run_response(item)
 
     async def get_runs(self, filters: dict[str, Any]) -> list[RunResponse]:
         items = await self.runs.filter_items(**filters)
-        return [RunResponse(**item.to_dict()) for item in items]
+        await self.compressor.load_dictionaries(item.context for item in items)
+        return [self._run_response(item) for item in items]
 
     async def create_run(self, data: dict[str, Any]) -> RunResponse:
+        context = data.get("context")
+        if self.compressor.enabled and data.get("context") is not None:
+            scope = str(data["workflow_id"]) if data.get("workflow_id") else None
+            data = {**data, "context": await self.compressor.encode(data["context"], scope)}
         item = await self.runs.create_item(**data)
-        return RunResponse(**item.to_dict())
+        if item.workflow_id:
+            self._run_workflow_cache[str(item.id)] = str(item.workflow_id)
+        return self._run_response(item, context)
 
     async def update_run(self, run_id: str, updates: dict[str, Any]) -> RunResponse:
+        context = updates.get("context")
+        updates = await self._compress(updates, "context", run_id)
         item = await self.runs.update_item(run_id, **updates)
-        return RunResponse(**item.to_dict())
+        return self._run_response(item, context)
+
+    async def get_due_runs(self, before: datetime) -> list[tuple[str, datetime]]:
+        """(run_id, due_at) of paused runs whose timer fires by ``before``.
+
+        Reads only the two columns, through the index on ``due_at``.
+        """
+        rows = await self.runs.model.filter(status="paused", due_at__lte=before).values_list(
+            "id", "due_at"
+        )
+        return [(str(run_id), due_at) for run_id, due_at in rows]
+
+    async def claim_paused_runs(self, run_ids: list[str]) -> list[str]:
+        """Move the given runs from paused to running; returns the ids this call moved."""
+        result = await (
+            self.runs.model.filter(id__in=run_ids, status="paused")
+            .returning("id")
+            .update(status="running", due_at=None)
+        )
+        return [str(row["id"]) for row in result.updated_rows]
 
     async def delete_run(self, run_id: str) -> bool:
         return await self.runs.delete_item(run_id)
@@ -220,11 +335,18 @@ class WfCore:
         if run_status:
             filters["status"] = run_status
         items = await self.runs.filter_items(**filters)
-        return [RunResponse(**item.to_dict()) for item in items]
+        await self.compressor.load_dictionaries(item.context for item in items)
+        return [self._run_response(item) for item in items]
 
     async def get_step_runs_for_run(self, run_id: str) -> list[StepRunResponse]:
         items = await self.step_runs.filter_items(run_id=str(run_id))
-        return [StepRunResponse(**item.to_dict()) for item in items]
+        await self.compressor.load_dictionaries(item.output for item in items)
+        responses = []
+        for item in items:
+            data = item.to_dict()
+            data["output"] = self.compressor.decode(data.get("output"))
+            responses.append(StepRunResponse(**data))
+        return responses
 
     async def list_workflows_for_user(self, user_id: str) -> list[WorkflowResponse]:
         items = await self.workflows.filter_items(user_id=str(user_id))
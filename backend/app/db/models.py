@@ -197,6 +197,7 @@ class WfRun(Model):
     idempotency_key = TextField()
     started_at = DateTimeField()
     completed_at = DateTimeField()
+    due_at = DateTimeField(index=True)
     created_at = DateTimeField(null=False)
     updated_at = DateTimeField(null=False)
     deleted_at = DateTimeField()
@@ -242,6 +243,8 @@ class WfStepRun(Model):
     output = JSONBField(null=False, default={})
     error = TextField()
     attempt = IntegerField(null=False, default=1)
+    event_name = TextField(index=True)
+    correlation_key = TextField(index=True)
     started_at = DateTimeField()
     completed_at = DateTimeField()
     created_at = DateTimeField(null=False)
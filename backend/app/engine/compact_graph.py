@@ -0,0 +1,399 @@
+"""Compact, integer-indexed alternative to ``WorkflowGraph`` for very large DAGs.
+
+``WorkflowGraph`` keeps a dict of string-id lists per node for children,
+parents and outgoing edges.  For generated workflows with 10k+ nodes that
+overhead dominates both memory and traversal time.  ``CompactWorkflowGraph``
+stores each node once at an integer index and keeps adjacency in CSR form:
+
+    _child_ptr[i] .. _child_ptr[i + 1]   slice of _child_idx / _child_edge
+    _parent_ptr[i] .. _parent_ptr[i + 1] slice of _parent_idx
+
+where every array is a typed ``array('l')``.  All traversal runs on integers
+and ids are only materialized at the API boundary, so the public interface is
+identical to ``WorkflowGraph``.  Use ``build_workflow_graph`` to pick the
+backend by size.
+"""
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from typing import Any
+
+from app.engine.graph import WorkflowGraph
+
+# Definitions with at least this many nodes get the compact backend.
+COMPACT_GRAPH_THRESHOLD = 2000
+
+type WorkflowGraphLike = WorkflowGraph | CompactWorkflowGraph
+
+
+def build_workflow_graph(
+    nodes: list[dict[str, Any]], edges: list[dict[str, Any]]
+) -> WorkflowGraphLike:
+    if len(nodes) >= COMPACT_GRAPH_THRESHOLD:
+        return CompactWorkflowGraph(nodes, edges)
+    return WorkflowGraph(nodes, edges)
+
+
+def _csr(
+    count: int, rows: list[int], cols: list[int], edge_nos: list[int]
+) -> tuple[array, array, array]:
+    """Build (ptr, idx, edge) CSR arrays from parallel row / col / edge lists.
+
+    A counting sort keeps each row's entries in original edge order.
+    """
+    ptr = array("l", [0]) * (count + 1)
+    for row in rows:
+        ptr[row + 1] += 1
+    for i in range(count):
+        ptr[i + 1] += ptr[i]
+    fill = ptr[:count]
+    idx = array("l", [0]) * len(rows)
+    edge_no = array("l", [0]) * len(rows)
+    for row, col, e in zip(rows, cols, edge_nos, strict=True):
+        slot = fill[row]
+        idx[slot] = col
+        edge_no[slot] = e
+        fill[row] = slot + 1
+    return ptr, idx, edge_no
+
+
+class CompactWorkflowGraph:
+    __slots__ = (
+        "_ancestor_bits",
+        "_child_edge",
+        "_child_idx",
+        "_child_ptr",
+        "_descendant_bits",
+        "_edges",
+        "_ids",
+        "_index",
+        "_nodes",
+        "_parent_edge",
+        "_parent_idx",
+        "_parent_ptr",
+        "_reach_built",
+        "_reach_ok",
+        "leaf_ids",
+        "root_ids",
+    )
+
+    def __init__(self, nodes: list[dict[str, Any]], edges: list[dict[str, Any]]) -> None:
+        self._index: dict[str, int] = {}
+        self._nodes: list[dict[str, Any]] = []
+        self._ids: list[str] = []
+        for node in nodes:
+            nid = node["id"]
+            if nid in self._index:
+                self._nodes[self._index[nid]] = node
+                continue
+            self._index[nid] = len(self._ids)
+            self._ids.append(nid)
+            self._nodes.append(node)
+        self._edges = edges
+
+        index = self._index
+        sources: list[int] = []
+        targets: list[int] = []
+        edge_nos: list[int] = []
+        for e, edge in enumerate(edges):
+            src = index.get(edge["source"])
+            tgt = index.get(edge["target"])
+            if src is not None and tgt is not None:
+                sources.append(src)
+                targets.append(tgt)
+                edge_nos.append(e)
+
+        n = len(self._ids)
+        self._child_ptr, self._child_idx, self._child_edge = _csr(n, sources, targets, edge_nos)
+        self._parent_ptr, self._parent_idx, self._parent_edge = _csr(n, targets, sources, edge_nos)
+
+        self.root_ids: list[str] = [
+            self._ids[i] for i in range(n) if self._parent_ptr[i] == self._parent_ptr[i + 1]
+        ]
+        self.leaf_ids: list[str] = [
+            self._ids[i] for i in range(n) if self._child_ptr[i] == self._child_ptr[i + 1]
+        ]
+
+        self._reach_built = False
+        self._reach_ok = False
+        self._ancestor_bits: list[int] = []
+        self._descendant_bits: list[int] = []
+
+    # -- index helpers ---------------------------------------------------------
+
+    def _children_of(self, i: int) -> array:
+        return self._child_idx[self._child_ptr[i]:self._child_ptr[i + 1]]
+
+    def _parents_of(self, i: int) -> array:
+        return self._parent_idx[self._parent_ptr[i]:self._parent_ptr[i + 1]]
+
+    # -- node access -----------------------------------------------------------
+
+    def get_node(self, node_id: str) -> dict[str, Any]:
+        return self._nodes[self._index[node_id]]
+
+    def get_node_type(self, node_id: str) -> str:
+        node = self.get_node(node_id)
+        return node.get("type", node.get("data", {}).get("type", "unknown"))
+
+    def get_node_data(self, node_id: str) -> dict[str, Any]:
+        return self.get_node(node_id).get("data", {})
+
+    def get_node_config(self, node_id: str) -> dict[str, Any]:
+        return self.get_node_data(node_id).get("config", {})
+
+    def get_node_label(self, node_id: str) -> str:
+        return self.get_node_data(node_id).get("label", node_id)
+
+    @property
+    def node_ids(self) -> set[str]:
+        return set(self._ids)
+
+    @property
+    def node_count(self) -> int:
+        return len(self._ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edges)
+
+    # -- traversal -------------------------------------------------------------
+
+    def get_ready_steps(self, done_ids: set[str]) -> list[dict[str, Any]]:
+        ids = self._ids
+        ready: list[dict[str, Any]] = []
+        for i, nid in enumerate(ids):
+            if nid in done_ids:
+                continue
+            if all(ids[p] in done_ids for p in self._parents_of(i)):
+                ready.append(self._nodes[i])
+        return ready
+
+    def get_downstream(self, node_id: str) -> list[str]:
+        i = self._index.get(node_id)
+        return [] if i is None else [self._ids[c] for c in self._children_of(i)]
+
+    def get_upstream(self, node_id: str) -> list[str]:
+        i = self._index.get(node_id)
+        return [] if i is None else [self._ids[p] for p in self._parents_of(i)]
+
+    def get_outgoing_edges(self, node_id: str) -> list[dict[str, Any]]:
+        i = self._index.get(node_id)
+        if i is None:
+            return []
+        return [
+            self._edges[e]
+            for e in self._child_edge[self._child_ptr[i]:self._child_ptr[i + 1]]
+        ]
+
+    def get_incoming_edges(self, node_id: str) -> list[dict[str, Any]]:
+        i = self._index.get(node_id)
+        if i is None:
+            return []
+        return [
+            self._edges[e]
+            for e in self._parent_edge[self._parent_ptr[i]:self._parent_ptr[i + 1]]
+        ]
+
+    # -- topological sort (Kahn's algorithm) -----------------------------------
+
+    def _topological_indices(self) -> list[int]:
+        n = len(self._ids)
+        ptr = self._parent_ptr
+        in_degree = [ptr[i + 1] - ptr[i] for i in range(n)]
+        queue: deque[int] = deque(i for i in range(n) if in_degree[i] == 0)
+        order: list[int] = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for c in self._children_of(i):
+                in_degree[c] -= 1
+                if in_degree[c] == 0:
+                    queue.append(c)
+        if len(order) != n:
+            raise ValueError("Workflow graph contains a cycle")
+        return order
+
+    def topological_sort(self) -> list[str]:
+        """Return nodes in topological order.  Raises ValueError if graph has a cycle."""
+        return [self._ids[i] for i in self._topological_indices()]
+
+    def has_cycle(self) -> bool:
+        try:
+            self._topological_indices()
+            return False
+        except ValueError:
+            return True
+
+    # -- execution levels (parallelism tiers) ----------------------------------
+
+    def execution_levels(self) -> list[list[str]]:
+        """Group nodes into levels where all nodes in a level can run in parallel."""
+        n = len(self._ids)
+        ptr = self._parent_ptr
+        in_degree = [ptr[i + 1] - ptr[i] for i in range(n)]
+        current = [i for i in range(n) if in_degree[i] == 0]
+        levels: list[list[str]] = []
+        while current:
+            levels.append([self._ids[i] for i in current])
+            next_level: list[int] = []
+            for i in current:
+                for c in self._children_of(i):
+                    in_degree[c] -= 1
+                    if in_degree[c] == 0:
+                        next_level.append(c)
+            current = next_level
+        return levels
+
+    # -- branch analysis -------------------------------------------------------
+
+    def _branch_targets(self, condition_id: str, branch_label: str, *, other: bool) -> list[int]:
+        targets: list[int] = []
+        for edge in self.get_outgoing_edges(condition_id):
+            label = edge.get("data", {}).get("condition")
+            handle = edge.get("sourceHandle")
+            if other:
+                matches = label != branch_label and handle != branch_label
+            else:
+                matches = label == branch_label or handle == branch_label
+            if matches:
+                targets.append(self._index[edge["target"]])
+        return targets
+
+    def get_branch_nodes(self, condition_id: str, branch_label: str) -> set[str]:
+        return self._ids_from_bits(
+            self._subtree_bits(self._branch_targets(condition_id, branch_label, other=False))
+        )
+
+    def get_exclusive_branch_nodes(self, condition_id: str, branch_label: str) -> set[str]:
+        """Like get_branch_nodes but excludes nodes reachable from other branches."""
+        target = self._subtree_bits(self._branch_targets(condition_id, branch_label, other=False))
+        others = self._subtree_bits(self._branch_targets(condition_id, branch_label, other=True))
+        return self._ids_from_bits(target & ~others)
+
+    def _all_descendants(self, node_id: str) -> set[str]:
+        i = self._index.get(node_id)
+        if i is None:
+            return set()
+        if self._build_reachability():
+            return self._ids_from_bits(self._descendant_bits[i])
+        return self._ids_from_bits(self._walk_bits(i, self._child_ptr, self._child_idx))
+
+    # -- ancestor analysis -----------------------------------------------------
+
+    def get_upstream_ids(self, node_id: str) -> set[str]:
+        i = self._index.get(node_id)
+        if i is None:
+            return set()
+        if self._build_reachability():
+            return self._ids_from_bits(self._ancestor_bits[i])
+        return self._ids_from_bits(self._walk_bits(i, self._parent_ptr, self._parent_idx))
+
+    def is_upstream(self, ancestor_id: str, node_id: str) -> bool:
+        """True if ``ancestor_id`` can reach ``node_id`` through the graph."""
+        a = self._index.get(ancestor_id)
+        i = self._index.get(node_id)
+        if a is None or i is None:
+            return False
+        if self._build_reachability():
+            return bool(self._ancestor_bits[i] >> a & 1)
+        return bool(self._walk_bits(i, self._parent_ptr, self._parent_idx) >> a & 1)
+
+    # -- reachability index ----------------------------------------------------
+
+    def _build_reachability(self) -> bool:
+        """Ancestor / descendant bitsets; bit ``i`` is the node at index ``i``."""
+        if self._reach_built:
+            return self._reach_ok
+        self._reach_built = True
+        try:
+            order = self._topological_indices()
+        except ValueError:
+            return False
+
+        n = len(self._ids)
+        ancestors = [0] * n
+        for i in order:
+            mask = 0
+            for p in self._parents_of(i):
+                mask |= ancestors[p] | (1 << p)
+            ancestors[i] = mask
+        descendants = [0] * n
+        for i in reversed(order):
+            mask = 0
+            for c in self._children_of(i):
+                mask |= descendants[c] | (1 << c)
+            descendants[i] = mask
+
+        self._ancestor_bits = ancestors
+        self._descendant_bits = descendants
+        self._reach_ok = True
+        return True
+
+    def _walk_bits(self, start: int, ptr: array, idx: array) -> int:
+        seen = 0
+        stack = list(idx[ptr[start]:ptr[start + 1]])
+        while stack:
+            current = stack.pop()
+            if not seen >> current & 1:
+                seen |= 1 << current
+                stack.extend(idx[ptr[current]:ptr[current + 1]])
+        return seen
+
+    def _subtree_bits(self, indices: list[int]) -> int:
+        reach = self._build_reachability()
+        mask = 0
+        for i in indices:
+            if reach:
+                mask |= self._descendant_bits[i] | (1 << i)
+            else:
+                mask |= self._walk_bits(i, self._child_ptr, self._child_idx) | (1 << i)
+        return mask
+
+    def _ids_from_bits(self, mask: int) -> set[str]:
+        ids = self._ids
+        result: set[str] = set()
+        while mask:
+            low = mask & -mask
+            result.add(ids[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    # -- subgraph extraction ---------------------------------------------------
+
+    def subgraph(self, node_ids: set[str]) -> CompactWorkflowGraph:
+        """Create a new graph containing only the specified nodes and their edges."""
+        nodes = [self._nodes[self._index[nid]] for nid in node_ids if nid in self._index]
+        edges = [
+            e for e in self._edges
+            if e["source"] in node_ids and e["target"] in node_ids
+        ]
+        return CompactWorkflowGraph(nodes, edges)
+
+    # -- introspection ---------------------------------------------------------
+
+    def get_nodes_by_type(self, step_type: str) -> list[dict[str, Any]]:
+        return [node for nid, node in zip(self._ids, self._nodes, strict=True)
+                if self.get_node_type(nid) == step_type]
+
+    def get_critical_path(self) -> list[str]:
+        """Return the longest path through the graph (by node count)."""
+        topo = self._topological_indices()
+        n = len(self._ids)
+        dist = array("l", [0]) * n
+        prev = array("l", [-1]) * n
+        for i in topo:
+            for c in self._children_of(i):
+                if dist[i] + 1 > dist[c]:
+                    dist[c] = dist[i] + 1
+                    prev[c] = i
+
+        end = max(topo, key=lambda i: dist[i])
+        path: list[str] = []
+        current = end
+        while current != -1:
+            path.append(self._ids[current])
+            current = prev[current]
+        path.reverse()
+        return path
@@ -0,0 +1,103 @@
+"""Read-only, copy-free views of the run context for step handlers.
+
+Handlers used to receive the live run context dict, and ``for_each`` built a
+full ``{**context, "_item": ...}`` copy per item.  Instead:
+
+    - ``item_scope`` layers ``_item`` / ``_index`` over the context with a
+      ``ChainMap``, so per-item scopes cost O(1) whatever the context size
+    - ``handler_context`` hands a handler a ``MappingProxyType``: the whole
+      context when the handler needs it, only the top-level keys it declares
+      via ``StepHandler.context_keys``, or an empty view; lazy artifact
+      references in it (offloaded output fields) are loaded, since handler
+      code reads the values directly rather than through templates; that
+      happens in a thread, so it is a coroutine
+
+Templates in a step's config are resolved by the engine before the handler
+runs, so most handlers need no context at all.  Handlers that evaluate code
+against it (``inline_code``, ``condition``) find the keys they use with
+``subscript_keys`` / ``name_keys``.
+"""
+from __future__ import annotations
+
+import ast
+from collections import ChainMap
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+from app.artifacts import amaterialize, has_lazy_refs
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+EMPTY_CONTEXT: Mapping[str, Any] = MappingProxyType({})
+
+
+def item_scope(context: Mapping[str, Any], item: Any, index: int) -> ChainMap[str, Any]:
+    return ChainMap({"_item": item, "_index": index}, context)  # type: ignore[arg-type]
+
+
+async def handler_context(context: Mapping[str, Any], keys: set[str] | None) -> Mapping[str, Any]:
+    """A read-only view of ``context``; ``keys=None`` means the whole context."""
+    if keys is None:
+        return MappingProxyType(await _load_refs(context))  # type: ignore[arg-type]
+    if not keys:
+        return EMPTY_CONTEXT
+    return MappingProxyType(await amaterialize({k: context[k] for k in keys if k in context}))
+
+
+async def _load_refs(context: Mapping[str, Any]) -> Mapping[str, Any]:
+    lazy = {k: v for k, v in context.items() if has_lazy_refs(v)}
+    return {**context, **await amaterialize(lazy)} if lazy else context
+
+
+@lru_cache(maxsize=512)
+def subscript_keys(code: str, name: str) -> frozenset[str] | None:
+    """Constant keys ``code`` reads from variable ``name``.
+
+    Only ``name["key"]`` and ``name.get("key", ...)`` count; any other use of
+    ``name`` (iteration, dynamic keys, passing it on) returns None, meaning
+    the whole mapping is needed.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    keys: set[str] = set()
+    allowed: set[int] = set()
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, ast.Subscript)
+            and isinstance(node.value, ast.Name)
+            and node.value.id == name
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        ):
+            keys.add(node.slice.value)
+            allowed.add(id(node.value))
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "get"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == name
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            keys.add(node.args[0].value)
+            allowed.add(id(node.func.value))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == name and id(node) not in allowed:
+            return None
+    return frozenset(keys)
+
+
+@lru_cache(maxsize=512)
+def name_keys(expression: str) -> frozenset[str] | None:
+    """Top-level names an expression reads, or None if it cannot be parsed."""
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return None
+    return frozenset(node.id for node in ast.walk(tree) if isinstance(node, ast.Name))
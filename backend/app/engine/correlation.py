@@ -0,0 +1,182 @@
+"""Delivering external events to the runs waiting for them.
+
+A ``wait_for_event`` step pauses its run and leaves a ``waiting`` step run
+carrying the step's ``event_name`` and (optional) ``correlation_key``; both
+columns are indexed.  ``EventCorrelator.deliver`` resumes every run waiting
+on an ``(event_name, correlation_key)`` pair:
+
+    - one UPDATE completes all the matching step runs, with the event as
+      their output, and returns their run ids
+    - paused runs are claimed (paused -> running) in bulk batches
+    - claimed runs are handed to the engine, at most ``resume_concurrency``
+      at a time
+
+The cost of an event therefore depends on how many runs wait for it, not
+on how many runs are paused overall.  With ``hot_index`` on (only safe when
+a single process runs the engine), the open waits are also kept in memory
+(loaded at startup, then maintained as the engine registers and finishes
+waits), so an event nobody waits for is answered without touching the
+database.  A wait with no ``correlation_key`` only
+matches events sent without one.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from app.config import EventCorrelationSettings, settings
+from app.events.types import EventType
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Coroutine
+
+logger = structlog.get_logger(__name__)
+
+type WaitKey = tuple[str, str | None]
+
+
+async def _launch_engine(run_id: str) -> None:
+    from app.engine.executor import WorkflowEngine
+
+    await WorkflowEngine().execute_run(run_id)
+
+
+class EventCorrelator:
+    def __init__(
+        self,
+        config: EventCorrelationSettings | None = None,
+        launch: Callable[[str], Awaitable[None]] | None = None,
+    ) -> None:
+        self._config = config or settings.event_correlation
+        self._launch = launch or _launch_engine
+        # (event_name, correlation_key) -> ids of the step runs waiting on it
+        self._index: dict[WaitKey, set[str]] = {}
+        self._warm = False
+        self._semaphore = asyncio.Semaphore(self._config.resume_concurrency)
+        self._background: set[asyncio.Task[Any]] = set()
+        self.delivered = 0
+        self.skipped = 0
+        self.matched = 0
+        self.resumed = 0
+
+    @property
+    def authoritative(self) -> bool:
+        """Whether a miss in the hot index means nobody is waiting."""
+        return self._config.hot_index and self._warm
+
+    async def start(self) -> None:
+        if self._config.hot_index:
+            try:
+                await self.warm()
+            except Exception:
+                # Every event goes to the database until a later warm succeeds.
+                logger.exception("Loading open event waits failed")
+
+    async def warm(self) -> None:
+        """Load every open wait from the database into the hot index."""
+        from app.db.custom import wf_core
+
+        index: dict[WaitKey, set[str]] = {}
+        for step_run_id, event_name, key in await wf_core.get_event_waits():
+            index.setdefault((event_name, key), set()).add(step_run_id)
+        # Waits registered while loading are kept.
+        for wait_key, ids in self._index.items():
+            index.setdefault(wait_key, set()).update(ids)
+        self._index = index
+        self._warm = True
+
+    async def aclose(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+    def register(self, event_name: str, correlation_key: str | None, step_run_id: str) -> None:
+        if self._config.hot_index:
+            self._index.setdefault((event_name, correlation_key), set()).add(step_run_id)
+
+    def discard(self, event_name: str, correlation_key: str | None, step_run_id: str) -> None:
+        wait_key = (event_name, correlation_key)
+        ids = self._index.get(wait_key)
+        if ids is not None:
+            ids.discard(step_run_id)
+            if not ids:
+                del self._index[wait_key]
+
+    async def deliver(
+        self, event_name: str, correlation_key: str | None, payload: dict[str, Any]
+    ) -> tuple[int, int]:
+        """Resume every run waiting on the event; returns (steps matched, runs resumed)."""
+        from app.db.custom import wf_core
+
+        self.delivered += 1
+        wait_key = (event_name, correlation_key)
+        if self.authoritative and wait_key not in self._index:
+            self.skipped += 1
+            return 0, 0
+
+        output = {"event_name": event_name, "correlation_key": correlation_key, "payload": payload}
+        claimed = await wf_core.claim_event_waits(event_name, correlation_key, output)
+        for step_run_id, _, _ in claimed:
+            self.discard(event_name, correlation_key, step_run_id)
+        if not claimed:
+            return 0, 0
+
+        # A run waiting on the same event in two branches is resumed once.
+        step_by_run = {run_id: step_id for _, run_id, step_id in claimed}
+        run_ids = list(step_by_run)
+        batch = self._config.run_batch_size
+        resumed: list[str] = []
+        for start in range(0, len(run_ids), batch):
+            resumed.extend(await wf_core.claim_paused_runs(run_ids[start : start + batch]))
+
+        for run_id in resumed:
+            self._spawn(self._resume(run_id, step_by_run[run_id], event_name))
+        self.matched += len(claimed)
+        self.resumed += len(resumed)
+        logger.info(
+            "Event delivered",
+            event_name=event_name,
+            correlation_key=correlation_key,
+            matched=len(claimed),
+            resumed=len(resumed),
+        )
+        return len(claimed), len(resumed)
+
+    async def _resume(self, run_id: str, step_id: str, event_name: str) -> None:
+        from app.db.custom import wf_core
+
+        async with self._semaphore:
+            await wf_core.create_run_event(
+                run_id,
+                EventType.RUN_RESUMED,
+                step_id,
+                {"status": "running", "resumed_step_id": step_id, "event_name": event_name},
+            )
+            await self._launch(run_id)
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task[Any]) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Resuming run after event failed", exc_info=task.exception())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hot_index": self.authoritative,
+            "waiting_keys": len(self._index),
+            "waiting_steps": sum(len(ids) for ids in self._index.values()),
+            "delivered": self.delivered,
+            "skipped": self.skipped,
+            "matched": self.matched,
+            "resumed": self.resumed,
+            "queued": len(self._background),
+        }
+
+
+event_correlator = EventCorrelator()
@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
 
 class EngineError(Exception):
     pass
@@ -8,10 +13,18 @@ class EngineError(Exception):
 class PauseExecution(EngineError):
     """Raised by steps that need to pause the run (approval, external event, etc.)."""
 
-    def __init__(self, step_id: str, reason: str = "", pause_type: str = "approval") -> None:
+    def __init__(
+        self,
+        step_id: str,
+        reason: str = "",
+        pause_type: str = "approval",
+        due_at: datetime | None = None,
+    ) -> None:
         self.step_id = step_id
         self.reason = reason
-        self.pause_type = pause_type  # "approval" | "event" | "manual"
+        self.pause_type = pause_type  # "approval" | "event" | "manual" | "timer"
+        # When a "timer" pause wakes up; the timer service resumes the run then.
+        self.due_at = due_at
         super().__init__(f"Execution paused at step {step_id!r}: {reason}")
 
 
@@ -44,6 +57,17 @@ class NonRetriableError(EngineError):
         super().__init__(message)
 
 
+class CircuitOpenError(NonRetriableError):
+    """Raised without calling out when a host's circuit breaker is open."""
+
+    def __init__(self, host: str, retry_in_seconds: float) -> None:
+        self.host = host
+        self.retry_in_seconds = retry_in_seconds
+        super().__init__(
+            f"Circuit open for {host}; failing fast (retry in {retry_in_seconds:.1f}s)"
+        )
+
+
 class RunCancelled(EngineError):
     """Raised internally when a run is cancelled mid-execution."""
     pass
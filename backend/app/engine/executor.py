@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import asyncio
+import itertools
 import time
-from datetime import UTC, datetime
-from typing import Any
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 import structlog
 from matrx_utils import vcprint
 
+from app.artifacts import aoffload_large_fields, artifact_store, is_artifact_ref
+from app.engine.compact_graph import WorkflowGraphLike, build_workflow_graph
+from app.engine.context_view import handler_context, item_scope
+from app.engine.correlation import EventCorrelator, event_correlator
 from app.engine.exceptions import (
+    CircuitOpenError,
     EngineError,
     NonRetriableError,
     PauseExecution,
@@ -16,17 +22,27 @@ from app.engine.exceptions import (
     RunTimeout,
     StepTimeout,
 )
-from app.engine.graph import WorkflowGraph
+from app.engine.liveness import ContextLiveness
 from app.engine.safe_eval import safe_eval
-from app.engine.templates import resolve_templates
+from app.engine.singleflight import SingleFlight, singleflight
+from app.engine.templates import aresolve_templates
+from app.engine.timers import TimerService, timer_service
 from app.events.bus import EventBus, event_bus
 from app.events.types import EventType
+from app.serialization import dumps, loads
+from app.steps.base import StepHandler
 from app.steps.registry import STEP_REGISTRY
 
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator, Mapping
+
 logger = structlog.get_logger(__name__)
 
 MAX_OUTPUT_KEYS_FOR_DISPLAY = 5
 
+# Items read per chunk when for_each iterates an artifact reference.
+FOR_EACH_CHUNK_SIZE = 500
+
 # Engine-handled step types that bypass the generic handler path
 _PAUSE_STEP_TYPES = frozenset({"wait_for_approval", "wait_for_event"})
 
@@ -48,6 +64,21 @@ def _truncate_for_display(
     return result
 
 
+async def _artifact_chunks(ref: dict[str, Any], size: int) -> AsyncIterator[list[Any]]:
+    """Read an NDJSON artifact as lists of at most ``size`` items, off the event loop."""
+    lines = artifact_store.iter_lines(ref["artifact_id"])
+    while chunk := await asyncio.to_thread(_next_chunk, lines, size):
+        yield chunk
+
+
+def _next_chunk(lines: Iterator[bytes], size: int) -> list[Any]:
+    return [loads(line) for line in itertools.islice(lines, size)]
+
+
+async def _one_chunk(items: list[Any]) -> AsyncIterator[list[Any]]:
+    yield items
+
+
 def _calculate_backoff(strategy: str, base: float, attempt: int) -> float:
     match strategy:
         case "fixed":
@@ -86,10 +117,16 @@ class WorkflowEngine:
         bus: EventBus | None = None,
         max_concurrency: int = 10,
         run_timeout_seconds: float | None = None,
+        coalescer: SingleFlight | None = None,
+        timers: TimerService | None = None,
+        correlator: EventCorrelator | None = None,
     ) -> None:
         self._bus = bus or event_bus
         self._semaphore = asyncio.Semaphore(max_concurrency)
         self._run_timeout = run_timeout_seconds
+        self._singleflight = coalescer if coalescer is not None else singleflight
+        self._timers = timers or timer_service
+        self._correlator = correlator or event_correlator
 
     # ------------------------------------------------------------------
     # Public entry point
@@ -121,8 +158,9 @@ class WorkflowEngine:
             edges = []
         if not nodes:
             raise EngineError(f"Workflow {workflow.id} has invalid definition format")
-        graph = WorkflowGraph(nodes, edges)
+        graph = build_workflow_graph(nodes, edges)
         vcprint(graph, f"[EXECUTOR] execute_run Graph: {graph}", color="cyan")
+        liveness = ContextLiveness(graph)
         context: dict[str, Any] = dict(run.context) if run.context else {}
 
         if run.input:
@@ -134,7 +172,12 @@ class WorkflowEngine:
             await wf_core.update_run(run_id, {"status": "running", "started_at": datetime.now(UTC)})
             await self._bus.emit(run_id, EventType.RUN_STARTED, payload={"status": "running"})
         else:
-            await wf_core.update_run(run_id, {"status": "running"})
+            await wf_core.update_run(run_id, {"status": "running", "due_at": None})
+            # Steps completed while the run was paused (a delivered event) are
+            # not in the checkpoint yet.
+            for sr in await wf_core.get_step_runs({"run_id": str(run_id), "status": "completed"}):
+                if sr.step_id is not None and sr.step_id not in context:
+                    context[sr.step_id] = liveness.project(sr.step_id, dict(sr.output or {}))
 
         start_time = time.monotonic()
         active_tasks: list[asyncio.Task[Any]] = []
@@ -172,26 +215,17 @@ class WorkflowEngine:
                 active_tasks.clear()
 
                 # -- process results --------------------------------------
+                pauses: list[PauseExecution] = []
                 for node, result in zip(ready_nodes, results, strict=False):
                     node_id = node["id"]
                     node_data = node.get("data", {})
                     on_error = node_data.get("on_error", "fail")
 
-                    # Pause (approval / external event)
+                    # Pause (approval / external event / timer); the rest of
+                    # the batch is still recorded so the checkpoint is whole.
                     if isinstance(result, PauseExecution):
-                        duration_ms = int((time.monotonic() - start_time) * 1000)
-                        await wf_core.update_run(run_id, {"status": "paused", "context": context})
-                        await self._bus.emit(
-                            run_id,
-                            EventType.RUN_PAUSED,
-                            payload={
-                                "status": "paused",
-                                "waiting_step_id": result.step_id,
-                                "reason": result.reason,
-                                "duration_ms": duration_ms,
-                            },
-                        )
-                        return
+                        pauses.append(result)
+                        continue
 
                     # Cancellation bubbled up
                     if isinstance(result, (RunCancelled, asyncio.CancelledError)):
@@ -260,9 +294,10 @@ class WorkflowEngine:
                         )
                         return
 
-                    # Success — merge output into context
+                    # Success — merge the parts of the output that downstream
+                    # steps read into context; the step run keeps all of it.
                     if isinstance(result, dict):
-                        context[node_id] = result
+                        context[node_id] = liveness.project(node_id, result)
                         await wf_core.update_run(run_id, {"context": context})
                         await self._bus.emit(
                             run_id,
@@ -270,9 +305,19 @@ class WorkflowEngine:
                             step_id=node_id,
                             payload={
                                 "step_id": node_id,
-                                "keys_added": list(result.keys()),
+                                "keys_added": list(context[node_id].keys()),
                             },
                         )
+                        done_ids.add(node_id)
+
+                if pauses and await self._pause_run(run_id, context, pauses, start_time):
+                    return
+
+                # -- drop outputs every consumer has finished reading ------
+                # Checkpoints from here on carry only a marker for them.
+                evicted = liveness.evict(context, done_ids)
+                if evicted:
+                    logger.debug("Evicted step outputs", run_id=str(run_id), step_ids=evicted)
 
             # -- all steps done --------------------------------------------
             duration_ms = int((time.monotonic() - start_time) * 1000)
@@ -342,6 +387,49 @@ class WorkflowEngine:
                 if not task.done():
                     task.cancel()
 
+    async def _pause_run(
+        self,
+        run_id: str,
+        context: dict[str, Any],
+        pauses: list[PauseExecution],
+        start_time: float,
+    ) -> bool:
+        """Checkpoint and pause the run; False if an awaited event arrived meanwhile."""
+        from app.db.custom import wf_core
+
+        # A run waiting on timers wakes for the earliest; anything still not
+        # due by then pauses it again.
+        due_times = [p.due_at for p in pauses if p.due_at is not None]
+        due_at = min(due_times) if due_times else None
+        duration_ms = int((time.monotonic() - start_time) * 1000)
+        await wf_core.update_run(run_id, {"status": "paused", "context": context, "due_at": due_at})
+
+        # An event delivered before the run was paused completed its step but
+        # could not claim the run; claim it back here and carry on.
+        event_steps = {p.step_id for p in pauses if p.pause_type == "event"}
+        if event_steps:
+            waiting = await wf_core.get_step_runs({"run_id": str(run_id), "status": "waiting"})
+            if event_steps - {sr.step_id for sr in waiting} and await wf_core.claim_paused_runs(
+                [str(run_id)]
+            ):
+                return False
+
+        if due_at is not None:
+            self._timers.schedule(str(run_id), due_at)
+        pause = pauses[0]
+        await self._bus.emit(
+            run_id,
+            EventType.RUN_PAUSED,
+            payload={
+                "status": "paused",
+                "waiting_step_id": pause.step_id,
+                "reason": pause.reason,
+                "duration_ms": duration_ms,
+                **({"due_at": due_at.isoformat()} if due_at is not None else {}),
+            },
+        )
+        return True
+
     # ------------------------------------------------------------------
     # Concurrency-guarded step execution
     # ------------------------------------------------------------------
@@ -351,7 +439,7 @@ class WorkflowEngine:
         run_id: str,
         node: dict[str, Any],
         context: dict[str, Any],
-        graph: WorkflowGraph,
+        graph: WorkflowGraphLike,
     ) -> dict[str, Any]:
         async with self._semaphore:
             return await self._execute_step(run_id, node, context, graph)
@@ -365,7 +453,7 @@ class WorkflowEngine:
         run_id: str,
         node: dict[str, Any],
         context: dict[str, Any],
-        graph: WorkflowGraph,
+        graph: WorkflowGraphLike,
     ) -> dict[str, Any]:
         from app.db.custom import wf_core
 
@@ -381,12 +469,22 @@ class WorkflowEngine:
 
         # -- Pause-type steps (approval / wait_for_event) ------------------
         if step_type in _PAUSE_STEP_TYPES:
+            if step_type == "wait_for_event":
+                return await self._handle_event_wait(
+                    run_id, node_id, step_type, step_label, await aresolve_templates(config, context)
+                )
             return await self._handle_pause_step(run_id, node_id, step_type, step_label, config)
 
         # -- for_each loop -------------------------------------------------
         if step_type == "for_each":
             return await self._execute_for_each(run_id, node_id, config, context, graph)
 
+        # -- Long delays suspend the run on a durable timer ----------------
+        if step_type == "delay":
+            resolved_delay = await aresolve_templates(config, context)
+            if float(resolved_delay.get("seconds", 0)) > self._timers.inline_delay_seconds:
+                return await self._handle_delay_step(run_id, node_id, step_type, resolved_delay)
+
         # -- Regular handler execution -------------------------------------
         handler = STEP_REGISTRY.get(step_type)
         if handler is None:
@@ -397,7 +495,7 @@ class WorkflowEngine:
         backoff_base = node_data.get("backoff_base", 2.0)
         timeout_seconds = node_data.get("timeout_seconds")
 
-        resolved_config = resolve_templates(config, context)
+        resolved_config = await aresolve_templates(config, context)
         last_error: Exception | None = None
 
         for attempt in range(1, max_attempts + 1):
@@ -429,14 +527,17 @@ class WorkflowEngine:
 
             step_start = time.monotonic()
             try:
-                coro = handler.execute(resolved_config, context)
+                view = await handler_context(context, handler.context_keys(resolved_config))
+                coro = self._call_handler(step_type, handler, resolved_config, view)
                 if timeout_seconds:
-                    output = await asyncio.wait_for(coro, timeout=timeout_seconds)
+                    output, coalesced = await asyncio.wait_for(coro, timeout=timeout_seconds)
                 else:
-                    output = await coro
+                    output, coalesced = await coro
 
                 if not isinstance(output, dict):
                     output = {"result": output}
+                # Oversized fields go to the artifact store as lazy references.
+                output = await handler.avalidate_output(output)
 
                 step_duration = int((time.monotonic() - step_start) * 1000)
                 await wf_core.update_step_run(
@@ -457,6 +558,7 @@ class WorkflowEngine:
                         "status": "completed",
                         "output_summary": _truncate_for_display(output),
                         "duration_ms": step_duration,
+                        **({"coalesced": True} if coalesced else {}),
                     },
                 )
                 return output
@@ -465,6 +567,34 @@ class WorkflowEngine:
                 pause.step_id = node_id
                 raise
 
+            except CircuitOpenError as exc:
+                await wf_core.update_step_run(
+                    step_run_id,
+                    {
+                        "status": "failed",
+                        "error": str(exc),
+                        "completed_at": datetime.now(UTC),
+                    },
+                )
+                await self._bus.emit(
+                    run_id,
+                    EventType.STEP_FAILED,
+                    step_id=node_id,
+                    payload={
+                        "step_id": node_id,
+                        "step_type": step_type,
+                        "status": "failed",
+                        "error": str(exc),
+                        "attempt": attempt,
+                        "circuit": {
+                            "state": "open",
+                            "host": exc.host,
+                            "retry_in_seconds": round(exc.retry_in_seconds, 3),
+                        },
+                    },
+                )
+                raise
+
             except NonRetriableError:
                 raise
 
@@ -525,6 +655,20 @@ class WorkflowEngine:
             raise last_error
         raise EngineError(f"Step {node_id} failed but no error was captured")
 
+    async def _call_handler(
+        self,
+        step_type: str,
+        handler: StepHandler,
+        config: dict[str, Any],
+        context: Mapping[str, Any],
+    ) -> tuple[Any, bool]:
+        """Run ``handler``, sharing one call among identical concurrent ones if allowed."""
+        sf = self._singleflight
+        if sf.allows(step_type) and handler.can_coalesce(config):
+            key = sf.key(step_type, config, context)
+            return await sf.do(key, lambda: handler.execute(config, context))
+        return await handler.execute(config, context), False
+
     # ------------------------------------------------------------------
     # Condition evaluation
     # ------------------------------------------------------------------
@@ -534,7 +678,7 @@ class WorkflowEngine:
         run_id: str,
         node_id: str,
         context: dict[str, Any],
-        graph: WorkflowGraph,
+        graph: WorkflowGraphLike,
     ) -> dict[str, Any]:
         from app.db.custom import wf_core
 
@@ -542,7 +686,7 @@ class WorkflowEngine:
         config = node_data.get("config", {})
         expression = config.get("expression", "false")
 
-        resolved_expr = resolve_templates(expression, context)
+        resolved_expr = await aresolve_templates(expression, context)
         if not isinstance(resolved_expr, str):
             resolved_expr = str(resolved_expr)
 
@@ -573,7 +717,8 @@ class WorkflowEngine:
         )
 
         step_start = time.monotonic()
-        result = bool(safe_eval(resolved_expr, context))
+        view = await handler_context(context, STEP_REGISTRY["condition"].context_keys({"expression": resolved_expr}))
+        result = bool(safe_eval(resolved_expr, view))  # type: ignore[arg-type]
         step_duration = int((time.monotonic() - step_start) * 1000)
 
         await wf_core.update_step_run(
@@ -674,6 +819,163 @@ class WorkflowEngine:
             pause_type=waiting_for,
         )
 
+    async def _handle_event_wait(
+        self,
+        run_id: str,
+        node_id: str,
+        step_type: str,
+        step_label: str,
+        config: dict[str, Any],
+    ) -> dict[str, Any]:
+        from app.db.custom import wf_core
+
+        event_name: str = config["event_name"]
+        correlation_key = config.get("correlation_key")
+        correlation_key = None if correlation_key in (None, "") else str(correlation_key)
+        timeout_seconds = config.get("timeout_seconds")
+        reason = f"Waiting for external event: {event_name}"
+        now = datetime.now(UTC)
+
+        # -- resumed before the event arrived: time out or keep waiting ----
+        waiting = await wf_core.get_step_runs(
+            {"run_id": str(run_id), "step_id": node_id, "status": "waiting"}
+        )
+        if waiting:
+            step_run = waiting[-1]
+            due = step_run.output.get("due_at")
+            due_at = datetime.fromisoformat(due) if due else None
+            if due_at is None or due_at > now:
+                raise PauseExecution(
+                    step_id=node_id, reason=reason, pause_type="event", due_at=due_at
+                )
+            self._correlator.discard(event_name, correlation_key, str(step_run.id))
+            error = StepTimeout(node_id, float(timeout_seconds or 0))
+            await wf_core.update_step_run(
+                str(step_run.id),
+                {"status": "failed", "error": str(error), "completed_at": now},
+            )
+            await self._bus.emit(
+                run_id,
+                EventType.STEP_FAILED,
+                step_id=node_id,
+                payload={
+                    "step_id": node_id,
+                    "step_type": step_type,
+                    "status": "failed",
+                    "error": str(error),
+                    "attempt": 1,
+                },
+            )
+            raise error
+
+        # -- first visit: register the wait and pause ----------------------
+        # The timer service resumes the run at the deadline to time it out.
+        due_at = now + timedelta(seconds=float(timeout_seconds)) if timeout_seconds else None
+        step_run = await wf_core.create_step_run(
+            {
+                "run_id": str(run_id),
+                "step_id": node_id,
+                "step_type": step_type,
+                "status": "waiting",
+                "input": config,
+                "output": {"due_at": due_at.isoformat()} if due_at else {},
+                "event_name": event_name,
+                "correlation_key": correlation_key,
+                "attempt": 1,
+                "started_at": now,
+            }
+        )
+        self._correlator.register(event_name, correlation_key, str(step_run.id))
+        await self._bus.emit(
+            run_id,
+            EventType.STEP_WAITING,
+            step_id=node_id,
+            payload={
+                "step_id": node_id,
+                "step_type": step_type,
+                "status": "waiting",
+                "waiting_for": "event",
+                "label": step_label,
+                "event_name": event_name,
+                **({"due_at": due_at.isoformat()} if due_at else {}),
+            },
+        )
+        raise PauseExecution(step_id=node_id, reason=reason, pause_type="event", due_at=due_at)
+
+    # ------------------------------------------------------------------
+    # Delay steps (durable timer)
+    # ------------------------------------------------------------------
+
+    async def _handle_delay_step(
+        self,
+        run_id: str,
+        node_id: str,
+        step_type: str,
+        config: dict[str, Any],
+    ) -> dict[str, Any]:
+        from app.db.custom import wf_core
+
+        seconds = float(config.get("seconds", 0))
+        now = datetime.now(UTC)
+        waiting = await wf_core.get_step_runs(
+            {"run_id": str(run_id), "step_id": node_id, "status": "waiting"}
+        )
+
+        # -- woken up: finish the step once its timer is due ---------------
+        if waiting:
+            step_run = waiting[-1]
+            due_at = datetime.fromisoformat(step_run.output["due_at"])
+            if due_at > now:
+                raise PauseExecution(
+                    step_id=node_id, reason="Delay", pause_type="timer", due_at=due_at
+                )
+            output = {"delayed_seconds": seconds}
+            await wf_core.update_step_run(
+                str(step_run.id),
+                {"status": "completed", "output": output, "completed_at": now},
+            )
+            await self._bus.emit(
+                run_id,
+                EventType.STEP_COMPLETED,
+                step_id=node_id,
+                payload={
+                    "step_id": node_id,
+                    "step_type": step_type,
+                    "status": "completed",
+                    "output_summary": output,
+                    "late_ms": int((now - due_at).total_seconds() * 1000),
+                },
+            )
+            return output
+
+        # -- first visit: persist the wake-up time and suspend -------------
+        due_at = now + timedelta(seconds=seconds)
+        await wf_core.create_step_run(
+            {
+                "run_id": str(run_id),
+                "step_id": node_id,
+                "step_type": step_type,
+                "status": "waiting",
+                "input": config,
+                "output": {"due_at": due_at.isoformat()},
+                "attempt": 1,
+                "started_at": now,
+            }
+        )
+        await self._bus.emit(
+            run_id,
+            EventType.STEP_WAITING,
+            step_id=node_id,
+            payload={
+                "step_id": node_id,
+                "step_type": step_type,
+                "status": "waiting",
+                "waiting_for": "timer",
+                "due_at": due_at.isoformat(),
+            },
+        )
+        raise PauseExecution(step_id=node_id, reason="Delay", pause_type="timer", due_at=due_at)
+
     # ------------------------------------------------------------------
     # for_each loop execution
     # ------------------------------------------------------------------
@@ -684,20 +986,26 @@ class WorkflowEngine:
         node_id: str,
         config: dict[str, Any],
         context: dict[str, Any],
-        graph: WorkflowGraph,
+        graph: WorkflowGraphLike,
     ) -> dict[str, Any]:
         from app.db.custom import wf_core
 
         node_data = graph.get_node_data(node_id)
         step_label = node_data.get("label", node_id)
-        resolved_config = resolve_templates(config, context)
+        # item_config is resolved per item, against a context that has _item.
+        sub_config_template = config.get("item_config", {})
+        resolved_config = await aresolve_templates(
+            {k: v for k, v in config.items() if k != "item_config"}, context
+        )
 
         items = resolved_config.get("items", [])
-        if not isinstance(items, list):
-            raise EngineError(f"for_each step {node_id}: 'items' must be a list")
+        lazy = is_artifact_ref(items)
+        if not lazy and not isinstance(items, list):
+            raise EngineError(
+                f"for_each step {node_id}: 'items' must be a list or an artifact reference"
+            )
 
         sub_handler_type = resolved_config.get("handler", resolved_config.get("step_type"))
-        sub_config_template = resolved_config.get("item_config", {})
 
         step_run = await wf_core.create_step_run(
             {
@@ -705,7 +1013,7 @@ class WorkflowEngine:
                 "step_id": node_id,
                 "step_type": "for_each",
                 "status": "running",
-                "input": {"item_count": len(items)},
+                "input": {"items_artifact": items["uri"]} if lazy else {"item_count": len(items)},
                 "output": {},
                 "attempt": 1,
                 "started_at": datetime.now(UTC),
@@ -726,37 +1034,68 @@ class WorkflowEngine:
         )
 
         step_start = time.monotonic()
-        results: list[Any] = []
         max_parallel = resolved_config.get("max_parallel", 1)
+        handler = STEP_REGISTRY.get(sub_handler_type) if sub_handler_type else None
+        count = 0
+        sem = asyncio.Semaphore(max_parallel)
+
+        async def _run_item(idx: int, item: Any) -> dict[str, Any]:
+            async with sem:
+                scope = item_scope(context, item, idx)
+                item_config = await aresolve_templates(sub_config_template, scope)
+                view = await handler_context(scope, handler.context_keys(item_config))
+                return await handler.execute(item_config, view)
+
+        # Items in an artifact (e.g. a streamed database_query) are read and
+        # processed a chunk at a time instead of being loaded whole, and their
+        # results are written to an NDJSON artifact as each chunk finishes.
+        chunks = (
+            _artifact_chunks(items, int(resolved_config.get("chunk_size", FOR_EACH_CHUNK_SIZE)))
+            if lazy
+            else _one_chunk(items)
+        )
+        results: list[Any] = []
+        writer = artifact_store.open_writer("application/x-ndjson") if lazy else None
+        try:
+            async for chunk in chunks:
+                offset = count
+                count += len(chunk)
+                if handler is None:
+                    chunk_results = chunk
+                elif handler.supports_batch:
+                    # Batch-capable handlers (e.g. send_email) take the whole chunk at once.
+                    scopes = [item_scope(context, item, idx) for idx, item in enumerate(chunk, start=offset)]
+                    item_configs = [await aresolve_templates(sub_config_template, s) for s in scopes]
+                    item_contexts = [
+                        await handler_context(s, handler.context_keys(c))
+                        for s, c in zip(scopes, item_configs, strict=True)
+                    ]
+                    chunk_results = await handler.execute_batch(item_configs, item_contexts)
+                else:
+                    tasks = [_run_item(i, item) for i, item in enumerate(chunk, start=offset)]
+                    chunk_results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        if sub_handler_type and sub_handler_type in STEP_REGISTRY:
-            handler = STEP_REGISTRY[sub_handler_type]
-            sem = asyncio.Semaphore(max_parallel)
-
-            async def _run_item(idx: int, item: Any) -> dict[str, Any]:
-                async with sem:
-                    item_context = {**context, "_item": item, "_index": idx}
-                    item_config = resolve_templates(sub_config_template, item_context)
-                    return await handler.execute(item_config, item_context)
-
-            tasks = [_run_item(i, item) for i, item in enumerate(items)]
-            raw_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            processed: list[Any] = []
-            for i, r in enumerate(raw_results):
-                if isinstance(r, Exception):
-                    processed.append({"_error": str(r), "_index": i})
+                chunk_results = [
+                    {"_error": str(r), "_index": i} if isinstance(r, Exception) else r
+                    for i, r in enumerate(chunk_results, start=offset)
+                ]
+                if writer is None:
+                    results.extend(chunk_results)
                 else:
-                    processed.append(r)
-            results = processed
-        else:
-            results = list(items)
+                    await writer.awrite(b"".join(dumps(r) + b"\n" for r in chunk_results))
+        except BaseException:
+            if writer is not None:
+                await writer.aabort()
+            raise
 
-        output = {
-            "items": items,
-            "count": len(items),
-            "results": results,
-        }
+        output = await aoffload_large_fields(
+            {
+                "items": items,
+                "count": count,
+                "results": await writer.acommit() if writer else results,
+            },
+            StepHandler.MAX_OUTPUT_SIZE,
+        )
 
         step_duration = int((time.monotonic() - step_start) * 1000)
         await wf_core.update_step_run(
@@ -776,8 +1115,8 @@ class WorkflowEngine:
                 "step_type": "for_each",
                 "status": "completed",
                 "output_summary": {
-                    "count": len(items),
-                    "results_count": len(results),
+                    "count": count,
+                    "results_count": count,
                 },
                 "duration_ms": step_duration,
             },
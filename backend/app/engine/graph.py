@@ -27,6 +27,14 @@ class WorkflowGraph:
             nid for nid, children in self._children.items() if not children
         ]
 
+        # Reachability index — built lazily on first ancestor/descendant query.
+        self._reach_built = False
+        self._reach_ok = False
+        self._reach_order: list[str] = []
+        self._reach_pos: dict[str, int] = {}
+        self._ancestor_bits: list[int] = []
+        self._descendant_bits: list[int] = []
+
     # -- node access -----------------------------------------------------------
 
     def get_node(self, node_id: str) -> dict[str, Any]:
@@ -132,19 +140,28 @@ class WorkflowGraph:
 
     # -- branch analysis -------------------------------------------------------
 
-    def get_branch_nodes(self, condition_id: str, branch_label: str) -> set[str]:
-        branch_edges = [
-            e for e in self._edges
-            if e["source"] == condition_id
-            and (
-                e.get("data", {}).get("condition") == branch_label
-                or e.get("sourceHandle") == branch_label
-            )
+    def _branch_edges(self, condition_id: str, branch_label: str) -> list[dict[str, Any]]:
+        return [
+            e for e in self.get_outgoing_edges(condition_id)
+            if e.get("data", {}).get("condition") == branch_label
+            or e.get("sourceHandle") == branch_label
         ]
+
+    def _other_branch_edges(self, condition_id: str, branch_label: str) -> list[dict[str, Any]]:
+        return [
+            e for e in self.get_outgoing_edges(condition_id)
+            if e.get("data", {}).get("condition") != branch_label
+            and e.get("sourceHandle") != branch_label
+        ]
+
+    def get_branch_nodes(self, condition_id: str, branch_label: str) -> set[str]:
+        targets = [e["target"] for e in self._branch_edges(condition_id, branch_label)]
+        if self._build_reachability():
+            return self._ids_from_bits(self._subtree_bits(targets))
         result: set[str] = set()
-        for edge in branch_edges:
-            result.add(edge["target"])
-            result |= self._all_descendants(edge["target"])
+        for target in targets:
+            result.add(target)
+            result |= self._walk(target, self._children)
         return result
 
     def get_exclusive_branch_nodes(
@@ -155,41 +172,114 @@ class WorkflowGraph:
         This handles diamond-shaped merges after a condition — the merge node
         should NOT be skipped just because one branch was skipped.
         """
-        target_branch = self.get_branch_nodes(condition_id, branch_label)
-        other_edges = [
-            e for e in self._edges
-            if e["source"] == condition_id
-            and e.get("data", {}).get("condition") != branch_label
-            and e.get("sourceHandle") != branch_label
+        other_targets = [
+            e["target"] for e in self._other_branch_edges(condition_id, branch_label)
         ]
-        reachable_from_other: set[str] = set()
-        for edge in other_edges:
-            reachable_from_other.add(edge["target"])
-            reachable_from_other |= self._all_descendants(edge["target"])
+        if self._build_reachability():
+            targets = [e["target"] for e in self._branch_edges(condition_id, branch_label)]
+            exclusive = self._subtree_bits(targets) & ~self._subtree_bits(other_targets)
+            return self._ids_from_bits(exclusive)
 
+        target_branch = self.get_branch_nodes(condition_id, branch_label)
+        reachable_from_other: set[str] = set()
+        for target in other_targets:
+            reachable_from_other.add(target)
+            reachable_from_other |= self._walk(target, self._children)
         return target_branch - reachable_from_other
 
     def _all_descendants(self, node_id: str) -> set[str]:
-        descendants: set[str] = set()
-        stack = list(self._children.get(node_id, []))
-        while stack:
-            current = stack.pop()
-            if current not in descendants:
-                descendants.add(current)
-                stack.extend(self._children.get(current, []))
-        return descendants
+        if self._build_reachability():
+            pos = self._reach_pos.get(node_id)
+            return set() if pos is None else self._ids_from_bits(self._descendant_bits[pos])
+        return self._walk(node_id, self._children)
 
     # -- ancestor analysis -----------------------------------------------------
 
     def get_upstream_ids(self, node_id: str) -> set[str]:
-        ancestors: set[str] = set()
-        stack = list(self._parents.get(node_id, []))
+        if self._build_reachability():
+            pos = self._reach_pos.get(node_id)
+            return set() if pos is None else self._ids_from_bits(self._ancestor_bits[pos])
+        return self._walk(node_id, self._parents)
+
+    def is_upstream(self, ancestor_id: str, node_id: str) -> bool:
+        """True if ``ancestor_id`` can reach ``node_id`` through the graph."""
+        if self._build_reachability():
+            anc = self._reach_pos.get(ancestor_id)
+            pos = self._reach_pos.get(node_id)
+            if anc is None or pos is None:
+                return False
+            return bool(self._ancestor_bits[pos] >> anc & 1)
+        return ancestor_id in self._walk(node_id, self._parents)
+
+    @staticmethod
+    def _walk(node_id: str, adjacency: dict[str, list[str]]) -> set[str]:
+        seen: set[str] = set()
+        stack = list(adjacency.get(node_id, []))
         while stack:
             current = stack.pop()
-            if current not in ancestors:
-                ancestors.add(current)
-                stack.extend(self._parents.get(current, []))
-        return ancestors
+            if current not in seen:
+                seen.add(current)
+                stack.extend(adjacency.get(current, []))
+        return seen
+
+    # -- reachability index ----------------------------------------------------
+
+    def _build_reachability(self) -> bool:
+        """Build ancestor/descendant bitsets once, in topological order.
+
+        Bit ``i`` of a mask stands for the node at position ``i`` of the
+        topological order, so every ancestor / descendant / branch query is a
+        handful of integer ``|`` / ``&`` operations instead of a graph walk.
+        Returns False for cyclic graphs, where callers fall back to walking.
+        """
+        if self._reach_built:
+            return self._reach_ok
+        self._reach_built = True
+        try:
+            order = self.topological_sort()
+        except ValueError:
+            return False
+
+        pos = {nid: i for i, nid in enumerate(order)}
+        ancestors = [0] * len(order)
+        for i, nid in enumerate(order):
+            mask = 0
+            for parent in self._parents[nid]:
+                j = pos[parent]
+                mask |= ancestors[j] | (1 << j)
+            ancestors[i] = mask
+
+        descendants = [0] * len(order)
+        for i in range(len(order) - 1, -1, -1):
+            mask = 0
+            for child in self._children[order[i]]:
+                j = pos[child]
+                mask |= descendants[j] | (1 << j)
+            descendants[i] = mask
+
+        self._reach_order = order
+        self._reach_pos = pos
+        self._ancestor_bits = ancestors
+        self._descendant_bits = descendants
+        self._reach_ok = True
+        return True
+
+    def _subtree_bits(self, node_ids: list[str]) -> int:
+        mask = 0
+        for nid in node_ids:
+            i = self._reach_pos.get(nid)
+            if i is not None:
+                mask |= self._descendant_bits[i] | (1 << i)
+        return mask
+
+    def _ids_from_bits(self, mask: int) -> set[str]:
+        order = self._reach_order
+        ids: set[str] = set()
+        while mask:
+            low = mask & -mask
+            ids.add(order[low.bit_length() - 1])
+            mask ^= low
+        return ids
 
     # -- subgraph extraction ---------------------------------------------------
 
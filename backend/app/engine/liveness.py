@@ -0,0 +1,176 @@
+"""Liveness of step outputs in the run context.
+
+Every step's output used to stay whole in the run context, and in every
+``wf_runs.context`` checkpoint, until the run finished.  Templates and the
+handlers' ``context_keys`` make most reads statically known, so when the
+graph is built ``ContextLiveness`` records, for each step, which nodes read
+its output and which paths of it they read:
+
+    - ``project`` keeps only the referenced paths of an output in the
+      context (``{{fetch.body.id}}`` keeps ``body.id``, not the headers)
+    - ``evict`` replaces an output with a small ``{"_evicted": True}`` marker
+      once all of its consumers are done
+
+The full output stays on the step's ``wf_step_runs`` row either way.  Nodes
+whose reads cannot be determined (``function_call``, ``transform``, snippets
+that use ``context`` dynamically) count as reading every step upstream of
+them in full.  Outputs nobody reads are the run's results and are kept whole.
+"""
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Any
+
+from app.artifacts import is_artifact_ref
+from app.engine.context_view import name_keys
+from app.engine.templates import extract_template_refs
+from app.steps.registry import STEP_REGISTRY
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, MutableMapping
+
+    from app.engine.compact_graph import WorkflowGraphLike
+
+EVICTED_KEY = "_evicted"
+# Keys provided by the engine rather than by an upstream step.
+_SCOPE_KEYS = frozenset({"input", "_item", "_index"})
+_PLAIN_PATH = re.compile(r"^[A-Za-z_]\w*(?:\.\w+)*$")
+
+# Nested dict of the paths read from an output; None means "the whole value".
+type PathTree = dict[str, PathTree | None] | None
+
+
+def is_evicted(value: Any) -> bool:
+    return isinstance(value, dict) and value.get(EVICTED_KEY) is True
+
+
+def _has_block(obj: Any) -> bool:
+    if isinstance(obj, str):
+        return "{%" in obj
+    if isinstance(obj, dict):
+        return any(_has_block(v) for v in obj.values())
+    if isinstance(obj, list):
+        return any(_has_block(v) for v in obj)
+    return False
+
+
+def template_reads(config: Any) -> set[str] | None:
+    """Dotted context paths the templates in ``config`` read; None if unknown."""
+    if _has_block(config):
+        return None
+    reads: set[str] = set()
+    for ref in extract_template_refs(config):
+        if _PLAIN_PATH.match(ref):
+            reads.add(ref)
+            continue
+        # An expression such as ``a.x + b.y``: every name in it is read whole.
+        names = name_keys(ref)
+        if names is None:
+            return None
+        reads |= names
+    return reads
+
+
+def node_reads(step_type: str, config: dict[str, Any]) -> set[str] | None:
+    """Dotted context paths a node reads; None if that cannot be determined.
+
+    A bare key (``"fetch"``) means the whole value under it is read.
+    """
+    reads = template_reads(config)
+    if reads is None:
+        return None
+    if step_type == "condition":
+        # The engine evaluates the (template-resolved) expression itself.
+        names = name_keys(config.get("expression", "false"))
+        return None if names is None else reads | names
+    if step_type == "for_each":
+        step_type = config.get("handler", config.get("step_type"))
+        if step_type is None:
+            return reads
+        config = config.get("item_config", {})
+    handler = STEP_REGISTRY.get(step_type)
+    if handler is None:
+        return None
+    try:
+        keys = handler.context_keys(config)
+    except (KeyError, TypeError, ValueError):
+        return None
+    return None if keys is None else reads | keys
+
+
+def _add_path(tree: dict[str, PathTree], parts: list[str]) -> None:
+    head, rest = parts[0], parts[1:]
+    if not rest:
+        tree[head] = None
+    elif head not in tree:
+        tree[head] = {}
+        _add_path(tree[head], rest)  # type: ignore[arg-type]
+    elif tree[head] is not None:
+        _add_path(tree[head], rest)  # type: ignore[arg-type]
+
+
+def project(value: Any, tree: PathTree) -> Any:
+    """The parts of ``value`` covered by ``tree``; lists and artifact references are kept whole."""
+    if tree is None or not isinstance(value, dict) or is_artifact_ref(value):
+        return value
+    return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+
+
+class ContextLiveness:
+    def __init__(self, graph: WorkflowGraphLike) -> None:
+        node_ids = graph.node_ids
+        consumers: dict[str, set[str]] = {}
+        paths: dict[str, PathTree] = {}
+        opaque: list[str] = []
+        for node_id in node_ids:
+            reads = node_reads(graph.get_node_type(node_id), graph.get_node_config(node_id))
+            if reads is None:
+                opaque.append(node_id)
+                continue
+            for ref in reads:
+                root, *parts = ref.split(".")
+                if root in _SCOPE_KEYS:
+                    continue
+                consumers.setdefault(root, set()).add(node_id)
+                if not parts:
+                    paths[root] = None
+                elif paths.setdefault(root, {}) is not None:
+                    _add_path(paths[root], parts)  # type: ignore[arg-type]
+
+        for node_id in opaque:
+            for upstream_id in graph.get_upstream_ids(node_id):
+                consumers.setdefault(upstream_id, set()).add(node_id)
+                paths[upstream_id] = None
+
+        self.consumers: dict[str, frozenset[str]] = {
+            step_id: frozenset(nodes)
+            for step_id, nodes in consumers.items()
+            if step_id in node_ids
+        }
+        self.paths: dict[str, PathTree] = {
+            step_id: tree for step_id, tree in paths.items() if step_id in self.consumers
+        }
+
+    def project(self, step_id: str, output: Any) -> Any:
+        """``output`` reduced to the paths downstream steps read from it."""
+        if step_id not in self.paths:
+            return output
+        return project(output, self.paths[step_id])
+
+    def dead(self, done_ids: Iterable[str]) -> set[str]:
+        """Steps whose outputs every consumer has finished reading."""
+        done = set(done_ids)
+        return {
+            step_id
+            for step_id, nodes in self.consumers.items()
+            if step_id in done and nodes <= done
+        }
+
+    def evict(self, context: MutableMapping[str, Any], done_ids: Iterable[str]) -> list[str]:
+        """Replace dead step outputs in ``context`` with markers; returns the evicted ids."""
+        evicted = []
+        for step_id in self.dead(done_ids):
+            if step_id in context and not is_evicted(context[step_id]):
+                context[step_id] = {EVICTED_KEY: True}
+                evicted.append(step_id)
+        return evicted
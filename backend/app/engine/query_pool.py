@@ -0,0 +1,88 @@
+"""Dedicated asyncpg pool for ``database_query`` steps.
+
+Workflow queries get their own size-limited pool, separate from the ORM's
+connections, so a burst of user queries cannot starve the engine's own
+bookkeeping.  Each connection keeps asyncpg's prepared statement cache, so a
+query a workflow runs repeatedly is parsed and planned once per connection.
+
+The pool is created lazily on first use; the FastAPI lifespan closes the
+module singleton ``query_pool``.  Inject a fake with an ``acquire`` context
+manager for tests.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
+
+import asyncpg
+import structlog
+
+from app.config import WorkflowDbSettings, settings
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+logger = structlog.get_logger(__name__)
+
+
+class QueryPool:
+    def __init__(self, config: WorkflowDbSettings | None = None, dsn: str | None = None) -> None:
+        self._config = config or settings.workflow_db
+        self._dsn = dsn
+        self._pool: asyncpg.Pool | None = None
+        self._lock = asyncio.Lock()
+        self.queries = 0
+
+    @property
+    def dsn(self) -> str:
+        return (
+            self._dsn
+            or self._config.dsn.get_secret_value()
+            or settings.primary_db.url
+        )
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is not None:
+            return self._pool
+        async with self._lock:
+            if self._pool is None:
+                cfg = self._config
+                self._pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=cfg.min_size,
+                    max_size=cfg.max_size,
+                    statement_cache_size=cfg.statement_cache_size,
+                    max_cached_statement_lifetime=cfg.max_cached_statement_lifetime_seconds,
+                    max_inactive_connection_lifetime=cfg.max_inactive_connection_lifetime_seconds,
+                    command_timeout=cfg.command_timeout_seconds,
+                )
+                logger.info("query_pool_opened", min_size=cfg.min_size, max_size=cfg.max_size)
+        return self._pool
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            self.queries += 1
+            yield conn
+
+    async def aclose(self) -> None:
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+            logger.info("query_pool_closed")
+
+    def stats(self) -> dict[str, Any]:
+        pool = self._pool
+        return {
+            "open": pool is not None,
+            "size": pool.get_size() if pool is not None else 0,
+            "idle": pool.get_idle_size() if pool is not None else 0,
+            "max_size": self._config.max_size,
+            "statement_cache_size": self._config.statement_cache_size,
+            "queries": self.queries,
+        }
+
+
+query_pool = QueryPool()
@@ -0,0 +1,126 @@
+"""Request coalescing ("singleflight") for identical in-flight step calls.
+
+When a burst of runs executes the same step with the same resolved config at
+the same moment (webhook fan-in, scheduled triggers), only the first call
+reaches the handler; the others await its result.  Calls are keyed by step
+type plus a canonical hash of the resolved config and of the context view the
+handler gets, and only step types on an explicit allowlist are ever coalesced.
+Handlers can further veto a specific config via ``StepHandler.can_coalesce``
+(by default only handlers that read no context are eligible; ``http_request``
+also only allows safe methods).
+
+When a call was shared, every caller gets its own deep copy of the output, so
+runs never share mutable state.  The shared call keeps running while at least
+one caller is waiting and is cancelled once all of them have gone.
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+from typing import TYPE_CHECKING, Any
+
+from app.config import settings
+from app.serialization import dumps
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable, Mapping
+
+# Steps with side effects that must run once per call, whatever the allowlist says.
+NEVER_COALESCE = frozenset(
+    {
+        "send_email",
+        "webhook",
+        "webhook_batch",
+        "database_query",
+        "inline_code",
+        "delay",
+        "wait_for_approval",
+        "wait_for_event",
+        "for_each",
+        "condition",
+    }
+)
+
+
+def config_hash(config: dict[str, Any]) -> str:
+    return hashlib.sha256(dumps(config, sort_keys=True)).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("joined", "task", "waiters")
+
+    def __init__(self, task: asyncio.Future[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+        self.joined = 0
+
+
+class SingleFlight:
+    def __init__(self, step_types: Iterable[str] = ()) -> None:
+        step_types = set(step_types)
+        forbidden = step_types & NEVER_COALESCE
+        if forbidden:
+            raise ValueError(f"Step types cannot be coalesced: {sorted(forbidden)}")
+        self._step_types = frozenset(step_types)
+        self._flights: dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def allows(self, step_type: str) -> bool:
+        return step_type in self._step_types
+
+    def key(
+        self, step_type: str, config: dict[str, Any], context: Mapping[str, Any] | None = None
+    ) -> str:
+        if not context:
+            return f"{step_type}:{config_hash(config)}"
+        return f"{step_type}:{config_hash(config)}:{config_hash(dict(context))}"
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Any]]
+    ) -> tuple[Any, bool]:
+        """Run ``fn`` once per ``key`` among concurrent callers.
+
+        Returns ``(result, coalesced)``; ``coalesced`` is True for callers
+        that joined an existing call.
+        """
+        flight = self._flights.get(key)
+        coalesced = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _, f=flight: self._forget(key, f))
+            self.calls += 1
+        else:
+            flight.joined += 1
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+        # Once the call is done nobody else can join, so ``joined`` is final.
+        return (copy.deepcopy(result) if flight.joined else result), coalesced
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "step_types": sorted(self._step_types),
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
+
+
+singleflight = SingleFlight(settings.engine.singleflight_step_types)
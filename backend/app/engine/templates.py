@@ -1,29 +1,48 @@
 from __future__ import annotations
 
+import asyncio
 import re
+from collections.abc import Mapping
 from typing import Any
 
 from jinja2 import Environment, StrictUndefined
 
-_jinja_env = Environment(undefined=StrictUndefined)
+from app.artifacts import artifact_store, is_lazy_ref
+
+
+def _deref(value: Any) -> Any:
+    """Load a lazy artifact reference (an offloaded output field) on demand."""
+    return artifact_store.load_json(value) if is_lazy_ref(value) else value
+
+
+class _ArtifactEnvironment(Environment):
+    def getitem(self, obj: Any, argument: Any) -> Any:
+        return _deref(super().getitem(obj, argument))
+
+    def getattr(self, obj: Any, attribute: str) -> Any:
+        return _deref(super().getattr(obj, attribute))
+
+
+_jinja_env = _ArtifactEnvironment(undefined=StrictUndefined)
 _SINGLE_TEMPLATE = re.compile(r"^\{\{([^{}]+)\}\}$")
 _HAS_TEMPLATE = re.compile(r"\{\{.+?\}\}")
+_NAME = re.compile(r"[A-Za-z_]\w*")
 
 
 def _deep_get(data: Any, path: str) -> Any:
     parts = path.split(".")
     current = data
     for part in parts:
-        if isinstance(current, dict):
-            current = current[part]
+        if isinstance(current, Mapping):
+            current = _deref(current[part])
         elif isinstance(current, (list, tuple)):
-            current = current[int(part)]
+            current = _deref(current[int(part)])
         else:
             raise KeyError(f"Cannot navigate into {type(current).__name__} with key {part!r}")
     return current
 
 
-def resolve_templates(obj: Any, scope: dict[str, Any]) -> Any:
+def resolve_templates(obj: Any, scope: Mapping[str, Any]) -> Any:
     if isinstance(obj, str):
         single = _SINGLE_TEMPLATE.match(obj.strip())
         if single:
@@ -43,6 +62,44 @@ def resolve_templates(obj: Any, scope: dict[str, Any]) -> Any:
     return obj
 
 
+async def aresolve_templates(obj: Any, scope: Mapping[str, Any]) -> Any:
+    """``resolve_templates`` for the engine.
+
+    When a template may read an offloaded output field, it is resolved in a
+    thread so loading the artifact does not block the event loop.  The thread
+    gets a shallow copy of ``scope``, which other steps keep adding to.
+    """
+    if _reads_lazy_ref(obj, scope):
+        return await asyncio.to_thread(resolve_templates, obj, dict(scope))
+    return resolve_templates(obj, scope)
+
+
+def _reads_lazy_ref(obj: Any, scope: Mapping[str, Any]) -> bool:
+    # Offloading puts references at the top level of step outputs, so only the
+    # scope entries a template names, and their fields, can hold one.
+    for name in _template_names(obj):
+        value = scope.get(name)
+        if is_lazy_ref(value) or (
+            isinstance(value, Mapping) and any(is_lazy_ref(v) for v in value.values())
+        ):
+            return True
+    return False
+
+
+def _template_names(obj: Any) -> set[str]:
+    """Every identifier in the templated strings of ``obj``: a superset of the names they read."""
+    if isinstance(obj, str):
+        return set(_NAME.findall(obj)) if _HAS_TEMPLATE.search(obj) else set()
+    names: set[str] = set()
+    if isinstance(obj, dict):
+        for v in obj.values():
+            names |= _template_names(v)
+    elif isinstance(obj, list):
+        for item in obj:
+            names |= _template_names(item)
+    return names
+
+
 def extract_template_refs(obj: Any) -> set[str]:
     refs: set[str] = set()
     if isinstance(obj, str):
@@ -0,0 +1,249 @@
+"""Durable timers for delay steps.
+
+A long ``delay`` step no longer sleeps inside the engine.  The engine marks
+the step ``waiting`` with its ``due_at``, pauses the run and stores the
+earliest ``due_at`` on the ``wf_runs`` row (an indexed column), so nothing
+is held in memory while the run sleeps and a restart loses nothing.
+
+``TimerService`` wakes the runs back up:
+
+    - every ``poll_interval_seconds`` it reads the paused runs due within
+      ``lookahead_seconds`` through the ``due_at`` index
+    - those go into a hierarchical ``TimingWheel``, which fires them on the
+      tick they are due without a task or heap entry per timer
+    - a fired run is checked against the database (it may have been resumed
+      or cancelled meanwhile), set back to ``running`` and handed to the engine
+
+Runs due further out stay in the database until a later poll picks them up.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from app.config import TimerSettings, settings
+from app.events.types import EventType
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Coroutine
+
+logger = structlog.get_logger(__name__)
+
+
+class TimingWheel:
+    """Hierarchical timing wheel keyed by id.
+
+    Level ``n`` has ``slots`` buckets of ``tick * slots**n`` seconds each, so
+    three levels of 64 one-second slots cover about three days.  Adding or
+    cancelling a timer is O(1); a timer is moved down a level each time its
+    bucket comes round, and fires from level 0 on its exact tick.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 3, start: float = 0.0) -> None:
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._now = math.floor(start / tick)
+        self._wheels: list[list[dict[str, int]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._where: dict[str, tuple[int, int]] = {}
+        self._expired: list[str] = []
+
+    @property
+    def horizon(self) -> float:
+        """How far ahead, in seconds, a timer can be placed."""
+        return self.tick * self.slots**self.levels
+
+    def __len__(self) -> int:
+        return len(self._where) + len(self._expired)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._where or key in self._expired
+
+    def add(self, key: str, due: float) -> bool:
+        """Schedule ``key`` at timestamp ``due``; False if that is beyond the horizon.
+
+        Re-adding a key moves it.
+        """
+        self.cancel(key)
+        return self._place(key, math.ceil(due / self.tick))
+
+    def cancel(self, key: str) -> None:
+        where = self._where.pop(key, None)
+        if where is not None:
+            level, slot = where
+            del self._wheels[level][slot][key]
+        elif key in self._expired:
+            self._expired.remove(key)
+
+    def advance(self, now: float) -> list[str]:
+        """Move the wheel to timestamp ``now``; returns the keys that came due."""
+        target = math.floor(now / self.tick)
+        while self._now < target:
+            self._now += 1
+            # Cascade higher levels whose bucket has come round, top down.
+            for level in range(self.levels - 1, 0, -1):
+                span = self.slots**level
+                if self._now % span == 0:
+                    self._cascade(level, (self._now // span) % self.slots)
+            self._cascade(0, self._now % self.slots)
+        expired, self._expired = self._expired, []
+        return expired
+
+    def _place(self, key: str, due_tick: int) -> bool:
+        delta = due_tick - self._now
+        if delta <= 0:
+            self._expired.append(key)
+            return True
+        for level in range(self.levels):
+            if delta < self.slots ** (level + 1):
+                slot = (due_tick // self.slots**level) % self.slots
+                self._wheels[level][slot][key] = due_tick
+                self._where[key] = (level, slot)
+                return True
+        return False
+
+    def _cascade(self, level: int, slot: int) -> None:
+        bucket = self._wheels[level][slot]
+        self._wheels[level][slot] = {}
+        for key, due_tick in bucket.items():
+            del self._where[key]
+            self._place(key, due_tick)
+
+
+async def _launch_engine(run_id: str) -> None:
+    from app.engine.executor import WorkflowEngine
+
+    await WorkflowEngine().execute_run(run_id)
+
+
+class TimerService:
+    def __init__(
+        self,
+        config: TimerSettings | None = None,
+        launch: Callable[[str], Awaitable[None]] | None = None,
+    ) -> None:
+        self._config = config or settings.timers
+        self._launch = launch or _launch_engine
+        self._wheel = TimingWheel(
+            self._config.tick_seconds,
+            self._config.wheel_slots,
+            self._config.wheel_levels,
+            start=time.time(),
+        )
+        self._task: asyncio.Task[None] | None = None
+        self._background: set[asyncio.Task[Any]] = set()
+        self._next_poll = 0.0
+        self.polls = 0
+        self.fired = 0
+        self.resumed = 0
+
+    @property
+    def inline_delay_seconds(self) -> float:
+        return self._config.inline_delay_seconds
+
+    def schedule(self, run_id: str, due_at: datetime) -> None:
+        """Track a run the engine just suspended; later timers are left to the poll."""
+        due = due_at.timestamp()
+        if due - time.time() <= self._config.lookahead_seconds:
+            self._wheel.add(run_id, due)
+
+    def cancel(self, run_id: str) -> None:
+        self._wheel.cancel(run_id)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def aclose(self) -> None:
+        tasks = [*self._background, *([self._task] if self._task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def poll(self, now: float | None = None) -> int:
+        """Load the paused runs due within the lookahead into the wheel."""
+        from app.db.custom import wf_core
+
+        now = time.time() if now is None else now
+        before = datetime.fromtimestamp(now + self._config.lookahead_seconds, UTC)
+        due_runs = await wf_core.get_due_runs(before)
+        for run_id, due_at in due_runs:
+            self._wheel.add(run_id, due_at.timestamp())
+        self.polls += 1
+        return len(due_runs)
+
+    def tick(self, now: float | None = None) -> list[str]:
+        """Advance the wheel and start waking every run that came due."""
+        due = self._wheel.advance(time.time() if now is None else now)
+        for run_id in due:
+            self._spawn(self.fire(run_id))
+        return due
+
+    async def fire(self, run_id: str) -> bool:
+        """Resume ``run_id`` if it is still paused on a timer that is due."""
+        from app.db.custom import wf_core
+
+        self.fired += 1
+        run = await wf_core.get_run(run_id)
+        if run is None or run.status != "paused" or run.due_at is None:
+            return False
+        due = run.due_at.timestamp()
+        if due > time.time() + self._config.tick_seconds:
+            # Re-suspended for later since it was loaded.
+            self.schedule(run_id, run.due_at)
+            return False
+
+        # Only the claim moves the run: an approval, event or cancel may have
+        # got there since it was read, and then this timer has nothing to do.
+        if not await wf_core.claim_paused_runs([run_id]):
+            return False
+        await wf_core.create_run_event(
+            run_id, EventType.RUN_RESUMED, None, {"status": "running", "resumed_by": "timer"}
+        )
+        self.resumed += 1
+        logger.info("Timer resumed run", run_id=run_id, late_ms=int((time.time() - due) * 1000))
+        await self._launch(run_id)
+        return True
+
+    async def _loop(self) -> None:
+        while True:
+            now = time.time()
+            if now >= self._next_poll:
+                self._next_poll = now + self._config.poll_interval_seconds
+                try:
+                    await self.poll(now)
+                except Exception:
+                    logger.exception("Timer poll failed")
+            self.tick()
+            await asyncio.sleep(self._config.tick_seconds)
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task[Any]) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Timer wake-up failed", exc_info=task.exception())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._wheel),
+            "horizon_seconds": self._wheel.horizon,
+            "polls": self.polls,
+            "fired": self.fired,
+            "resumed": self.resumed,
+            "in_flight": len(self._background),
+        }
+
+
+timer_service = TimerService()
@@ -0,0 +1,4 @@
+from app.http.cache import HttpResponseCache, http_response_cache
+from app.http.pool import HttpClientPool, http_pool
+
+__all__ = ["HttpClientPool", "HttpResponseCache", "http_pool", "http_response_cache"]
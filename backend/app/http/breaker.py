@@ -0,0 +1,179 @@
+"""Per-host circuit breaker for outbound HTTP.
+
+Without a breaker, every run keeps calling a downed upstream, waits out its
+timeout, retries and holds concurrency the whole time.  A ``CircuitBreaker``
+tracks call outcomes for one host over a sliding time window:
+
+    closed     calls flow; once ``min_calls`` calls in the window fail at
+               ``failure_rate`` or more, the circuit opens
+    open       calls fail immediately with ``CircuitOpenError`` until
+               ``open_seconds`` have passed
+    half_open  up to ``half_open_calls`` probe calls go through; a success
+               closes the circuit, a failure re-opens it
+
+Transport errors and 5xx responses count as failures.  429s do not; the rate
+limiter handles those.  At most ``breaker_max_hosts`` breakers are kept,
+dropping the least recently used idle ones.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from enum import StrEnum
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from app.engine.exceptions import CircuitOpenError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from app.config import HttpClientSettings
+
+logger = structlog.get_logger(__name__)
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        host: str,
+        config: HttpClientSettings,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.host = host
+        self._config = config
+        self._clock = clock
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.state = CircuitState.CLOSED
+        self.short_circuited = 0
+        self.transitions = 0
+
+    def before_call(self) -> None:
+        """Raise ``CircuitOpenError`` if the call must not go out."""
+        if self.state is CircuitState.OPEN:
+            remaining = self._opened_at + self._config.breaker_open_seconds - self._clock()
+            if remaining > 0:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.host, remaining)
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state is CircuitState.HALF_OPEN:
+            if self._probes >= self._config.breaker_half_open_calls:
+                self.short_circuited += 1
+                raise CircuitOpenError(self.host, 0.0)
+            self._probes += 1
+
+    def record(self, success: bool) -> None:
+        if self.state is CircuitState.HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            self._transition(CircuitState.CLOSED if success else CircuitState.OPEN)
+            return
+
+        now = self._clock()
+        self._outcomes.append((now, success))
+        if not success:
+            self._failures += 1
+        self._trim(now)
+
+        if self.state is CircuitState.CLOSED and self._tripped():
+            self._transition(CircuitState.OPEN)
+
+    @property
+    def idle(self) -> bool:
+        """Closed with no failure in the window, so a fresh breaker would act the same."""
+        if self.state is not CircuitState.CLOSED:
+            return False
+        self._trim(self._clock())
+        return self._failures == 0
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe whose call ended without an outcome."""
+        if self.state is CircuitState.HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self._config.breaker_window_seconds
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            _, ok = self._outcomes.popleft()
+            if not ok:
+                self._failures -= 1
+
+    def _tripped(self) -> bool:
+        calls = len(self._outcomes)
+        return (
+            calls >= self._config.breaker_min_calls
+            and self._failures / calls >= self._config.breaker_failure_rate
+        )
+
+    def _transition(self, state: CircuitState) -> None:
+        previous, self.state = self.state, state
+        self.transitions += 1
+        self._probes = 0
+        if state is CircuitState.OPEN:
+            self._opened_at = self._clock()
+        if state is not CircuitState.HALF_OPEN:
+            self._outcomes.clear()
+            self._failures = 0
+        log = logger.warning if state is CircuitState.OPEN else logger.info
+        log("circuit_state_changed", host=self.host, previous=str(previous), state=str(state))
+
+    def stats(self) -> dict[str, Any]:
+        calls = len(self._outcomes)
+        return {
+            "state": str(self.state),
+            "calls_in_window": calls,
+            "failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+            "short_circuited": self.short_circuited,
+            "transitions": self.transitions,
+        }
+
+
+class CircuitBreakerRegistry:
+    """One ``CircuitBreaker`` per destination host."""
+
+    def __init__(self, config: HttpClientSettings) -> None:
+        self._config = config
+        self._breakers: OrderedDict[str, CircuitBreaker] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.breaker_enabled
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(host, self._config)
+            self._evict()
+        else:
+            self._breakers.move_to_end(host)
+        return breaker
+
+    def _evict(self) -> None:
+        excess = len(self._breakers) - self._config.breaker_max_hosts
+        if excess <= 0:
+            return
+        # Oldest first; an open or failing circuit keeps its place, or it would reset.
+        victims: list[str] = []
+        for host, breaker in self._breakers.items():
+            if breaker.idle:
+                victims.append(host)
+                if len(victims) == excess:
+                    break
+        for host in victims:
+            del self._breakers[host]
+
+    def clear(self) -> None:
+        self._breakers.clear()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {host: breaker.stats() for host, breaker in self._breakers.items()}
@@ -0,0 +1,231 @@
+"""Opt-in HTTP response cache for ``http_request`` steps.
+
+Workflows that poll reference endpoints (pricing tables, config JSON) on
+every run can set ``cache: true`` (or ``{"ttl_seconds": N}``) on the step.
+Only GET responses are stored, following the origin's headers:
+
+    - ``Cache-Control: no-store`` is never stored
+    - ``max-age`` / ``Expires`` set freshness; ``no-cache`` forces revalidation
+    - stale entries with an ``ETag`` / ``Last-Modified`` are revalidated with
+      ``If-None-Match`` / ``If-Modified-Since``; a 304 refreshes the entry
+    - without any freshness header, ``ttl_seconds`` from the step applies
+
+Entries are keyed by method, URL and request headers, and the local tier is
+an LRU bounded by entry count and total body bytes.  An optional shared tier
+can be injected via the ``SharedResponseCache`` protocol; the local LRU is
+always consulted first.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Protocol
+
+import structlog
+
+from app.config import HttpClientSettings, settings
+from app.serialization import dumps
+
+logger = structlog.get_logger(__name__)
+
+CACHEABLE_METHODS = frozenset({"GET"})
+
+
+class SharedResponseCache(Protocol):
+    """Protocol for a shared (cross-process) cache tier.  Inject a mock for tests."""
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+def cache_key(method: str, url: str, headers: dict[str, str] | None = None) -> str:
+    canonical = dumps(
+        [method.upper(), url, sorted((k.lower(), v) for k, v in (headers or {}).items())]
+    )
+    return "http:" + hashlib.sha256(canonical).hexdigest()
+
+
+def _cache_control(headers: dict[str, str]) -> dict[str, str | None]:
+    directives: dict[str, str | None] = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: dict[str, str], default_ttl: float | None) -> float | None:
+    """Seconds a response stays fresh, 0 for "always revalidate", None if not storable."""
+    directives = _cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    max_age = directives.get("max-age")
+    if max_age is not None and max_age.isdigit():
+        return float(max_age)
+    if "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"]).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+        return max(expires - time.time(), 0.0)
+    if default_ttl is not None:
+        return float(default_ttl)
+    if "etag" in headers or "last-modified" in headers:
+        return 0.0
+    return None
+
+
+class CachedResponse:
+    __slots__ = ("body", "encoding", "headers", "lifetime", "status_code", "stored_at")
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: dict[str, str],
+        body: bytes,
+        encoding: str,
+        lifetime: float,
+        stored_at: float | None = None,
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.encoding = encoding
+        self.lifetime = lifetime
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    @property
+    def age(self) -> float:
+        return max(time.time() - self.stored_at, 0.0)
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < self.lifetime
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def refresh(self, headers: dict[str, str], default_ttl: float | None) -> None:
+        """Apply a 304's headers: new validators / freshness, same body."""
+        for name in ("cache-control", "expires", "etag", "last-modified", "date"):
+            if name in headers:
+                self.headers[name] = headers[name]
+        self.lifetime = freshness_lifetime(self.headers, default_ttl) or 0.0
+        self.stored_at = time.time()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CachedResponse:
+        return cls(**data)
+
+
+class HttpResponseCache:
+    """Bounded LRU of ``CachedResponse`` by entry count and body bytes."""
+
+    def __init__(
+        self,
+        config: HttpClientSettings | None = None,
+        shared: SharedResponseCache | None = None,
+    ) -> None:
+        self._config = config or settings.http_client
+        self._shared = shared
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def record(self, status: str) -> None:
+        if status == "hit":
+            self.hits += 1
+        elif status == "revalidated":
+            self.revalidations += 1
+        elif status == "miss":
+            self.misses += 1
+
+    async def get(self, key: str) -> CachedResponse | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self._shared is not None:
+            try:
+                data = await self._shared.get(key)
+            except Exception:
+                logger.exception("Shared response cache read failed")
+                data = None
+            if data is not None:
+                entry = CachedResponse.from_dict(data)
+                self._store_local(key, entry)
+                return entry
+        return None
+
+    async def put(self, key: str, entry: CachedResponse) -> bool:
+        """Store ``entry``; returns False if it is too large to cache."""
+        if len(entry.body) > self._config.cache_max_entry_bytes:
+            return False
+        self._store_local(key, entry)
+        if self._shared is not None:
+            try:
+                await self._shared.set(key, entry.to_dict())
+            except Exception:
+                logger.exception("Shared response cache write failed")
+        return True
+
+    def _store_local(self, key: str, entry: CachedResponse) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous.body)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._entries and (
+            len(self._entries) > self._config.cache_max_entries
+            or self._bytes > self._config.cache_max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+
+    async def invalidate(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+        if self._shared is not None:
+            try:
+                await self._shared.delete(key)
+            except Exception:
+                logger.exception("Shared response cache delete failed")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self._config.cache_max_entries,
+            "max_bytes": self._config.cache_max_bytes,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+        }
+
+
+http_response_cache = HttpResponseCache()
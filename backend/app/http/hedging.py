@@ -0,0 +1,120 @@
+"""Hedged requests for idempotent, tail-latency-sensitive calls.
+
+A hedged request sends the primary call and, if it has not finished after a
+delay (by default the host's observed p95 latency), sends one duplicate and
+takes whichever returns first; the loser is cancelled.  A ``HedgeBudget``
+caps duplicates to a fraction of requests so hedging cannot multiply load on
+an upstream that is slow for everyone.
+
+Only safe methods (GET, HEAD, OPTIONS) are hedged by default; PUT, DELETE
+or anything else is hedged only when the caller declares the request
+idempotent (``hedge={"idempotent": True}``), since a duplicate of a write
+that is not idempotent in practice is a second write.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+# Methods hedged without an explicit opt-in.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Latency samples kept per host for the percentile estimate.
+LATENCY_SAMPLES = 256
+# Below this many samples the configured default delay is used instead.
+MIN_SAMPLES = 20
+
+
+class LatencyTracker:
+    """Recent request latencies per host."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES) -> None:
+        self._samples = samples
+        self._latencies: dict[str, deque[float]] = {}
+
+    def record(self, host: str, seconds: float) -> None:
+        window = self._latencies.get(host)
+        if window is None:
+            window = self._latencies[host] = deque(maxlen=self._samples)
+        window.append(seconds)
+
+    def percentile(self, host: str, pct: float) -> float | None:
+        window = self._latencies.get(host)
+        if not window or len(window) < MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def clear(self) -> None:
+        self._latencies.clear()
+
+
+class HedgeBudget:
+    """Allows at most ``ratio`` hedges per hedge-eligible request (plus a small burst)."""
+
+    def __init__(self, ratio: float, burst: int = 2) -> None:
+        self._ratio = ratio
+        self._burst = burst
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def on_request(self) -> None:
+        self.requests += 1
+
+    def try_spend(self) -> bool:
+        if self.hedges >= self.requests * self._ratio + self._burst:
+            return False
+        self.hedges += 1
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        return {"requests": self.requests, "hedges": self.hedges, "hedge_wins": self.wins}
+
+
+async def hedged[T](
+    send: Callable[[], Awaitable[T]],
+    delay: float,
+    budget: HedgeBudget,
+) -> tuple[T, dict[str, Any]]:
+    """Run ``send`` and, after ``delay`` seconds, a duplicate if the budget allows.
+
+    Returns the first successful response and hedge metadata.  If the first
+    attempt to finish failed, the other attempt's outcome is used.
+    """
+    budget.on_request()
+    started = time.monotonic()
+    primary = asyncio.ensure_future(send())
+    attempts = {primary: "primary"}
+    meta: dict[str, Any] = {"hedged": False, "delay_ms": round(delay * 1000, 1), "winner": "primary"}
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not budget.try_spend():
+            if not done:
+                meta["budget_exhausted"] = True
+            return await primary, meta
+
+        meta["hedged"] = True
+        attempts[asyncio.ensure_future(send())] = "hedge"
+        pending = set(attempts)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded or not pending:
+                winner = succeeded[0] if succeeded else next(iter(done))
+                meta["winner"] = attempts[winner]
+                meta["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+                if meta["winner"] == "hedge":
+                    budget.wins += 1
+                return winner.result(), meta
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
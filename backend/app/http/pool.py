@@ -0,0 +1,247 @@
+"""Process-wide pooled HTTP client for integration steps.
+
+Opening an ``httpx.AsyncClient`` per step execution pays DNS, TCP and TLS
+setup on every call and never reuses keep-alive connections.  ``HttpClientPool``
+owns one long-lived client (optionally HTTP/2) for the whole process and adds a
+per-host limiter (token bucket plus adaptive concurrency, see
+``app.http.ratelimit``) on top of httpx's global connection limits, so one slow
+or rate-limited upstream cannot take every connection in the pool, and a
+per-host circuit breaker (``app.http.breaker``) so a downed upstream fails
+calls in microseconds instead of timeouts.
+
+The FastAPI lifespan opens and closes the module singleton ``http_pool``;
+anything else (scripts, tests) gets a lazily-created client on first use.
+Inject a pool built on ``httpx.MockTransport`` for tests.
+"""
+from __future__ import annotations
+
+import importlib.util
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
+
+import httpx
+import structlog
+
+from app.config import HttpClientSettings, settings
+from app.http.breaker import CircuitBreakerRegistry
+from app.http.hedging import IDEMPOTENT_METHODS, HedgeBudget, LatencyTracker, hedged
+from app.http.ratelimit import RateLimiter
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Awaitable, Callable
+
+logger = structlog.get_logger(__name__)
+
+
+def host_key(url: httpx.URL | str) -> str:
+    """Return the ``host:port`` origin a request is limited under."""
+    url = httpx.URL(url)
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return f"{url.host}:{port}"
+
+
+class HttpClientPool:
+    def __init__(
+        self,
+        config: HttpClientSettings | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self._config = config or settings.http_client
+        self._injected_transport = transport
+        self._transport: httpx.AsyncBaseTransport | None = None
+        self._client: httpx.AsyncClient | None = None
+        self.limiter = RateLimiter(self._config)
+        self.breakers = CircuitBreakerRegistry(self._config)
+        self.latencies = LatencyTracker()
+        self.hedge_budget = HedgeBudget(self._config.hedge_budget_ratio)
+        self._requests = 0
+        self._errors = 0
+
+    # -- lifecycle -------------------------------------------------------------
+
+    @property
+    def http2(self) -> bool:
+        if not self._config.http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("http2_unavailable", reason="h2 package not installed")
+            return False
+        return True
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> httpx.AsyncClient:
+        cfg = self._config
+        limits = httpx.Limits(
+            max_connections=cfg.max_connections,
+            max_keepalive_connections=cfg.max_keepalive_connections,
+            keepalive_expiry=cfg.keepalive_expiry_seconds,
+        )
+        if self._injected_transport is not None:
+            self._transport = self._injected_transport
+            http2 = False
+        else:
+            http2 = self.http2
+            self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+        logger.info(
+            "http_pool_opened",
+            max_connections=cfg.max_connections,
+            max_connections_per_host=cfg.max_connections_per_host,
+            http2=http2,
+        )
+        return httpx.AsyncClient(
+            transport=self._transport,
+            limits=limits,
+            timeout=httpx.Timeout(30.0, connect=cfg.connect_timeout_seconds),
+        )
+
+    async def start(self) -> None:
+        """Open the underlying client eagerly (called from app / worker startup)."""
+        _ = self.client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            logger.info("http_pool_closed", requests=self._requests)
+        self._client = None
+        self._transport = None
+        self.limiter.clear()
+        self.breakers.clear()
+        self.latencies.clear()
+
+    # -- requests --------------------------------------------------------------
+
+    @asynccontextmanager
+    async def _acquire(
+        self, url: httpx.URL | str, rate_limit: dict[str, Any] | None
+    ) -> AsyncIterator[Callable[[httpx.Response], None]]:
+        """Pass the host's breaker and limiter; yields a callback for the response."""
+        key = host_key(url)
+        breaker = self.breakers.breaker(key) if self.breakers.enabled else None
+        if breaker is not None:
+            breaker.before_call()
+        recorded = False
+
+        try:
+            async with self.limiter.slot(key, rate_limit) as limiter:
+
+                def observe(response: httpx.Response) -> None:
+                    nonlocal recorded
+                    limiter.observe(response)
+                    if breaker is not None:
+                        breaker.record(response.status_code < 500)
+                        recorded = True
+
+                self._requests += 1
+                try:
+                    yield observe
+                except httpx.HTTPError as exc:
+                    self._errors += 1
+                    if breaker is not None and not recorded and isinstance(exc, httpx.TransportError):
+                        breaker.record(False)
+                        recorded = True
+                    raise
+        finally:
+            if breaker is not None and not recorded:
+                breaker.release_probe()
+
+    async def request(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        rate_limit: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send a request through the shared client.  Accepts ``httpx`` request kwargs.
+
+        ``rate_limit`` optionally overrides the host's token bucket and scopes
+        it (see ``app.http.ratelimit``).
+        """
+        async with self._acquire(url, rate_limit) as observe:
+            started = time.monotonic()
+            response = await self.client.request(method, url, **kwargs)
+            self.latencies.record(host_key(url), time.monotonic() - started)
+            observe(response)
+            return response
+
+    async def hedged_request(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        hedge: dict[str, Any] | None = None,
+        send: Callable[[], Awaitable[Any]] | None = None,
+        **kwargs: Any,
+    ) -> tuple[Any, dict[str, Any]]:
+        """Send a request that may be duplicated to cut tail latency.
+
+        ``hedge`` accepts ``delay_ms`` (fixed delay) or ``percentile`` (of the
+        host's recent latencies), and ``idempotent: True`` to hedge methods
+        other than GET / HEAD / OPTIONS.  ``send`` replaces the default
+        ``self.request(method, url, **kwargs)`` attempt, e.g. to stream the
+        body.  Returns the attempt's result and hedge metadata; other methods
+        are sent once.
+        """
+        hedge = hedge or {}
+        if send is None:
+            def send() -> Awaitable[httpx.Response]:
+                return self.request(method, url, **kwargs)
+
+        if method.upper() not in IDEMPOTENT_METHODS and hedge.get("idempotent") is not True:
+            return await send(), {"hedged": False, "skipped": "non-idempotent method"}
+
+        delay_ms = hedge.get("delay_ms")
+        if delay_ms is None:
+            pct = float(hedge.get("percentile", self._config.hedge_percentile))
+            observed = self.latencies.percentile(host_key(url), pct)
+            delay = self._config.hedge_default_delay_ms / 1000 if observed is None else observed
+        else:
+            delay = float(delay_ms) / 1000
+        return await hedged(send, delay, self.hedge_budget)
+
+    async def post(self, url: httpx.URL | str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        rate_limit: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[httpx.Response]:
+        """Stream a response; the host slot is held until the body is consumed."""
+        async with self._acquire(url, rate_limit) as observe:
+            started = time.monotonic()
+            async with self.client.stream(method, url, **kwargs) as response:
+                observe(response)
+                yield response
+            self.latencies.record(host_key(url), time.monotonic() - started)
+
+    # -- stats -----------------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        connections = getattr(getattr(self._transport, "_pool", None), "connections", [])
+        return {
+            "open": self._client is not None and not self._client.is_closed,
+            "requests": self._requests,
+            "errors": self._errors,
+            "connections": {
+                "total": len(connections),
+                "idle": sum(1 for c in connections if c.is_idle()),
+                "http2": sum(1 for c in connections if "HTTP/2" in repr(c)),
+            },
+            "hosts": self.limiter.stats(),
+            "breakers": self.breakers.stats(),
+            "hedging": self.hedge_budget.stats(),
+        }
+
+
+http_pool = HttpClientPool()
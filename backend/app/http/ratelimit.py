@@ -0,0 +1,244 @@
+"""Per-host rate limiting and adaptive (AIMD) concurrency for outbound HTTP.
+
+Every destination host gets a ``HostLimiter`` combining:
+
+    - a token bucket capping the request rate (disabled when rate is 0)
+    - an AIMD concurrency gate: each successful response adds ``1 / limit``
+      to the limit (about +1 per round of requests); a 429 or 5xx halves it,
+      at most once per cooldown so a burst of failures counts once
+    - a ``Retry-After`` pause that holds every new request to the host
+
+so throughput converges on what each upstream sustains instead of burning
+retries against its rate limit.  Limiters are keyed by ``scope:host`` and, when
+it differs from the default, the policy's rate and burst; steps pass
+``rate_limit: {"scope": ..., "requests_per_second": ..., "burst": ...}`` in
+their config to give a workflow or org its own budget for a host.  At most
+``rate_limit_max_hosts`` limiters are kept, dropping the least recently used
+idle ones.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import UTC
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable
+
+    import httpx
+
+    from app.config import HttpClientSettings
+
+# Upper bound on how long a single Retry-After may pause a host.
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+
+def parse_retry_after(value: str | None, now: Callable[[], float] = time.time) -> float | None:
+    """Return the delay in seconds encoded by a ``Retry-After`` header."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=UTC)
+        seconds = when.timestamp() - now()
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+def is_overload(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of rejecting callers."""
+
+    def __init__(
+        self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait for it."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit with an awaitable gate."""
+
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        decrease_factor: float = 0.5,
+        cooldown_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maximum = max(maximum, 1)
+        self.minimum = max(min(minimum, self.maximum), 1)
+        self.limit = float(self.maximum)
+        self._decrease_factor = decrease_factor
+        self._cooldown = cooldown_seconds
+        self._clock = clock
+        self._last_decrease = float("-inf")
+        self._condition = asyncio.Condition()
+        self.in_flight = 0
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+
+    def on_overload(self) -> None:
+        now = self._clock()
+        if now - self._last_decrease < self._cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self._decrease_factor)
+
+
+class HostLimiter:
+    def __init__(self, config: HttpClientSettings, rate: float, burst: float) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(
+            maximum=config.max_connections_per_host,
+            minimum=config.min_connections_per_host,
+        )
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.requests = 0
+        self.throttled = 0
+
+    async def acquire(self) -> None:
+        self.waiting += 1
+        try:
+            delay = self.bucket.reserve()
+            delay = max(delay, self.blocked_until - time.monotonic())
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.concurrency.acquire()
+        finally:
+            self.waiting -= 1
+        self.requests += 1
+
+    async def release(self) -> None:
+        await self.concurrency.release()
+
+    @property
+    def idle(self) -> bool:
+        """No request in flight or waiting, and no Retry-After pause pending."""
+        return (
+            self.concurrency.in_flight == 0
+            and self.waiting == 0
+            and self.blocked_until <= time.monotonic()
+        )
+
+    def observe(self, response: httpx.Response) -> None:
+        """Feed a response back into the AIMD limit and Retry-After pause."""
+        if not is_overload(response.status_code):
+            self.concurrency.on_success()
+            return
+        self.throttled += 1
+        self.concurrency.on_overload()
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "rate_per_second": self.bucket.rate,
+            "blocked_for_seconds": round(max(self.blocked_until - time.monotonic(), 0.0), 3),
+        }
+
+
+class RateLimiter:
+    """Bounded LRU registry of ``HostLimiter`` objects keyed by ``scope:host`` and policy."""
+
+    def __init__(self, config: HttpClientSettings) -> None:
+        self._config = config
+        self._limiters: OrderedDict[str, HostLimiter] = OrderedDict()
+
+    def limiter(self, host: str, policy: dict[str, Any] | None = None) -> HostLimiter:
+        policy = policy or {}
+        scope = policy.get("scope")
+        key = f"{scope}:{host}" if scope else host
+        rate = float(policy.get("requests_per_second", self._config.rate_limit_per_second))
+        burst = float(policy.get("burst", self._config.rate_limit_burst))
+        if (rate, burst) != (self._config.rate_limit_per_second, self._config.rate_limit_burst):
+            # Policies never reconfigure each other's buckets.
+            key = f"{key}@{rate:g}/{burst:g}"
+
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = HostLimiter(self._config, rate, burst)
+            self._evict()
+        else:
+            self._limiters.move_to_end(key)
+        return limiter
+
+    def _evict(self) -> None:
+        excess = len(self._limiters) - self._config.rate_limit_max_hosts
+        if excess <= 0:
+            return
+        # Oldest first; a limiter in use keeps its place, or its gate would be lost.
+        victims: list[str] = []
+        for key, limiter in self._limiters.items():
+            if limiter.idle:
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        for key in victims:
+            del self._limiters[key]
+
+    @asynccontextmanager
+    async def slot(
+        self, host: str, policy: dict[str, Any] | None = None
+    ) -> AsyncIterator[HostLimiter]:
+        limiter = self.limiter(host, policy)
+        await limiter.acquire()
+        try:
+            yield limiter
+        finally:
+            await limiter.release()
+
+    def clear(self) -> None:
+        self._limiters.clear()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {key: limiter.stats() for key, limiter in self._limiters.items()}
@@ -0,0 +1,76 @@
+"""Size-capped streaming reads of HTTP response bodies.
+
+``read_capped`` pulls a streamed ``httpx.Response`` chunk by chunk so a large
+download never sits in memory whole:
+
+    - a ``Content-Length`` above ``max_bytes`` aborts before any body is read
+    - a body that grows past ``max_bytes`` aborts mid-stream
+    - with ``spill_over`` set, a body larger than that many bytes is written
+      to the artifact store as it arrives and only a reference is returned
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from app.engine.exceptions import NonRetriableError
+
+if TYPE_CHECKING:
+    import httpx
+
+    from app.artifacts.store import ArtifactStore, ArtifactWriter
+
+
+class ResponseTooLargeError(NonRetriableError):
+    def __init__(self, url: str, max_bytes: int) -> None:
+        self.url = url
+        self.max_bytes = max_bytes
+        super().__init__(f"Response from {url} exceeds the {max_bytes} byte limit")
+
+
+class StreamedBody:
+    __slots__ = ("artifact", "content", "size")
+
+    def __init__(
+        self, content: bytes | None, size: int, artifact: dict[str, Any] | None = None
+    ) -> None:
+        self.content = content
+        self.size = size
+        self.artifact = artifact
+
+
+async def read_capped(
+    response: httpx.Response,
+    max_bytes: int,
+    spill_over: int | None = None,
+    store: ArtifactStore | None = None,
+) -> StreamedBody:
+    url = str(response.request.url)
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ResponseTooLargeError(url, max_bytes)
+
+    buffer = bytearray()
+    writer: ArtifactWriter | None = None
+    size = 0
+    try:
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLargeError(url, max_bytes)
+            if writer is not None:
+                await writer.awrite(chunk)
+                continue
+            buffer += chunk
+            if spill_over is not None and store is not None and len(buffer) > spill_over:
+                content_type = response.headers.get("content-type", "application/octet-stream")
+                writer = store.open_writer(content_type)
+                await writer.awrite(bytes(buffer))
+                buffer.clear()
+    except BaseException:
+        if writer is not None:
+            await writer.aabort()
+        raise
+
+    if writer is not None:
+        return StreamedBody(None, size, await writer.acommit())
+    return StreamedBody(bytes(buffer), size)
@@ -0,0 +1,4 @@
+from app.mail.pool import SmtpPool, SmtpPoolRegistry, smtp_pools
+from app.mail.smtp import SmtpError
+
+__all__ = ["SmtpError", "SmtpPool", "SmtpPoolRegistry", "smtp_pools"]
@@ -0,0 +1,210 @@
+"""Pooled SMTP delivery for ``send_email``.
+
+Each provider (the default ``SMTP_*`` relay plus any named entry in
+``SMTP_PROVIDERS``) gets an ``SmtpPool``:
+
+    - up to ``pool_size`` persistent connections, reused LIFO so a warm
+      connection serves the next message; a connection is recycled after
+      ``max_messages_per_connection`` messages or ``idle_timeout_seconds``
+    - a token bucket capping the provider's messages per second
+    - ``send_many`` delivering a batch over every pooled connection at once
+
+The FastAPI lifespan closes the module singleton ``smtp_pools``.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.policy import SMTP
+from email.utils import getaddresses, make_msgid
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from app.config import SmtpSettings, settings
+from app.http.ratelimit import TokenBucket
+from app.mail.smtp import SmtpConnection, SmtpError
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterable
+    from email.message import EmailMessage
+
+logger = structlog.get_logger(__name__)
+
+
+def envelope(message: EmailMessage) -> tuple[str, list[str]]:
+    """Return the envelope sender and recipients (To, Cc and Bcc) of ``message``."""
+    sender = getaddresses([message.get("Sender") or message.get("From") or ""])[0][1]
+    recipients = [
+        addr
+        for _, addr in getaddresses(
+            [value for field in ("To", "Cc", "Bcc") for value in message.get_all(field, [])]
+        )
+        if addr
+    ]
+    return sender, recipients
+
+
+class SmtpPool:
+    def __init__(self, config: SmtpSettings, name: str = "default") -> None:
+        self.name = name
+        self._config = config
+        self._idle: list[SmtpConnection] = []
+        self._slots = asyncio.Semaphore(max(1, config.pool_size))
+        self._bucket = TokenBucket(config.rate_limit_per_second, config.rate_limit_burst)
+        self._open = 0
+        self.connects = 0
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._config.host)
+
+    @property
+    def from_address(self) -> str:
+        return self._config.from_address
+
+    # -- connections -----------------------------------------------------------
+
+    def _reusable(self, conn: SmtpConnection) -> bool:
+        cfg = self._config
+        return (
+            not conn.closed
+            and conn.messages_sent < cfg.max_messages_per_connection
+            and time.monotonic() - conn.last_used < cfg.idle_timeout_seconds
+        )
+
+    async def _checkout(self) -> SmtpConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if self._reusable(conn):
+                return conn
+            await self._discard(conn)
+        conn = SmtpConnection(self._config)
+        try:
+            await conn.connect()
+        except BaseException:
+            await conn.close()
+            raise
+        self._open += 1
+        self.connects += 1
+        return conn
+
+    async def _discard(self, conn: SmtpConnection) -> None:
+        self._open -= 1
+        await conn.close()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[SmtpConnection]:
+        """Hold one pooled connection; it is discarded if the transport fails."""
+        async with self._slots:
+            conn = await self._checkout()
+            try:
+                yield conn
+            except SmtpError:
+                # The server refused the transaction but the session is intact.
+                self._idle.append(conn)
+                raise
+            except BaseException:
+                await self._discard(conn)
+                raise
+            if self._reusable(conn):
+                self._idle.append(conn)
+            else:
+                await self._discard(conn)
+
+    # -- delivery --------------------------------------------------------------
+
+    async def send(self, message: EmailMessage) -> dict[str, Any]:
+        """Deliver ``message``; returns its Message-ID and any refused recipients."""
+        if "Message-ID" not in message:
+            message["Message-ID"] = make_msgid()
+        sender, recipients = envelope(message)
+        del message["Bcc"]
+        data = message.as_bytes(policy=SMTP)
+
+        wait = self._bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            async with self.connection() as conn:
+                rejected = await conn.send(sender, recipients, data)
+        except BaseException:
+            self.failed += 1
+            raise
+        self.sent += 1
+        return {"message_id": message["Message-ID"], "rejected": rejected}
+
+    async def send_many(self, messages: Iterable[EmailMessage]) -> list[dict[str, Any] | Exception]:
+        """Deliver a batch over up to ``pool_size`` connections at once.
+
+        Returns one result or exception per message, in order.
+        """
+        messages = list(messages)
+        results: list[dict[str, Any] | Exception] = [None] * len(messages)  # type: ignore[list-item]
+        pending = iter(enumerate(messages))
+
+        async def worker() -> None:
+            for index, message in pending:
+                try:
+                    results[index] = await self.send(message)
+                except Exception as exc:
+                    results[index] = exc
+
+        async with asyncio.TaskGroup() as group:
+            for _ in range(min(self._config.pool_size, len(messages))):
+                group.create_task(worker())
+        return results
+
+    async def aclose(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "host": self._config.host,
+            "pool_size": self._config.pool_size,
+            "open": self._open,
+            "idle": len(self._idle),
+            "connects": self.connects,
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+class SmtpPoolRegistry:
+    """One ``SmtpPool`` per provider, created on first use."""
+
+    def __init__(self, config: SmtpSettings | None = None) -> None:
+        self._config = config or settings.smtp
+        self._pools: dict[str, SmtpPool] = {}
+
+    def pool(self, provider: str | None = None) -> SmtpPool:
+        name = provider or "default"
+        pool = self._pools.get(name)
+        if pool is None:
+            if name == "default":
+                config = self._config
+            elif name in self._config.providers:
+                # Validated, so overrides from JSON get coerced (str port, SecretStr password).
+                config = SmtpSettings.model_validate(
+                    {**self._config.model_dump(), **self._config.providers[name]}
+                )
+            else:
+                raise KeyError(f"Unknown SMTP provider: {name}")
+            pool = self._pools[name] = SmtpPool(config, name)
+        return pool
+
+    async def aclose(self) -> None:
+        for pool in self._pools.values():
+            await pool.aclose()
+        logger.info("smtp_pools_closed", providers=sorted(self._pools))
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+
+smtp_pools = SmtpPoolRegistry()
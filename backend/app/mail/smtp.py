@@ -0,0 +1,211 @@
+"""Minimal asyncio SMTP client for persistent, pipelined connections.
+
+One ``SmtpConnection`` stays open across many messages: it greets once
+(EHLO, optional STARTTLS and AUTH) and then runs a MAIL / RCPT / DATA
+transaction per message.  When the server advertises ``PIPELINING``
+(RFC 2920) the envelope commands of a transaction go out in one write and
+their replies are read back in order, so a message costs two round trips
+instead of ``3 + recipients``.
+
+Server replies that refuse a transaction raise ``SmtpError`` after an RSET,
+leaving the connection reusable; transport failures (``OSError``,
+timeouts) mean the connection is dead and must be discarded.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import re
+import socket
+import ssl
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.config import SmtpSettings
+
+
+class SmtpError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        self.code = code
+        self.message = message
+        super().__init__(f"{code} {message}")
+
+    @property
+    def transient(self) -> bool:
+        """4xx replies are temporary and worth retrying later."""
+        return 400 <= self.code < 500
+
+
+def dot_stuff(data: bytes) -> bytes:
+    """Normalize to CRLF, escape leading dots and append the DATA terminator."""
+    data = re.sub(rb"\r?\n", b"\r\n", data)
+    data = re.sub(rb"(?m)^\.", b"..", data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+
+class SmtpConnection:
+    def __init__(self, config: SmtpSettings) -> None:
+        self._config = config
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self.extensions: dict[str, str] = {}
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def pipelining(self) -> bool:
+        return "pipelining" in self.extensions
+
+    @property
+    def closed(self) -> bool:
+        return self._writer is None or self._writer.is_closing()
+
+    # -- session ---------------------------------------------------------------
+
+    async def connect(self) -> None:
+        cfg = self._config
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                cfg.host, cfg.port, ssl=ssl.create_default_context() if cfg.use_tls else None
+            ),
+            timeout=cfg.timeout_seconds,
+        )
+        code, message = await self._read_reply()
+        if code != 220:
+            raise SmtpError(code, message)
+        await self._ehlo()
+        if cfg.start_tls and not cfg.use_tls and "starttls" in self.extensions:
+            await self._command("STARTTLS", 220)
+            await self._writer.start_tls(ssl.create_default_context(), server_hostname=cfg.host)
+            await self._ehlo()
+        if cfg.username:
+            await self._authenticate()
+
+    async def _ehlo(self) -> None:
+        code, message = await self._send_line(f"EHLO {socket.getfqdn()}")
+        if code != 250:
+            await self._command(f"HELO {socket.getfqdn()}", 250)
+            self.extensions = {}
+            return
+        extensions: dict[str, str] = {}
+        for line in message.splitlines()[1:]:
+            keyword, _, params = line.partition(" ")
+            extensions[keyword.lower()] = params
+        self.extensions = extensions
+
+    async def _authenticate(self) -> None:
+        user = self._config.username
+        password = self._config.password.get_secret_value()
+        mechanisms = self.extensions.get("auth", "").upper().split()
+        if "PLAIN" in mechanisms:
+            token = _b64(f"\0{user}\0{password}")
+            await self._command(f"AUTH PLAIN {token}", 235)
+        elif "LOGIN" in mechanisms:
+            await self._command("AUTH LOGIN", 334)
+            await self._command(_b64(user), 334)
+            await self._command(_b64(password), 235)
+        else:
+            raise SmtpError(504, f"No supported AUTH mechanism in {mechanisms or 'none'}")
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        writer, self._writer = self._writer, None
+        try:
+            if not writer.is_closing():
+                writer.write(b"QUIT\r\n")
+                await asyncio.wait_for(writer.drain(), timeout=1.0)
+            writer.close()
+            await asyncio.wait_for(writer.wait_closed(), timeout=1.0)
+        except (OSError, TimeoutError, ssl.SSLError):
+            pass
+
+    # -- transactions ----------------------------------------------------------
+
+    async def send(self, sender: str, recipients: list[str], data: bytes) -> dict[str, str]:
+        """Deliver one message; returns the recipients the server refused.
+
+        Raises ``SmtpError`` if the sender or every recipient is refused, or
+        the message itself is rejected.
+        """
+        commands = [f"MAIL FROM:<{sender}>", *(f"RCPT TO:<{r}>" for r in recipients), "DATA"]
+        if self.pipelining:
+            replies = await self._pipeline(commands)
+        else:
+            replies = [await self._send_line(commands[0])]
+            if replies[0][0] == 250:
+                for command in commands[1:-1]:
+                    replies.append(await self._send_line(command))
+                if any(code in (250, 251) for code, _ in replies[1:]):
+                    replies.append(await self._send_line("DATA"))
+
+        mail_reply = replies[0]
+        rejected = {
+            rcpt: f"{code} {message}"
+            # Shorter than recipients when MAIL FROM was refused before any RCPT went out.
+            for rcpt, (code, message) in zip(
+                recipients, replies[1 : len(recipients) + 1], strict=False
+            )
+            if code not in (250, 251)
+        }
+        data_reply = replies[-1] if len(replies) == len(commands) else None
+
+        if mail_reply[0] != 250 or len(rejected) == len(recipients):
+            if data_reply is not None and data_reply[0] == 354:
+                # A pipelined DATA was accepted anyway: send an empty body to end it.
+                await self._send_line(".")
+            await self._reset()
+            code, message = mail_reply if mail_reply[0] != 250 else replies[1]
+            raise SmtpError(code, message)
+        if data_reply is None or data_reply[0] != 354:
+            await self._reset()
+            raise SmtpError(*(data_reply or (554, "DATA not accepted")))
+
+        self._writer.write(dot_stuff(data))
+        await self._writer.drain()
+        code, message = await self._read_reply()
+        self.last_used = time.monotonic()
+        if code != 250:
+            raise SmtpError(code, message)
+        self.messages_sent += 1
+        return rejected
+
+    async def _reset(self) -> None:
+        await self._command("RSET", 250)
+
+    # -- wire ------------------------------------------------------------------
+
+    async def _pipeline(self, commands: list[str]) -> list[tuple[int, str]]:
+        self._writer.write("".join(f"{c}\r\n" for c in commands).encode("utf-8"))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in commands]
+
+    async def _command(self, line: str, expect: int) -> str:
+        code, message = await self._send_line(line)
+        if code != expect:
+            raise SmtpError(code, message)
+        return message
+
+    async def _send_line(self, line: str) -> tuple[int, str]:
+        self._writer.write(f"{line}\r\n".encode())
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self) -> tuple[int, str]:
+        lines: list[str] = []
+        while True:
+            raw = await asyncio.wait_for(
+                self._reader.readline(), timeout=self._config.timeout_seconds
+            )
+            if not raw:
+                raise ConnectionResetError("SMTP server closed the connection")
+            lines.append(raw[4:].decode("utf-8", errors="replace").rstrip("\r\n"))
+            if raw[3:4] != b"-":
+                return int(raw[:3]), "\n".join(lines)
+
+
+def _b64(value: str) -> str:
+    return base64.b64encode(value.encode("utf-8")).decode("ascii")
@@ -6,6 +6,13 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.router import router
 from app.config import settings
+from app.db.compression import jsonb_compressor
+from app.engine.correlation import event_correlator
+from app.engine.query_pool import query_pool
+from app.engine.timers import timer_service
+from app.http import http_pool, http_response_cache
+from app.mail import smtp_pools
+from app.sandbox import sandbox_pool
 
 logger = structlog.get_logger(__name__)
 
@@ -13,7 +20,17 @@ logger = structlog.get_logger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up Flow Matrx backend")
+    await http_pool.start()
+    await sandbox_pool.start()
+    await timer_service.start()
+    await event_correlator.start()
     yield
+    await event_correlator.aclose()
+    await timer_service.aclose()
+    await http_pool.aclose()
+    await smtp_pools.aclose()
+    await query_pool.aclose()
+    await sandbox_pool.aclose()
     logger.info("Shutting down Flow Matrx backend")
 
 
@@ -38,3 +55,23 @@ app.include_router(router, prefix="/api/v1")
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/http-pool")
+async def http_pool_stats():
+    return {**http_pool.stats(), "response_cache": http_response_cache.stats()}
+
+
+@app.get("/health/timers")
+async def timer_stats():
+    return timer_service.stats()
+
+
+@app.get("/health/event-correlation")
+async def event_correlation_stats():
+    return event_correlator.stats()
+
+
+@app.get("/health/jsonb-compression")
+async def jsonb_compression_stats():
+    return jsonb_compressor.stats()
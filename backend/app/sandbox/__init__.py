@@ -0,0 +1,15 @@
+from app.sandbox.pool import (
+    SandboxError,
+    SandboxLimitExceededError,
+    SandboxPool,
+    SandboxTimeoutError,
+    sandbox_pool,
+)
+
+__all__ = [
+    "SandboxError",
+    "SandboxLimitExceededError",
+    "SandboxPool",
+    "SandboxTimeoutError",
+    "sandbox_pool",
+]
@@ -0,0 +1,239 @@
+"""Pre-warmed worker processes for ``inline_code``.
+
+Running snippets with ``exec`` in the event loop's thread pool let CPU-heavy
+code hold the GIL and stall every other run, and a timed-out thread kept
+running forever.  ``SandboxPool`` instead keeps ``workers`` separate Python
+processes warm (see ``app.sandbox.worker`` for the framed IPC protocol):
+
+    - a snippet runs in one worker at a time, so inline code scales across
+      cores and never blocks the engine's loop
+    - a wall-clock timeout kills the worker outright and a fresh one is
+      started in the background
+    - CPU time and address space are capped per snippet inside the worker
+    - each worker is replaced after ``max_executions_per_worker`` snippets
+    - each worker caches compiled snippets (``code_cache_size`` entries)
+
+The FastAPI lifespan warms and closes the module singleton ``sandbox_pool``;
+elsewhere workers are started on first use.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from app.config import SandboxSettings, settings
+from app.engine.exceptions import NonRetriableError
+from app.sandbox.worker import HEADER
+from app.serialization import dumps, loads
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+logger = structlog.get_logger(__name__)
+
+WORKER_SCRIPT = Path(__file__).with_name("worker.py")
+
+
+class SandboxError(Exception):
+    """The snippet raised; ``error`` is the exception type name inside the sandbox."""
+
+    def __init__(self, error: str, message: str) -> None:
+        self.error = error
+        super().__init__(f"{error}: {message}")
+
+
+class SandboxLimitExceededError(NonRetriableError):
+    """The snippet hit its CPU or memory limit; retrying would hit it again."""
+
+    def __init__(self, limit: str, message: str) -> None:
+        self.limit = limit
+        super().__init__(message)
+
+
+class SandboxTimeoutError(TimeoutError):
+    pass
+
+
+class SandboxWorker:
+    def __init__(self, process: asyncio.subprocess.Process) -> None:
+        self.process = process
+        self.executions = 0
+
+    @classmethod
+    async def spawn(cls, timeout: float, code_cache_size: int = 256) -> SandboxWorker:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-I",
+            str(WORKER_SCRIPT),
+            str(code_cache_size),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        worker = cls(process)
+        try:
+            ready = await asyncio.wait_for(worker._read(), timeout=timeout)
+        except BaseException:
+            worker.kill()
+            raise
+        if not ready.get("ready"):
+            worker.kill()
+            raise RuntimeError("Sandbox worker failed to start")
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    async def call(self, request: dict[str, Any]) -> dict[str, Any]:
+        body = dumps(request)
+        self.process.stdin.write(HEADER.pack(len(body)) + body)
+        await self.process.stdin.drain()
+        reply = await self._read()
+        self.executions += 1
+        return reply
+
+    async def _read(self) -> dict[str, Any]:
+        try:
+            header = await self.process.stdout.readexactly(HEADER.size)
+            body = await self.process.stdout.readexactly(HEADER.unpack(header)[0])
+        except asyncio.IncompleteReadError as exc:
+            raise RuntimeError("Sandbox worker exited unexpectedly") from exc
+        return loads(body)
+
+    def kill(self) -> None:
+        if self.alive:
+            self.process.kill()
+
+    async def close(self) -> None:
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=1.0)
+            except TimeoutError:
+                self.process.kill()
+        await self.process.wait()
+
+
+class SandboxPool:
+    def __init__(self, config: SandboxSettings | None = None) -> None:
+        self._config = config or settings.sandbox
+        self.size = self._config.workers or os.cpu_count() or 1
+        self._idle: list[SandboxWorker] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._background: set[asyncio.Task[None]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.executions = 0
+        self.code_cache_hits = 0
+        self.timeouts = 0
+        self.recycled = 0
+
+    def _bind_loop(self) -> None:
+        # Worker pipes belong to the loop that spawned them; a new loop (a
+        # script calling asyncio.run twice, tests) starts from a fresh pool.
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        for worker in self._idle:
+            worker.kill()
+        self._idle.clear()
+        self._background.clear()
+        self._slots = asyncio.Semaphore(self.size)
+        self._loop = loop
+
+    async def start(self) -> None:
+        """Warm every worker up front so the first snippets don't pay process startup."""
+        self._bind_loop()
+        missing = self.size - len(self._idle)
+        if missing > 0:
+            workers = await asyncio.gather(*(self._spawn() for _ in range(missing)))
+            self._idle.extend(workers)
+            logger.info("sandbox_pool_started", workers=self.size)
+
+    async def _spawn(self) -> SandboxWorker:
+        cfg = self._config
+        return await SandboxWorker.spawn(cfg.start_timeout_seconds, cfg.code_cache_size)
+
+    def _replace(self, worker: SandboxWorker, kill: bool = True) -> None:
+        """Retire ``worker`` and warm a replacement without holding up the caller."""
+        if kill:
+            worker.kill()
+
+        async def replace() -> None:
+            await worker.close()
+            try:
+                self._idle.append(await self._spawn())
+            except Exception:
+                logger.exception("Sandbox worker failed to start")
+
+        task = asyncio.create_task(replace())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _checkout(self) -> SandboxWorker:
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.alive:
+                return worker
+        return await self._spawn()
+
+    async def run(self, code: str, context: Mapping[str, Any], timeout: float) -> dict[str, Any]:
+        """Run ``code`` in a worker and return the snippet's local variables."""
+        cfg = self._config
+        request = {
+            "code": code,
+            "context": dict(context),
+            "cpu_seconds": cfg.cpu_seconds,
+            "memory_bytes": cfg.memory_mb * 1024 * 1024,
+        }
+        self._bind_loop()
+        async with self._slots:
+            worker = await self._checkout()
+            try:
+                reply = await asyncio.wait_for(worker.call(request), timeout=timeout)
+            except TimeoutError:
+                self.timeouts += 1
+                self._replace(worker)
+                raise SandboxTimeoutError(f"Inline code exceeded {timeout}s and was killed") from None
+            except BaseException:
+                self._replace(worker)
+                raise
+            self.executions += 1
+            self.code_cache_hits += bool(reply.get("cached"))
+
+            if reply.get("limit") or worker.executions >= cfg.max_executions_per_worker:
+                self.recycled += 1
+                self._replace(worker, kill=bool(reply.get("limit")))
+            else:
+                self._idle.append(worker)
+
+        if reply["ok"]:
+            return reply["locals"]
+        if reply.get("limit"):
+            raise SandboxLimitExceededError(reply["limit"], reply["message"])
+        raise SandboxError(reply["error"], reply["message"])
+
+    async def aclose(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        for worker in idle:
+            await worker.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.size,
+            "idle": len(self._idle),
+            "executions": self.executions,
+            "code_cache_hits": self.code_cache_hits,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+        }
+
+
+sandbox_pool = SandboxPool()
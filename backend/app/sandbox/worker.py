@@ -0,0 +1,231 @@
+"""Sandbox worker process for ``inline_code``.
+
+Started by ``SandboxPool`` as ``python -I worker.py [code_cache_size]`` and
+kept warm between snippets.  It depends on the standard library only, so it starts quickly and
+never imports the application.
+
+Protocol (stdin -> stdout): every frame is a 4-byte big-endian length
+followed by a UTF-8 JSON body.  The worker sends ``{"ready": true}`` once it
+is up, then answers each request
+
+    {"code": "...", "context": {...}, "cpu_seconds": 30, "memory_bytes": 268435456}
+
+with ``{"ok": true, "locals": {...}, "cached": true}`` or
+``{"ok": false, "error": "ValueError", "message": "...", "limit": null}``,
+where ``limit`` is ``"cpu"`` or ``"memory"`` when a resource limit stopped the
+snippet.  The parent kills the process on wall-clock timeouts.
+
+Compiled code objects are kept in a per-worker LRU keyed by the SHA-256 of
+the source, so a snippet that runs once per ``for_each`` item, or in every
+run of a published workflow, is compiled once per worker; ``cached`` says
+whether the code object came from it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import struct
+import sys
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from types import CodeType
+
+try:
+    import resource
+    import signal
+except ImportError:  # pragma: no cover - non-POSIX platforms run without limits
+    resource = None  # type: ignore[assignment]
+
+HEADER = struct.Struct(">I")
+
+# Safe builtins for sandboxed code execution
+SAFE_BUILTINS = {
+    # Basic types and operations
+    "abs": abs,
+    "all": all,
+    "any": any,
+    "bool": bool,
+    "dict": dict,
+    "enumerate": enumerate,
+    "filter": filter,
+    "float": float,
+    "int": int,
+    "len": len,
+    "list": list,
+    "map": map,
+    "max": max,
+    "min": min,
+    "range": range,
+    "round": round,
+    "set": set,
+    "sorted": sorted,
+    "str": str,
+    "sum": sum,
+    "tuple": tuple,
+    "type": type,
+    "zip": zip,
+
+    # String operations
+    "isinstance": isinstance,
+    "ord": ord,
+    "chr": chr,
+    "repr": repr,
+
+    # Math operations
+    "math": math,
+
+    # JSON operations
+    "json_dumps": json.dumps,
+    "json_loads": json.loads,
+}
+
+
+class CpuLimitExceededError(Exception):
+    pass
+
+
+class CodeCache:
+    """Bounded LRU of compiled snippets keyed by source hash."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CodeType] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source: str) -> tuple[CodeType, bool]:
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        code = self._entries.get(key)
+        if code is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return code, True
+        code = compile(source, "<inline_code>", "exec")
+        self.misses += 1
+        if self.max_entries > 0:
+            self._entries[key] = code
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return code, False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+code_cache = CodeCache(256)
+
+
+def execute(code: str | CodeType, context: dict[str, Any]) -> dict[str, Any]:
+    # Initialize local variables that code can access
+    local_vars: dict[str, Any] = {
+        "context": context,
+        "input": context.get("input", {}),
+        "result": None,  # Code must set this
+    }
+
+    # Execute with restricted builtins
+    exec(code, {"__builtins__": SAFE_BUILTINS}, local_vars)
+
+    # Return all local variables (including result)
+    return {k: v for k, v in local_vars.items() if not k.startswith("_")}
+
+
+def _address_space() -> int:
+    with open("/proc/self/statm") as fh:
+        return int(fh.read().split()[0]) * resource.getpagesize()
+
+
+def _set_limits(cpu_seconds: float | None, memory_bytes: int | None) -> None:
+    """Lower the soft limits so the next snippet gets its own CPU and memory budget."""
+    if resource is None:
+        return
+    if cpu_seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = usage.ru_utime + usage.ru_stime
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (math.ceil(used + cpu_seconds), hard))
+    if memory_bytes:
+        try:
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            resource.setrlimit(resource.RLIMIT_AS, (_address_space() + memory_bytes, hard))
+        except (OSError, ValueError):
+            pass
+
+
+def _clear_limits() -> None:
+    if resource is None:
+        return
+    for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+        try:
+            _, hard = resource.getrlimit(limit)
+            resource.setrlimit(limit, (hard, hard))
+        except (OSError, ValueError):
+            pass
+
+
+def _on_sigxcpu(signum: int, frame: Any) -> None:
+    raise CpuLimitExceededError("CPU time limit exceeded")
+
+
+def handle(request: dict[str, Any]) -> dict[str, Any]:
+    _set_limits(request.get("cpu_seconds"), request.get("memory_bytes"))
+    try:
+        code, cached = code_cache.compile(request["code"])
+        local_vars = execute(code, request.get("context", {}))
+        # The parent already has context and input; only send back what the snippet made.
+        local_vars.pop("context", None)
+        local_vars.pop("input", None)
+        return {"ok": True, "locals": local_vars, "cached": cached}
+    except CpuLimitExceededError as exc:
+        return {"ok": False, "error": type(exc).__name__, "message": str(exc), "limit": "cpu"}
+    except MemoryError:
+        return {
+            "ok": False,
+            "error": "MemoryError",
+            "message": "Memory limit exceeded",
+            "limit": "memory",
+        }
+    except Exception as exc:
+        return {"ok": False, "error": type(exc).__name__, "message": str(exc), "limit": None}
+    finally:
+        _clear_limits()
+
+
+def _read_frame(stream: Any) -> dict[str, Any] | None:
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    return json.loads(stream.read(HEADER.unpack(header)[0]))
+
+
+def _write_frame(stream: Any, message: dict[str, Any]) -> None:
+    body = json.dumps(message, default=str, separators=(",", ":")).encode("utf-8")
+    stream.write(HEADER.pack(len(body)) + body)
+    stream.flush()
+
+
+def main() -> None:
+    if len(sys.argv) > 1:
+        code_cache.max_entries = int(sys.argv[1])
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    # Snippets must not write into the protocol stream.
+    sys.stdout = sys.stderr
+    _write_frame(stdout, {"ready": True})
+    while (request := _read_frame(stdin)) is not None:
+        try:
+            reply = handle(request)
+            _write_frame(stdout, reply)
+        except (TypeError, ValueError) as exc:
+            # Locals that cannot be encoded as JSON.
+            _write_frame(
+                stdout, {"ok": False, "error": type(exc).__name__, "message": str(exc), "limit": None}
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""JSON serialization for the engine, events and WebSocket frames, built on orjson.
+
+Everything that turns step outputs or event payloads into JSON goes through
+here so values are encoded the same way everywhere (datetimes and UUIDs
+natively, anything else unknown via ``str``, non-string dict keys allowed)
+and large outputs aren't serialized repeatedly:
+
+    - ``dumps`` / ``dumps_str`` / ``loads`` wrap orjson
+    - ``json_size`` measures the encoded size; given a ``limit`` it walks the
+      value and stops as soon as the running size passes it, so an oversized
+      output costs about ``limit`` bytes of work rather than a full encode
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+_SORTED_OPTIONS = _OPTIONS | orjson.OPT_SORT_KEYS
+
+JSONDecodeError = orjson.JSONDecodeError
+
+
+def dumps(value: Any, *, sort_keys: bool = False) -> bytes:
+    return orjson.dumps(value, default=str, option=_SORTED_OPTIONS if sort_keys else _OPTIONS)
+
+
+def dumps_str(value: Any, *, sort_keys: bool = False) -> str:
+    return dumps(value, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    return orjson.loads(data)
+
+
+def _scalar_size(value: Any) -> int:
+    if value is None or value is True:
+        return 4
+    if value is False:
+        return 5
+    if type(value) is str:
+        # Printable ASCII without quotes or backslashes encodes as-is.
+        if value.isascii() and value.isprintable() and '"' not in value and "\\" not in value:
+            return len(value) + 2
+        return len(dumps(value))
+    if type(value) is int:
+        return len(str(value))
+    return len(dumps(value))
+
+
+def json_size(value: Any, limit: int | None = None) -> int:
+    """Size in bytes of ``dumps(value)``.
+
+    With ``limit`` set, returns as soon as the size is known to exceed it; the
+    result is then some number greater than ``limit``, not the full size.
+    Raises ``TypeError`` if the value cannot be serialized.
+    """
+    if limit is None:
+        return len(dumps(value))
+
+    # A cyclic value keeps growing until it passes the limit.
+    size = 0
+    stack: list[Any] = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            # Braces, one colon per entry and the commas between entries.
+            size += 2 + len(item) + max(len(item) - 1, 0)
+            for key, child in item.items():
+                size += _scalar_size(key if type(key) is str else str(key))
+                stack.append(child)
+        elif isinstance(item, (list, tuple)):
+            size += 2 + max(len(item) - 1, 0)
+            stack.extend(item)
+        else:
+            size += _scalar_size(item)
+        if size > limit:
+            return size
+    return size
@@ -1,46 +1,75 @@
 from __future__ import annotations
 
-import json
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+from app.artifacts import ArtifactStore, offload_large_fields
+from app.serialization import json_size
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
 
 
 class StepHandler(ABC):
     step_type: str = ""
     metadata: dict[str, Any] = {}
     MAX_OUTPUT_SIZE: int = 100_000  # 100KB default
-    CONTEXT_FIELDS: set[str] = set()  # Fields to keep when truncating
+    CONTEXT_FIELDS: set[str] = set()  # Fields kept inline longest when offloading
+    # for_each hands all items to execute_batch at once when this is set.
+    supports_batch: bool = False
+    # Handlers that only use their (already template-resolved) config get an
+    # empty context; see context_keys.
+    uses_context: bool = True
 
     @abstractmethod
-    async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
+    async def execute(self, config: dict[str, Any], context: Mapping[str, Any]) -> dict[str, Any]:
         """Execute the step. Returns JSON-serializable output."""
 
-    def validate_output(self, output: Any) -> Any:
-        """Ensure output isn't too large for the context dict."""
-        # First ensure it's JSON serializable
+    def context_keys(self, config: dict[str, Any]) -> set[str] | None:
+        """Top-level context keys ``execute`` reads for ``config``; None means all of them.
+
+        The engine passes handlers a read-only view holding just these keys.
+        """
+        return None if self.uses_context else set()
+
+    def can_coalesce(self, config: dict[str, Any]) -> bool:
+        """Whether identical concurrent calls with ``config`` may share one execution.
+
+        Only consulted for step types on the engine's singleflight allowlist.
+        Handlers that read the context are excluded: two runs with the same
+        config can still see different data.
+        """
+        return self.context_keys(config) == set()
+
+    async def execute_batch(
+        self, configs: list[dict[str, Any]], contexts: list[Mapping[str, Any]]
+    ) -> list[Any]:
+        """Execute many items in one call; returns an output or exception per item, in order."""
+        results: list[Any] = []
+        for config, context in zip(configs, contexts, strict=True):
+            try:
+                results.append(await self.execute(config, context))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def validate_output(self, output: Any, artifacts: ArtifactStore | None = None) -> Any:
+        """Ensure output isn't too large for the context dict.
+
+        Outputs above ``MAX_OUTPUT_SIZE`` keep their largest fields in the
+        artifact store as lazy references, ``CONTEXT_FIELDS`` last.
+        """
+        # Stops measuring once past the cap; a small output is never encoded here.
+        if json_size(output, self.MAX_OUTPUT_SIZE) <= self.MAX_OUTPUT_SIZE:
+            return output
         try:
-            json_str = json.dumps(output, default=str)
-            size = len(json_str.encode('utf-8'))
-        except (TypeError, ValueError) as e:
+            return offload_large_fields(output, self.MAX_OUTPUT_SIZE, self.CONTEXT_FIELDS, artifacts)
+        except TypeError as e:
             raise ValueError(f"Step output is not JSON serializable: {e}") from e
 
-        if size > self.MAX_OUTPUT_SIZE:
-            if self.CONTEXT_FIELDS:
-                # Truncate by keeping only specified fields
-                if isinstance(output, dict):
-                    truncated = {k: v for k, v in output.items() if k in self.CONTEXT_FIELDS}
-                    # Re-check size after truncation
-                    try:
-                        json_str = json.dumps(truncated, default=str)
-                        if len(json_str.encode('utf-8')) <= self.MAX_OUTPUT_SIZE:
-                            return truncated
-                    except (TypeError, ValueError):
-                        pass
-
-            # If truncation didn't work or no fields specified, raise error
-            raise ValueError(
-                f"Step output too large: {size} bytes (max {self.MAX_OUTPUT_SIZE}). "
-                f"Consider reducing output size or updating CONTEXT_FIELDS."
-            )
-
-        return output
+    async def avalidate_output(self, output: Any, artifacts: ArtifactStore | None = None) -> Any:
+        """``validate_output`` for the engine: offloading runs in a thread, off the event loop."""
+        if json_size(output, self.MAX_OUTPUT_SIZE) <= self.MAX_OUTPUT_SIZE:
+            return output
+        return await asyncio.to_thread(self.validate_output, output, artifacts)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
+from app.engine.context_view import name_keys
 from app.engine.safe_eval import safe_eval
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
@@ -18,6 +19,10 @@ class ConditionHandler(StepHandler):
         },
     }
 
+    def context_keys(self, config: dict[str, Any]) -> set[str] | None:
+        keys = name_keys(config["expression"])
+        return None if keys is None else set(keys)
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         expression: str = config["expression"]
         result = safe_eval(expression, context)
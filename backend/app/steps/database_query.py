@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from typing import Any
 
+from app.artifacts import ArtifactStore, artifact_store
+from app.config import settings
+from app.engine.query_pool import QueryPool, query_pool
+from app.serialization import dumps
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
 
@@ -9,20 +13,61 @@ from app.steps.registry import register_step
 @register_step
 class DatabaseQueryHandler(StepHandler):
     step_type = "database_query"
+    uses_context = False
     metadata = {
         "label": "Database Query",
         "description": "Execute a parameterized SQL query and return the result rows.",
         "config_schema": {
             "query": {"type": "string", "required": True},
             "params": {"type": "array", "default": []},
+            "max_rows": {"type": "number", "default": None},
+            "stream": {"type": "boolean", "default": False},
         },
     }
 
+    def __init__(
+        self, pool: QueryPool | None = None, artifacts: ArtifactStore | None = None
+    ) -> None:
+        self._pool = pool or query_pool
+        self._artifacts = artifacts or artifact_store
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         query: str = config["query"]
         params: list = config.get("params", [])
-        conn = context.get("__db_conn__")
-        if conn is None:
-            raise RuntimeError("No database connection in context")
-        rows = await conn.fetch(query, *params)
-        return {"rows": [dict(row) for row in rows], "count": len(rows)}
+        max_rows = config.get("max_rows")
+        fetch_size = settings.workflow_db.fetch_size
+
+        async with self._pool.acquire() as conn:
+            # prepare() goes through the connection's statement cache.
+            statement = await conn.prepare(query)
+            if not statement.get_attributes():
+                await statement.fetch(*params)
+                return {"rows": [], "count": 0, "status": statement.get_statusmsg()}
+
+            async with conn.transaction():
+                cursor = statement.cursor(*params, prefetch=fetch_size)
+                if config.get("stream"):
+                    # Rows go to an NDJSON artifact as they arrive; for_each
+                    # accepts the reference and reads it back in chunks.
+                    return await self._stream_rows(cursor, max_rows)
+
+                limit = int(max_rows or settings.workflow_db.default_max_rows)
+                rows = await (await cursor).fetch(limit + 1)
+
+        truncated = len(rows) > limit
+        rows = rows[:limit]
+        return {"rows": [dict(row) for row in rows], "count": len(rows), "truncated": truncated}
+
+    async def _stream_rows(self, cursor: Any, max_rows: int | None) -> dict[str, Any]:
+        writer = self._artifacts.open_writer("application/x-ndjson")
+        count = 0
+        try:
+            async for row in cursor:
+                if max_rows is not None and count >= max_rows:
+                    break
+                await writer.awrite(dumps(dict(row)) + b"\n")
+                count += 1
+        except BaseException:
+            await writer.aabort()
+            raise
+        return {"rows": None, "rows_artifact": await writer.acommit(), "count": count}
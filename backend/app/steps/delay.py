@@ -10,6 +10,7 @@ from app.steps.registry import register_step
 @register_step
 class DelayHandler(StepHandler):
     step_type = "delay"
+    uses_context = False
     metadata = {
         "label": "Delay",
         "description": "Pause execution for a specified number of seconds.",
@@ -20,5 +21,8 @@ class DelayHandler(StepHandler):
 
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         seconds: float = float(config.get("seconds", 0))
+        # The engine suspends the run on a durable timer for delays longer than
+        # TIMERS_INLINE_DELAY_SECONDS (see app.engine.timers); this sleep only
+        # runs for short delays and for_each items.
         await asyncio.sleep(seconds)
         return {"delayed_seconds": seconds}
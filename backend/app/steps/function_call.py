@@ -36,4 +36,4 @@ class FunctionCallHandler(StepHandler):
         if not isinstance(output, dict):
             output = {"result": output}
 
-        return self.validate_output(output)
+        return output
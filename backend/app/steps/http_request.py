@@ -2,8 +2,12 @@ from __future__ import annotations
 
 from typing import Any
 
-import httpx
-
+from app.artifacts import ArtifactStore, artifact_store
+from app.config import settings
+from app.http import HttpClientPool, HttpResponseCache, http_pool, http_response_cache
+from app.http.cache import CACHEABLE_METHODS, CachedResponse, cache_key, freshness_lifetime
+from app.http.streaming import StreamedBody, read_capped
+from app.serialization import loads
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
 
@@ -11,6 +15,7 @@ from app.steps.registry import register_step
 @register_step
 class HttpRequestHandler(StepHandler):
     step_type = "http_request"
+    uses_context = False
     metadata = {
         "label": "HTTP Request",
         "description": "Send an HTTP request to an external URL and return the response.",
@@ -20,29 +25,137 @@ class HttpRequestHandler(StepHandler):
             "headers": {"type": "object", "default": {}},
             "body": {"type": "any", "default": None},
             "timeout_seconds": {"type": "number", "default": 30},
+            "rate_limit": {"type": "object", "default": None},
+            "hedge": {"type": "object", "default": None},
+            "max_response_bytes": {"type": "number", "default": None},
+            "spill_to_artifact": {"type": "boolean", "default": False},
+            "cache": {"type": "any", "default": None},
         },
     }
 
+    def __init__(
+        self,
+        http: HttpClientPool | None = None,
+        artifacts: ArtifactStore | None = None,
+        cache: HttpResponseCache | None = None,
+    ) -> None:
+        self._http = http or http_pool
+        self._artifacts = artifacts or artifact_store
+        self._cache = cache if cache is not None else http_response_cache
+
+    def can_coalesce(self, config: dict[str, Any]) -> bool:
+        method = config.get("method", "GET").upper()
+        return super().can_coalesce(config) and method in ("GET", "HEAD")
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         method: str = config.get("method", "GET").upper()
         url: str = config["url"]
         headers: dict = config.get("headers", {})
         body: Any = config.get("body")
         timeout: float = float(config.get("timeout_seconds", 30))
+        max_bytes = int(config.get("max_response_bytes") or settings.http_client.max_response_bytes)
+        spill_over = (
+            settings.http_client.inline_response_bytes if config.get("spill_to_artifact") else None
+        )
+
+        # -- response cache (opt-in, GET only) ---------------------------------
+        cache_opts = config.get("cache")
+        key: str | None = None
+        cached: CachedResponse | None = None
+        default_ttl: float | None = None
+        if cache_opts and method in CACHEABLE_METHODS:
+            default_ttl = cache_opts.get("ttl_seconds") if isinstance(cache_opts, dict) else None
+            key = cache_key(method, url, headers)
+            cached = await self._cache.get(key)
+            if cached is not None and cached.fresh:
+                self._cache.record("hit")
+                return _output_from_cache(cached, "hit")
+        request_headers = {**headers, **cached.conditional_headers()} if cached else headers
+
+        # The body is streamed with a size cap so a large download never sits
+        # in memory whole; with spill enabled it goes to the artifact store.
+        async def fetch() -> tuple[int, dict[str, str], str, StreamedBody]:
+            async with self._http.stream(
+                method,
+                url,
+                headers=request_headers,
+                json=body,
+                timeout=timeout,
+                rate_limit=config.get("rate_limit"),
+            ) as response:
+                if not (cached is not None and response.status_code == 304):
+                    response.raise_for_status()
+                streamed = await read_capped(response, max_bytes, spill_over, self._artifacts)
+                encoding = response.encoding or "utf-8"
+                return response.status_code, dict(response.headers), encoding, streamed
+
+        hedge_meta: dict[str, Any] | None = None
+        if config.get("hedge"):
+            hedge = config["hedge"] if isinstance(config["hedge"], dict) else {}
+            result, hedge_meta = await self._http.hedged_request(
+                method, url, hedge=hedge, send=fetch
+            )
+        else:
+            result = await fetch()
+        status_code, response_headers, encoding, streamed = result
+
+        if cached is not None and status_code == 304:
+            cached.refresh(response_headers, default_ttl)
+            await self._cache.put(key, cached)
+            self._cache.record("revalidated")
+            output = _output_from_cache(cached, "revalidated")
+            if hedge_meta is not None:
+                output["hedge"] = hedge_meta
+            return output
+
+        output: dict[str, Any] = {
+            "status_code": status_code,
+            "headers": response_headers,
+        }
+        if streamed.artifact is not None:
+            output["body"] = None
+            output["body_artifact"] = streamed.artifact
+        else:
+            output["body"] = _decode_body(
+                streamed.content or b"", response_headers.get("content-type", ""), encoding
+            )
+        if hedge_meta is not None:
+            output["hedge"] = hedge_meta
+
+        if cache_opts:
+            output["cache"] = {"status": "bypass"}
+            if key is not None:
+                self._cache.record("miss")
+                lifetime = freshness_lifetime(response_headers, default_ttl)
+                stored = (
+                    lifetime is not None
+                    and streamed.content is not None
+                    and status_code == 200
+                    and await self._cache.put(
+                        key,
+                        CachedResponse(
+                            status_code, response_headers, streamed.content, encoding, lifetime
+                        ),
+                    )
+                )
+                output["cache"] = {"status": "miss", "stored": stored}
+        return output
+
+
+def _output_from_cache(entry: CachedResponse, status: str) -> dict[str, Any]:
+    return {
+        "status_code": entry.status_code,
+        "headers": dict(entry.headers),
+        "body": _decode_body(entry.body, entry.headers.get("content-type", ""), entry.encoding),
+        "cache": {"status": status, "age_seconds": round(entry.age, 3)},
+    }
+
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.request(method, url, headers=headers, json=body)
-            response.raise_for_status()
-            content_type = response.headers.get("content-type", "")
-            if content_type.startswith("application/json"):
-                try:
-                    body_content = response.json()
-                except Exception:
-                    body_content = response.text
-            else:
-                body_content = response.text
-            return {
-                "status_code": response.status_code,
-                "headers": dict(response.headers),
-                "body": body_content,
-            }
+def _decode_body(content: bytes, content_type: str, encoding: str) -> Any:
+    text = content.decode(encoding, errors="replace")
+    if content_type.startswith("application/json"):
+        try:
+            return loads(text)
+        except ValueError:
+            return text
+    return text
@@ -1,57 +1,14 @@
 from __future__ import annotations
 
-import asyncio
-import json
-import math
 from typing import Any
 
+from app.engine.context_view import subscript_keys
+from app.sandbox import SandboxPool, sandbox_pool
+from app.sandbox.worker import SAFE_BUILTINS  # noqa: F401  (re-exported)
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
 
 
-# Safe builtins for sandboxed code execution
-SAFE_BUILTINS = {
-    # Basic types and operations
-    "abs": abs,
-    "all": all,
-    "any": any,
-    "bool": bool,
-    "dict": dict,
-    "enumerate": enumerate,
-    "filter": filter,
-    "float": float,
-    "int": int,
-    "len": len,
-    "list": list,
-    "map": map,
-    "max": max,
-    "min": min,
-    "range": range,
-    "round": round,
-    "set": set,
-    "sorted": sorted,
-    "str": str,
-    "sum": sum,
-    "tuple": tuple,
-    "type": type,
-    "zip": zip,
-
-    # String operations
-    "isinstance": isinstance,
-    "isinstance": isinstance,
-    "ord": ord,
-    "chr": chr,
-    "repr": repr,
-
-    # Math operations
-    "math": math,
-
-    # JSON operations
-    "json_dumps": json.dumps,
-    "json_loads": json.loads,
-}
-
-
 @register_step
 class InlineCodeHandler(StepHandler):
     step_type = "inline_code"
@@ -65,36 +22,24 @@ class InlineCodeHandler(StepHandler):
     }
     CONTEXT_FIELDS = {"result"}
 
+    def __init__(self, sandbox: SandboxPool | None = None) -> None:
+        self._sandbox = sandbox or sandbox_pool
+
+    def context_keys(self, config: dict[str, Any]) -> set[str] | None:
+        # Snippets that only read context["key"] / context.get("key") are sent
+        # just those keys; anything else gets the whole context.
+        keys = subscript_keys(config["code"], "context")
+        return None if keys is None else {"input", *keys}
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         code: str = config["code"]
         timeout: float = float(config.get("timeout_seconds", 30))
 
-        loop = asyncio.get_running_loop()
-        result = await asyncio.wait_for(
-            loop.run_in_executor(None, self._execute_sync, code, context),
-            timeout=timeout,
-        )
+        # Runs in a warm worker process; a timeout kills the worker.
+        result = await self._sandbox.run(code, context, timeout=timeout)
 
         # Validate that result was set
         if result.get("result") is None:
             raise ValueError("Inline code must set the 'result' variable")
 
-        return self.validate_output(result)
-
-    @staticmethod
-    def _execute_sync(code: str, context: dict[str, Any]) -> dict[str, Any]:
-        # Create input from resolved config (templates already filled by engine)
-        input_data = context.get("input", {})
-
-        # Initialize local variables that code can access
-        local_vars: dict[str, Any] = {
-            "context": context,
-            "input": input_data,
-            "result": None,  # Code must set this
-        }
-
-        # Execute with restricted builtins
-        exec(code, {"__builtins__": SAFE_BUILTINS}, local_vars)  # noqa: S102
-
-        # Return all local variables (including result)
-        return {k: v for k, v in local_vars.items() if not k.startswith('_')}
+        return result
@@ -2,9 +2,8 @@ from __future__ import annotations
 
 from typing import Any
 
-import httpx
-
 from app.config import settings
+from app.http import HttpClientPool, http_pool
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
 
@@ -13,6 +12,7 @@ from app.steps.registry import register_step
 @register_step
 class LLMCallHandler(StepHandler):
     step_type = "llm_call"
+    uses_context = False
     metadata = {  # noqa: RUF012
         "label": "LLM Call",
         "description": "Call a large language model and return the generated text.",
@@ -24,6 +24,9 @@ class LLMCallHandler(StepHandler):
         },
     }
 
+    def __init__(self, http: HttpClientPool | None = None) -> None:
+        self._http = http or http_pool
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         provider: str = config.get("provider", "openai")
         model: str = config.get("model", "gpt-4o")
@@ -37,17 +40,16 @@ class LLMCallHandler(StepHandler):
     async def _call_openai(
         self, model: str, messages: list, temperature: float
     ) -> dict[str, Any]:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {settings.llm.openai_api_key.get_secret_value()}"},
-                json={"model": model, "messages": messages, "temperature": temperature},
-                timeout=120.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return {
-                "content": data["choices"][0]["message"]["content"],
-                "model": data["model"],
-                "usage": data.get("usage", {}),
-            }
+        response = await self._http.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={"Authorization": f"Bearer {settings.llm.openai_api_key.get_secret_value()}"},
+            json={"model": model, "messages": messages, "temperature": temperature},
+            timeout=120.0,
+        )
+        response.raise_for_status()
+        data = response.json()
+        return {
+            "content": data["choices"][0]["message"]["content"],
+            "model": data["model"],
+            "usage": data.get("usage", {}),
+        }
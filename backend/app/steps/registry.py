@@ -22,6 +22,7 @@ from app.steps.wait_for_approval import WaitForApprovalHandler  # noqa: E402, F4
 from app.steps.wait_for_event import WaitForEventHandler  # noqa: E402, F401
 from app.steps.send_email import SendEmailHandler  # noqa: E402, F401
 from app.steps.webhook import WebhookHandler  # noqa: E402, F401
+from app.steps.webhook_batch import WebhookBatchHandler  # noqa: E402, F401
 from app.steps.delay import DelayHandler  # noqa: E402, F401
 from app.steps.for_each import ForEachHandler  # noqa: E402, F401
 from app.steps.function_call import FunctionCallHandler  # noqa: E402, F401
@@ -39,6 +40,7 @@ STEP_CATALOG: list[dict[str, Any]] = [
     {"type": "wait_for_event", "label": "Wait for Event", "icon": "bell", "category": "flow", "description": "Wait for an external event before continuing execution."},
     {"type": "send_email", "label": "Send Email", "icon": "mail", "category": "integrations", "description": "Send an email to one or more recipients."},
     {"type": "webhook", "label": "Webhook", "icon": "webhook", "category": "integrations", "description": "Send a webhook POST request to an external URL."},
+    {"type": "webhook_batch", "label": "Webhook Batch", "icon": "webhook", "category": "integrations", "description": "POST a webhook to a list of targets with bounded concurrency and per-target retries."},
     {"type": "for_each", "label": "For Each", "icon": "repeat", "category": "logic", "description": "Iterate over a list of items, executing a sub-step for each."},
     {"type": "function_call", "label": "Function Call", "icon": "zap", "category": "custom", "description": "Execute a registered Python function by name."},
 ]
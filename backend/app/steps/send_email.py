@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from email.message import EmailMessage
 from typing import Any
 
+from app.engine.exceptions import NonRetriableError, RetriableError
+from app.mail import SmtpError, SmtpPool, SmtpPoolRegistry, smtp_pools
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
 
@@ -9,6 +12,8 @@ from app.steps.registry import register_step
 @register_step
 class SendEmailHandler(StepHandler):
     step_type = "send_email"
+    uses_context = False
+    supports_batch = True
     metadata = {
         "label": "Send Email",
         "description": "Send an email to one or more recipients.",
@@ -16,11 +21,99 @@ class SendEmailHandler(StepHandler):
             "to": {"type": "string", "required": True},
             "subject": {"type": "string", "required": True},
             "body": {"type": "string", "required": True},
+            "html": {"type": "string", "default": None},
+            "cc": {"type": "string", "default": None},
+            "bcc": {"type": "string", "default": None},
+            "from": {"type": "string", "default": None},
+            "reply_to": {"type": "string", "default": None},
+            "provider": {"type": "string", "default": None},
         },
     }
 
+    def __init__(self, mail: SmtpPoolRegistry | None = None) -> None:
+        self._mail = mail or smtp_pools
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
-        to: str | list[str] = config["to"]
-        subject: str = config["subject"]
-        body: str = config["body"]
-        return {"sent_to": to, "subject": subject, "status": "queued"}
+        pool = self._pool(config.get("provider"))
+        try:
+            result = await pool.send(_build_message(config, pool))
+        except (SmtpError, OSError) as exc:
+            raise _delivery_error(exc) from exc
+        return _output(config, result)
+
+    async def execute_batch(
+        self, configs: list[dict[str, Any]], contexts: list[dict[str, Any]]
+    ) -> list[Any]:
+        """Send every item of a ``for_each`` through the pool, grouped by provider."""
+        results: list[Any] = [None] * len(configs)
+        by_provider: dict[str | None, list[int]] = {}
+        for index, config in enumerate(configs):
+            by_provider.setdefault(config.get("provider"), []).append(index)
+
+        for provider, indexes in by_provider.items():
+            try:
+                pool = self._pool(provider)
+                messages = [_build_message(configs[i], pool) for i in indexes]
+            except Exception as exc:
+                for i in indexes:
+                    results[i] = exc
+                continue
+            for i, sent in zip(indexes, await pool.send_many(messages), strict=True):
+                if isinstance(sent, (SmtpError, OSError)):
+                    results[i] = _delivery_error(sent)
+                elif isinstance(sent, Exception):
+                    results[i] = sent
+                else:
+                    results[i] = _output(configs[i], sent)
+        return results
+
+    def _pool(self, provider: str | None) -> SmtpPool:
+        try:
+            pool = self._mail.pool(provider)
+        except KeyError as exc:
+            raise NonRetriableError(str(exc.args[0])) from exc
+        if not pool.configured:
+            raise NonRetriableError("SMTP is not configured (set SMTP_HOST)")
+        return pool
+
+
+def _as_list(value: str | list[str] | None) -> list[str]:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _build_message(config: dict[str, Any], pool: SmtpPool) -> EmailMessage:
+    sender = config.get("from") or pool.from_address
+    if not sender:
+        raise NonRetriableError("send_email needs a 'from' address or SMTP_FROM_ADDRESS")
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = ", ".join(_as_list(config["to"]))
+    for header, key in (("Cc", "cc"), ("Bcc", "bcc"), ("Reply-To", "reply_to")):
+        if config.get(key):
+            message[header] = ", ".join(_as_list(config[key]))
+    message["Subject"] = config["subject"]
+    message.set_content(config["body"])
+    if config.get("html"):
+        message.add_alternative(config["html"], subtype="html")
+    return message
+
+
+def _delivery_error(exc: SmtpError | OSError) -> Exception:
+    """Map delivery failures onto the engine's retry semantics."""
+    if isinstance(exc, SmtpError) and not exc.transient:
+        return NonRetriableError(f"SMTP delivery failed: {exc}", original=exc)
+    return RetriableError(f"SMTP delivery failed: {exc}", original=exc)
+
+
+def _output(config: dict[str, Any], result: dict[str, Any]) -> dict[str, Any]:
+    output = {
+        "sent_to": config["to"],
+        "subject": config["subject"],
+        "status": "sent",
+        "message_id": result["message_id"],
+    }
+    if result["rejected"]:
+        output["rejected"] = result["rejected"]
+    return output
@@ -10,6 +10,7 @@ from app.steps.registry import register_step
 @register_step
 class WaitForApprovalHandler(StepHandler):
     step_type = "wait_for_approval"
+    uses_context = False
     metadata = {
         "label": "Wait for Approval",
         "description": "Pause execution and wait for human approval before continuing.",
@@ -10,11 +10,13 @@ from app.steps.registry import register_step
 @register_step
 class WaitForEventHandler(StepHandler):
     step_type = "wait_for_event"
+    uses_context = False
     metadata = {
         "label": "Wait for Event",
         "description": "Wait for an external event before continuing execution.",
         "config_schema": {
             "event_name": {"type": "string", "required": True},
+            "correlation_key": {"type": "string", "default": None},
             "timeout_seconds": {"type": "number", "default": None},
         },
     }
@@ -2,8 +2,7 @@ from __future__ import annotations
 
 from typing import Any
 
-import httpx
-
+from app.http import HttpClientPool, http_pool
 from app.steps.base import StepHandler
 from app.steps.registry import register_step
 
@@ -11,6 +10,7 @@ from app.steps.registry import register_step
 @register_step
 class WebhookHandler(StepHandler):
     step_type = "webhook"
+    uses_context = False
     metadata = {
         "label": "Webhook",
         "description": "Send a webhook POST request to an external URL.",
@@ -18,17 +18,30 @@ class WebhookHandler(StepHandler):
             "url": {"type": "string", "required": True},
             "payload": {"type": "object", "default": {}},
             "secret": {"type": "string", "default": ""},
+            "rate_limit": {"type": "object", "default": None},
         },
     }
 
+    def __init__(self, http: HttpClientPool | None = None) -> None:
+        self._http = http or http_pool
+
     async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
         url: str = config["url"]
         payload: dict = config.get("payload", {})
-        secret: str = config.get("secret", "")
-        headers: dict = {"Content-Type": "application/json"}
-        if secret:
-            headers["X-Webhook-Secret"] = secret
-
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            return {"status_code": response.status_code, "body": response.text}
+        headers = webhook_headers(config.get("secret", ""))
+
+        response = await self._http.post(
+            url,
+            json=payload,
+            headers=headers,
+            timeout=30.0,
+            rate_limit=config.get("rate_limit"),
+        )
+        return {"status_code": response.status_code, "body": response.text}
+
+
+def webhook_headers(secret: str) -> dict[str, str]:
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Webhook-Secret"] = secret
+    return headers
@@ -0,0 +1,139 @@
+"""Deliver one webhook step to many targets.
+
+Fanning out to hundreds of subscribers through ``for_each`` pays the engine's
+per-step overhead (template resolution, context copies, events) for every
+target.  ``webhook_batch`` instead delivers to the whole list inside one step
+over the pooled client:
+
+    - at most ``concurrency`` deliveries are in flight at once
+    - each target is retried on transport errors, 429 and 5xx (honouring
+      ``Retry-After``) up to ``max_attempts`` times; other 4xx are final
+    - targets behind an open circuit breaker fail without being retried
+    - any other error (an invalid URL, say) fails only that target
+
+Targets are either URL strings or objects with ``url`` and optional
+``payload`` / ``headers`` / ``secret`` overriding the step-level defaults.
+The output reports per-target status without response bodies.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import httpx
+
+from app.engine.exceptions import CircuitOpenError, NonRetriableError
+from app.http import HttpClientPool, http_pool
+from app.http.ratelimit import is_overload, parse_retry_after
+from app.steps.base import StepHandler
+from app.steps.registry import register_step
+from app.steps.webhook import webhook_headers
+
+MAX_BACKOFF_SECONDS = 30.0
+
+
+@register_step
+class WebhookBatchHandler(StepHandler):
+    step_type = "webhook_batch"
+    uses_context = False
+    metadata = {  # noqa: RUF012
+        "label": "Webhook Batch",
+        "description": "POST a webhook to a list of targets with bounded concurrency and per-target retries.",
+        "config_schema": {
+            "targets": {"type": "array", "required": True},
+            "payload": {"type": "object", "default": {}},
+            "secret": {"type": "string", "default": ""},
+            "concurrency": {"type": "number", "default": 20},
+            "max_attempts": {"type": "number", "default": 3},
+            "backoff_seconds": {"type": "number", "default": 1.0},
+            "timeout_seconds": {"type": "number", "default": 30},
+            "fail_on_error": {"type": "boolean", "default": False},
+            "rate_limit": {"type": "object", "default": None},
+        },
+    }
+
+    def __init__(self, http: HttpClientPool | None = None) -> None:
+        self._http = http or http_pool
+
+    async def execute(self, config: dict[str, Any], context: dict[str, Any]) -> dict[str, Any]:
+        targets = [_normalize_target(t, config) for t in config["targets"]]
+        concurrency = max(1, int(config.get("concurrency", 20)))
+        results: list[dict[str, Any] | None] = [None] * len(targets)
+        pending = iter(enumerate(targets))
+
+        # A fixed set of workers pulling from one iterator keeps the number of
+        # live tasks at ``concurrency`` however long the target list is.
+        async def worker() -> None:
+            for index, target in pending:
+                results[index] = await self._deliver(target, config)
+
+        async with asyncio.TaskGroup() as group:
+            for _ in range(min(concurrency, len(targets))):
+                group.create_task(worker())
+
+        failed = sum(1 for r in results if r is not None and "error" in r)
+        if failed and config.get("fail_on_error"):
+            # Retrying the step would re-deliver to the targets that succeeded.
+            raise NonRetriableError(f"Webhook delivery failed for {failed} of {len(targets)} targets")
+        return {
+            "total": len(targets),
+            "delivered": len(targets) - failed,
+            "failed": failed,
+            "results": results,
+        }
+
+    async def _deliver(self, target: dict[str, Any], config: dict[str, Any]) -> dict[str, Any]:
+        max_attempts = max(1, int(config.get("max_attempts", 3)))
+        backoff = float(config.get("backoff_seconds", 1.0))
+        timeout = float(config.get("timeout_seconds", 30))
+        result: dict[str, Any] = {"url": target["url"]}
+
+        for attempt in range(1, max_attempts + 1):
+            result["attempts"] = attempt
+            retry_after: float | None = None
+            try:
+                response = await self._http.post(
+                    target["url"],
+                    json=target["payload"],
+                    headers=target["headers"],
+                    timeout=timeout,
+                    rate_limit=config.get("rate_limit"),
+                )
+            except CircuitOpenError as exc:
+                result["error"] = str(exc)
+                return result
+            except httpx.HTTPError as exc:
+                result["error"] = f"{type(exc).__name__}: {exc}"
+            except Exception as exc:
+                # Not transient (e.g. httpx.InvalidURL): final for this target,
+                # and it must not cancel the deliveries to the others.
+                result["error"] = f"{type(exc).__name__}: {exc}"
+                return result
+            else:
+                result["status_code"] = response.status_code
+                if response.is_success:
+                    result.pop("error", None)
+                    return result
+                result["error"] = f"HTTP {response.status_code}"
+                if not is_overload(response.status_code):
+                    return result
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+
+            if attempt < max_attempts:
+                delay = min(backoff * 2 ** (attempt - 1), MAX_BACKOFF_SECONDS)
+                await asyncio.sleep(retry_after if retry_after is not None else delay)
+        return result
+
+
+def _normalize_target(target: str | dict[str, Any], config: dict[str, Any]) -> dict[str, Any]:
+    if isinstance(target, str):
+        target = {"url": target}
+    elif not isinstance(target, dict) or not target.get("url"):
+        raise NonRetriableError(f"Invalid webhook target: {target!r}")
+    headers = webhook_headers(target.get("secret", config.get("secret", "")))
+    headers.update(target.get("headers") or {})
+    return {
+        "url": target["url"],
+        "payload": target.get("payload", config.get("payload", {})),
+        "headers": headers,
+    }
@@ -54,6 +54,7 @@ class RunResponse(BaseModel):
     idempotency_key: str | None = None
     started_at: datetime | None = None
     completed_at: datetime | None = None
+    due_at: datetime | None = None
     created_at: datetime
 
 
@@ -76,6 +77,8 @@ class StepRunResponse(BaseModel):
     output: dict[str, Any] = Field(default_factory=dict)
     error: str | None = None
     attempt: int
+    event_name: str | None = None
+    correlation_key: str | None = None
     started_at: datetime | None = None
     completed_at: datetime | None = None
     created_at: datetime
@@ -83,6 +86,19 @@ class StepRunResponse(BaseModel):
 
 # -- RunEvent schemas ----------------------------------------------------------
 
+class IngestEventRequest(BaseModel):
+    event_name: str
+    correlation_key: str | None = None
+    payload: dict[str, Any] = Field(default_factory=dict)
+
+
+class IngestEventResponse(BaseModel):
+    event_name: str
+    correlation_key: str | None = None
+    matched: int
+    resumed: int
+
+
 class RunEventResponse(BaseModel):
     id: str
     org_id: str
@@ -101,6 +117,22 @@ class ValidationResult(BaseModel):
     errors: list[str]
 
 
+class WorkflowPatch(BaseModel):
+    """Editor delta applied on top of the last validated state of a workflow."""
+
+    base_hash: str | None = None
+    added_nodes: list[dict[str, Any]] = Field(default_factory=list)
+    updated_nodes: list[dict[str, Any]] = Field(default_factory=list)
+    removed_node_ids: list[str] = Field(default_factory=list)
+    added_edges: list[dict[str, Any]] = Field(default_factory=list)
+    removed_edge_ids: list[str] = Field(default_factory=list)
+
+
+class IncrementalValidationResult(ValidationResult):
+    state_hash: str
+    rechecked_node_ids: list[str] = Field(default_factory=list)
+
+
 # -- Catalog -------------------------------------------------------------------
 
 class StepTypeInfo(BaseModel):
@@ -1,3 +1,10 @@
+from app.validation.cache import definition_hash, validation_cache
+from app.validation.incremental import incremental_validation_store
 from app.validation.workflow import validate_workflow
 
-__all__ = ["validate_workflow"]
+__all__ = [
+    "definition_hash",
+    "incremental_validation_store",
+    "validate_workflow",
+    "validation_cache",
+]
@@ -0,0 +1,86 @@
+"""Memoized workflow validation keyed by a stable definition hash.
+
+Validation builds a ``WorkflowGraph``, sorts it and walks every node's
+ancestors, so re-running it on each trigger of an already-published (and
+therefore already-validated) workflow is wasted work.  Results are cached by
+a SHA-256 of the canonical JSON of the definition; published workflows also
+remember their hash by ``(workflow_id, version)`` so the trigger path skips
+hashing entirely.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from app.serialization import dumps
+from app.validation.workflow import validate_workflow
+
+if TYPE_CHECKING:
+    from app.types.schemas import ValidationResult
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def definition_hash(definition: dict[str, Any]) -> str:
+    """Return a stable content hash for a workflow definition."""
+    return hashlib.sha256(dumps(definition, sort_keys=True)).hexdigest()
+
+
+class ValidationCache:
+    """Bounded LRU of ``ValidationResult`` keyed by definition hash."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._results: OrderedDict[str, ValidationResult] = OrderedDict()
+        self._published: OrderedDict[tuple[str, int], str] = OrderedDict()
+
+    def validate(self, definition: dict[str, Any], digest: str | None = None) -> ValidationResult:
+        """Validate ``definition``, reusing a cached result for identical content."""
+        if digest is None:
+            digest = definition_hash(definition)
+
+        cached = self._results.get(digest)
+        if cached is not None:
+            self._results.move_to_end(digest)
+            return cached.model_copy(deep=True)
+
+        result = validate_workflow(definition)
+        self._remember(self._results, digest, result.model_copy(deep=True))
+        return result
+
+    def validate_published(
+        self, workflow_id: str, version: int, definition: dict[str, Any]
+    ) -> ValidationResult:
+        """Validate a published workflow.
+
+        Published definitions are immutable, so the hash recorded at publish
+        time (or on first trigger) is reused and the call is a dict lookup.
+        """
+        key = (str(workflow_id), int(version))
+        digest = self._published.get(key)
+        if digest is None:
+            digest = definition_hash(definition)
+            self._remember(self._published, key, digest)
+        else:
+            self._published.move_to_end(key)
+        return self.validate(definition, digest)
+
+    def mark_published(self, workflow_id: str, version: int, digest: str) -> None:
+        self._remember(self._published, (str(workflow_id), int(version)), digest)
+
+    def _remember(self, store: OrderedDict[Any, Any], key: Any, value: Any) -> None:
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self._max_entries:
+            store.popitem(last=False)
+
+    def clear(self) -> None:
+        self._results.clear()
+        self._published.clear()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+validation_cache = ValidationCache()
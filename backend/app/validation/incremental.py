@@ -0,0 +1,320 @@
+"""Incremental validation for the workflow editor.
+
+``validate_workflow`` re-checks every node on every call.  The editor instead
+sends small patches (nodes / edges added, removed or reconfigured), so this
+module keeps one ``IncrementalValidationState`` per workflow with the current
+graph adjacency and the errors found per edge / node, and re-checks only what
+a patch can affect:
+
+    - edges:      only added edges (and edges whose endpoints appear / vanish)
+    - cycles:     a search from each new edge's target for its source; a full
+                  re-check only when removals may have broken a known cycle
+    - step type / for_each:  only added or updated nodes
+    - conditions: updated condition nodes and sources of changed edges
+    - templates:  updated nodes, plus every descendant of a node whose
+                  ancestry changed (edge added / removed, node removed)
+
+The resulting errors are identical to a full ``validate_workflow`` of the
+patched definition (order may differ).
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import Counter, OrderedDict, deque
+from typing import Any
+
+from app.engine.compact_graph import WorkflowGraphLike, build_workflow_graph
+from app.types.schemas import IncrementalValidationResult, WorkflowPatch
+from app.validation.cache import definition_hash
+from app.validation.workflow import (
+    CYCLE_ERROR,
+    check_condition_branches,
+    check_edge,
+    check_for_each,
+    check_step_type,
+    check_template_refs,
+    orphan_error,
+)
+
+DEFAULT_MAX_STATES = 128
+
+# Above this many template re-checks, build the graph's bitset reachability
+# index once instead of running a reachability search per reference.
+_INDEX_THRESHOLD = 64
+
+
+def _edge_key(edge: dict[str, Any]) -> str:
+    return str(edge.get("id") or f"{edge.get('source')}->{edge.get('target')}")
+
+
+class IncrementalValidationState:
+    """Validated snapshot of one workflow definition that accepts patches."""
+
+    def __init__(self, definition: dict[str, Any]) -> None:
+        self.nodes: dict[str, dict[str, Any]] = {}
+        self.edges: dict[str, dict[str, Any]] = {}
+        # Valid edges only, keyed by node id then edge key.
+        self._outgoing: dict[str, dict[str, dict[str, Any]]] = {}
+        self._incoming: dict[str, dict[str, dict[str, Any]]] = {}
+        self._degree: Counter[str] = Counter()
+
+        self._edge_errors: dict[str, list[str]] = {}
+        self._node_errors: dict[str, dict[str, list[str]]] = {
+            "type": {},
+            "condition": {},
+            "template": {},
+            "for_each": {},
+        }
+        self._has_cycle = False
+
+        for node in definition.get("nodes", []):
+            self._add_node(node)
+        for edge in definition.get("edges", []):
+            self._link(edge)
+
+        self.state_hash = definition_hash(definition)
+        self._has_cycle = self._graph().has_cycle()
+        self._recheck_nodes(set(self.nodes), set(self.nodes))
+
+    # -- patching ----------------------------------------------------------------
+
+    def apply(self, patch: WorkflowPatch) -> set[str]:
+        """Apply ``patch`` and re-check affected nodes.  Returns their ids."""
+        changed: set[str] = set()
+        reparented: set[str] = set()
+        condition_sources: set[str] = set()
+        removed: list[dict[str, Any]] = []
+
+        for edge_id in patch.removed_edge_ids:
+            edge = self._unlink(edge_id)
+            if edge is not None:
+                removed.append(edge)
+
+        # Removing a node also removes its connected edges (as the editor does),
+        # dangling ones included.
+        for node_id in patch.removed_node_ids:
+            if node_id not in self.nodes:
+                continue
+            incident = [*self._outgoing[node_id], *self._incoming[node_id]]
+            incident += [
+                key for key in self._edge_errors
+                if node_id in (self.edges[key].get("source"), self.edges[key].get("target"))
+            ]
+            for key in incident:
+                edge = self._unlink(key)
+                if edge is not None:
+                    removed.append(edge)
+            del self.nodes[node_id]
+            del self._outgoing[node_id]
+            del self._incoming[node_id]
+            for errors in self._node_errors.values():
+                errors.pop(node_id, None)
+
+        for node in patch.added_nodes:
+            self._add_node(node)
+            changed.add(node["id"])
+
+        # Dangling edges may have gained (or lost) their missing endpoint.
+        # They are re-linked first so a patch edge with the same id wins.
+        added_edges: list[dict[str, Any]] = []
+        for key in list(self._edge_errors):
+            edge = self._unlink(key)
+            if edge is not None:
+                added_edges.append(edge)
+        added_edges.extend(patch.added_edges)
+
+        for node in patch.updated_nodes:
+            if node["id"] in self.nodes:
+                self.nodes[node["id"]] = node
+                changed.add(node["id"])
+
+        new_edges: list[dict[str, Any]] = []
+        for edge in added_edges:
+            linked, replaced = self._link(edge)
+            if replaced is not None:
+                # Re-sending an edge id moves the edge: the old one is removed.
+                removed.append(replaced)
+            if linked:
+                new_edges.append(edge)
+                reparented.add(edge["target"])
+                condition_sources.add(edge["source"])
+
+        for edge in removed:
+            reparented.add(edge["target"])
+            condition_sources.add(edge["source"])
+        removed_any = bool(removed)
+
+        # -- cycles --------------------------------------------------------
+        if self._has_cycle and removed_any:
+            self._has_cycle = self._graph().has_cycle()
+        if not self._has_cycle:
+            self._has_cycle = any(
+                edge["source"] == edge["target"] or self._reaches(edge["target"], edge["source"])
+                for edge in new_edges
+            )
+
+        reparented = {nid for nid in reparented if nid in self.nodes}
+        template_targets = changed | reparented | self._descendants(reparented)
+        conditions = (changed | condition_sources) & self.nodes.keys()
+        self._recheck_nodes(changed, template_targets, conditions)
+
+        self.state_hash = hashlib.sha256(
+            f"{self.state_hash}:{definition_hash(patch.model_dump())}".encode()
+        ).hexdigest()
+        return template_targets | conditions
+
+    # -- results -----------------------------------------------------------------
+
+    def result(self, rechecked: set[str] | None = None) -> IncrementalValidationResult:
+        errors: list[str] = []
+        if not self.nodes:
+            errors.append("Workflow must have at least one node.")
+        elif self._edge_errors:
+            for edge_errors in self._edge_errors.values():
+                errors.extend(edge_errors)
+        else:
+            if self._has_cycle:
+                errors.append(CYCLE_ERROR)
+            for category in ("type", "condition"):
+                for node_errors in self._node_errors[category].values():
+                    errors.extend(node_errors)
+            if len(self.nodes) > 1:
+                errors.extend(orphan_error(nid) for nid in self.nodes if not self._degree[nid])
+            for category in ("template", "for_each"):
+                for node_errors in self._node_errors[category].values():
+                    errors.extend(node_errors)
+
+        return IncrementalValidationResult(
+            valid=not errors,
+            errors=errors,
+            state_hash=self.state_hash,
+            rechecked_node_ids=sorted(rechecked or ()),
+        )
+
+    # -- internals ---------------------------------------------------------------
+
+    def _add_node(self, node: dict[str, Any]) -> None:
+        self.nodes[node["id"]] = node
+        self._outgoing.setdefault(node["id"], {})
+        self._incoming.setdefault(node["id"], {})
+
+    def _link(self, edge: dict[str, Any]) -> tuple[bool, dict[str, Any] | None]:
+        """Add ``edge``.
+
+        Returns whether both endpoints exist, and the edge with the same key
+        it replaced, if any.
+        """
+        key = _edge_key(edge)
+        replaced = self._unlink(key) if key in self.edges else None
+        self.edges[key] = edge
+        src, tgt = edge.get("source"), edge.get("target")
+        self._degree[src] += 1
+        self._degree[tgt] += 1
+        errors = check_edge(edge, self.nodes)
+        if errors:
+            self._edge_errors[key] = errors
+            return False, replaced
+        self._outgoing[src][key] = edge
+        self._incoming[tgt][key] = edge
+        return True, replaced
+
+    def _unlink(self, key: str) -> dict[str, Any] | None:
+        edge = self.edges.pop(key, None)
+        if edge is None:
+            return None
+        src, tgt = edge.get("source"), edge.get("target")
+        self._degree[src] -= 1
+        self._degree[tgt] -= 1
+        if self._edge_errors.pop(key, None) is None:
+            del self._outgoing[src][key]
+            del self._incoming[tgt][key]
+        return edge
+
+    def _graph(self) -> WorkflowGraphLike:
+        valid_edges = [e for out in self._outgoing.values() for e in out.values()]
+        return build_workflow_graph(list(self.nodes.values()), valid_edges)
+
+    def _reaches(self, start: str, goal: str) -> bool:
+        """True if ``goal`` is reachable from ``start`` through at least one edge."""
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            for edge in self._outgoing.get(queue.popleft(), {}).values():
+                child = edge["target"]
+                if child == goal:
+                    return True
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        return False
+
+    def _descendants(self, seeds: set[str]) -> set[str]:
+        seen: set[str] = set()
+        queue = deque(seeds)
+        while queue:
+            for edge in self._outgoing.get(queue.popleft(), {}).values():
+                child = edge["target"]
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        return seen
+
+    def _recheck_nodes(
+        self,
+        changed: set[str],
+        template_targets: set[str],
+        conditions: set[str] | None = None,
+    ) -> None:
+        if conditions is None:
+            conditions = changed
+
+        for node_id in changed:
+            node = self.nodes[node_id]
+            self._store("type", node_id, check_step_type(node))
+            self._store("for_each", node_id, check_for_each(node))
+
+        for node_id in conditions:
+            outgoing = list(self._outgoing[node_id].values())
+            self._store("condition", node_id, check_condition_branches(self.nodes[node_id], outgoing))
+
+        if len(template_targets) > _INDEX_THRESHOLD:
+            is_upstream = self._graph().is_upstream
+        else:
+            def is_upstream(ancestor_id: str, node_id: str) -> bool:
+                return ancestor_id in self.nodes and self._reaches(ancestor_id, node_id)
+        for node_id in template_targets:
+            self._store("template", node_id, check_template_refs(self.nodes[node_id], is_upstream))
+
+    def _store(self, category: str, node_id: str, errors: list[str]) -> None:
+        if errors:
+            self._node_errors[category][node_id] = errors
+        else:
+            self._node_errors[category].pop(node_id, None)
+
+
+class IncrementalValidationStore:
+    """Bounded LRU of per-workflow editor validation states."""
+
+    def __init__(self, max_states: int = DEFAULT_MAX_STATES) -> None:
+        self._max_states = max_states
+        self._states: OrderedDict[str, IncrementalValidationState] = OrderedDict()
+
+    def get(self, workflow_id: str) -> IncrementalValidationState | None:
+        state = self._states.get(str(workflow_id))
+        if state is not None:
+            self._states.move_to_end(str(workflow_id))
+        return state
+
+    def seed(self, workflow_id: str, definition: dict[str, Any]) -> IncrementalValidationState:
+        state = IncrementalValidationState(definition)
+        self._states[str(workflow_id)] = state
+        self._states.move_to_end(str(workflow_id))
+        while len(self._states) > self._max_states:
+            self._states.popitem(last=False)
+        return state
+
+    def discard(self, workflow_id: str) -> None:
+        self._states.pop(str(workflow_id), None)
+
+
+incremental_validation_store = IncrementalValidationStore()
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from app.engine.graph import WorkflowGraph
+from typing import TYPE_CHECKING
+
+from app.engine.compact_graph import build_workflow_graph
 from app.engine.templates import extract_template_refs
 from app.steps.registry import STEP_REGISTRY
 from app.types.schemas import ValidationResult
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Container
+
 # Step types the engine handles directly (not via STEP_REGISTRY lookup)
 _ENGINE_HANDLED_TYPES = {"condition", "wait_for_approval", "wait_for_event", "for_each"}
 
@@ -24,51 +29,27 @@ def validate_workflow(definition: dict) -> ValidationResult:
     node_ids = {n["id"] for n in nodes}
 
     for edge in edges:
-        if edge.get("source") not in node_ids:
-            result.valid = False
-            result.errors.append(f"Edge source {edge.get('source')!r} does not exist.")
-        if edge.get("target") not in node_ids:
-            result.valid = False
-            result.errors.append(f"Edge target {edge.get('target')!r} does not exist.")
+        _extend(result, check_edge(edge, node_ids))
 
     if not result.valid:
         return result
 
-    graph = WorkflowGraph(nodes, edges)
+    graph = build_workflow_graph(nodes, edges)
 
     # -- cycle detection (uses graph.has_cycle now) -----------------------
 
     if graph.has_cycle():
-        result.valid = False
-        result.errors.append("Workflow graph contains a cycle.")
+        _extend(result, [CYCLE_ERROR])
 
     # -- step type validation ---------------------------------------------
 
     for node in nodes:
-        step_type = _node_type(node)
-        if step_type and step_type not in STEP_REGISTRY and step_type not in _ENGINE_HANDLED_TYPES:
-            result.valid = False
-            result.errors.append(f"Node {node['id']!r} has unregistered step type {step_type!r}.")
+        _extend(result, check_step_type(node))
 
     # -- condition branch validation --------------------------------------
 
     for node in nodes:
-        step_type = _node_type(node)
-        if step_type == "condition":
-            outgoing = graph.get_outgoing_edges(node["id"])
-            labels = set()
-            for e in outgoing:
-                label = e.get("data", {}).get("condition") or e.get("sourceHandle")
-                if label:
-                    labels.add(label)
-            if "true" not in labels:
-                result.valid = False
-                result.errors.append(f"Condition node {node['id']!r} missing 'true' outgoing edge.")
-            if "false" not in labels:
-                result.valid = False
-                result.errors.append(
-                    f"Condition node {node['id']!r} missing 'false' outgoing edge."
-                )
+        _extend(result, check_condition_branches(node, graph.get_outgoing_edges(node["id"])))
 
     # -- orphan detection -------------------------------------------------
 
@@ -79,38 +60,93 @@ def validate_workflow(definition: dict) -> ValidationResult:
             edge_set.add(edge["target"])
         orphans = node_ids - edge_set
         for orphan in orphans:
-            result.valid = False
-            result.errors.append(f"Node {orphan!r} is orphaned (not connected to any edge).")
+            _extend(result, [orphan_error(orphan)])
 
     # -- template reference validation ------------------------------------
 
     for node in nodes:
-        config = node.get("data", {}).get("config", {})
-        refs = extract_template_refs(config)
-        upstream = graph.get_upstream_ids(node["id"])
-        for ref in refs:
-            root = ref.split(".")[0]
-            if root != "input" and root not in upstream:
-                result.valid = False
-                result.errors.append(
-                    f"Node {node['id']!r} references {root!r} which is not an upstream step."
-                )
+        _extend(result, check_template_refs(node, graph.is_upstream))
 
     # -- for_each validation ----------------------------------------------
 
     for node in nodes:
-        step_type = _node_type(node)
-        if step_type == "for_each":
-            config = node.get("data", {}).get("config", {})
-            if "items" not in config and not extract_template_refs(config):
-                result.valid = False
-                result.errors.append(
-                    f"for_each node {node['id']!r} must have an 'items' config "
-                    f"(static list or template reference)."
-                )
+        _extend(result, check_for_each(node))
 
     return result
 
 
-def _node_type(node: dict) -> str | None:
+# ---------------------------------------------------------------------------
+# Per-edge / per-node checks (shared with incremental validation)
+# ---------------------------------------------------------------------------
+
+CYCLE_ERROR = "Workflow graph contains a cycle."
+
+
+def check_edge(edge: dict, node_ids: Container[str]) -> list[str]:
+    errors: list[str] = []
+    if edge.get("source") not in node_ids:
+        errors.append(f"Edge source {edge.get('source')!r} does not exist.")
+    if edge.get("target") not in node_ids:
+        errors.append(f"Edge target {edge.get('target')!r} does not exist.")
+    return errors
+
+
+def check_step_type(node: dict) -> list[str]:
+    step_type = node_type(node)
+    if step_type and step_type not in STEP_REGISTRY and step_type not in _ENGINE_HANDLED_TYPES:
+        return [f"Node {node['id']!r} has unregistered step type {step_type!r}."]
+    return []
+
+
+def check_condition_branches(node: dict, outgoing: list[dict]) -> list[str]:
+    if node_type(node) != "condition":
+        return []
+    errors: list[str] = []
+    labels = set()
+    for e in outgoing:
+        label = e.get("data", {}).get("condition") or e.get("sourceHandle")
+        if label:
+            labels.add(label)
+    if "true" not in labels:
+        errors.append(f"Condition node {node['id']!r} missing 'true' outgoing edge.")
+    if "false" not in labels:
+        errors.append(f"Condition node {node['id']!r} missing 'false' outgoing edge.")
+    return errors
+
+
+def orphan_error(node_id: str) -> str:
+    return f"Node {node_id!r} is orphaned (not connected to any edge)."
+
+
+def check_template_refs(node: dict, is_upstream: Callable[[str, str], bool]) -> list[str]:
+    errors: list[str] = []
+    config = node.get("data", {}).get("config", {})
+    for ref in extract_template_refs(config):
+        root = ref.split(".")[0]
+        if root != "input" and not is_upstream(root, node["id"]):
+            errors.append(
+                f"Node {node['id']!r} references {root!r} which is not an upstream step."
+            )
+    return errors
+
+
+def check_for_each(node: dict) -> list[str]:
+    if node_type(node) != "for_each":
+        return []
+    config = node.get("data", {}).get("config", {})
+    if "items" not in config and not extract_template_refs(config):
+        return [
+            f"for_each node {node['id']!r} must have an 'items' config "
+            f"(static list or template reference)."
+        ]
+    return []
+
+
+def _extend(result: ValidationResult, errors: list[str]) -> None:
+    if errors:
+        result.valid = False
+        result.errors.extend(errors)
+
+
+def node_type(node: dict) -> str | None:
     return node.get("type", node.get("data", {}).get("type"))
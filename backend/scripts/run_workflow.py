@@ -15,6 +15,7 @@ from matrx_utils import clear_terminal, vcprint
 import app.bootstrap  # noqa: F401 — must be first, configures matrx_orm
 from app.db.custom import wf_core
 from app.engine.executor import WorkflowEngine
+from app.http import http_pool
 
 
 def _section(title: str) -> None:
@@ -47,7 +48,10 @@ async def main(workflow_id: str, org_id: str, user_id: str) -> None:
     # --- Execute it -----------------------------------------------------------
     _section("2. Executing")
     engine = WorkflowEngine()
-    await engine.execute_run(run_id)
+    try:
+        await engine.execute_run(run_id)
+    finally:
+        await http_pool.aclose()
     print("  execute_run() returned")
 
     # --- Read back the final run state ---------------------------------------
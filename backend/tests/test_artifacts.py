@@ -0,0 +1,182 @@
+"""Tests for the content-addressed artifact store and output offloading."""
+
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+
+from app.artifacts import (
+    LocalArtifactStore,
+    MemoryObjectClient,
+    ObjectArtifactStore,
+    amaterialize,
+    aoffload_large_fields,
+    is_lazy_ref,
+    materialize,
+    offload_large_fields,
+)
+from app.artifacts.store import ASYNC_FLUSH_BYTES
+from app.engine import templates
+from app.engine.liveness import project
+from app.engine.templates import aresolve_templates, resolve_templates
+
+
+class TestContentAddressing:
+    def test_id_is_content_hash(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        ref = store.put_bytes(b"hello", "text/plain")
+
+        assert ref["artifact_id"] == hashlib.sha256(b"hello").hexdigest()
+        assert ref["uri"] == f"artifact://{ref['artifact_id']}"
+        assert store.read_bytes(ref["artifact_id"]) == b"hello"
+
+    def test_identical_payloads_stored_once(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        first = store.put_bytes(b"same")
+        writer = store.open_writer()
+        writer.write(b"sa")
+        writer.write(b"me")
+        second = writer.commit()
+
+        assert first["artifact_id"] == second["artifact_id"]
+        assert [p.name for p in tmp_path.iterdir()] == [first["artifact_id"]]
+
+    def test_abort_leaves_nothing(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        writer = store.open_writer()
+        writer.write(b"partial")
+        writer.abort()
+
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_async_writer_batches_and_matches_sync(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        parts = [b"a" * 10, b"b" * ASYNC_FLUSH_BYTES, b"c"]
+        writer = store.open_writer()
+        for part in parts:
+            await writer.awrite(part)
+        ref = await writer.acommit()
+
+        assert ref == store.put_bytes(b"".join(parts))
+        assert store.read_bytes(ref["artifact_id"]) == b"".join(parts)
+
+    async def test_async_abort_leaves_nothing(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        writer = store.open_writer()
+        await writer.awrite(b"b" * ASYNC_FLUSH_BYTES)
+        await writer.aabort()
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_object_store_dedups(self) -> None:
+        client = MemoryObjectClient()
+        store = ObjectArtifactStore(client, prefix="runs/")
+        ref = store.put_bytes(b'{"a": 1}\n{"a": 2}\n', "application/x-ndjson")
+        store.put_bytes(b'{"a": 1}\n{"a": 2}\n', "application/x-ndjson")
+
+        assert client.puts == 1
+        assert list(client.objects) == [f"runs/{ref['artifact_id']}"]
+        assert list(store.iter_lines(ref["artifact_id"])) == [b'{"a": 1}\n', b'{"a": 2}\n']
+
+    def test_only_memory_store_is_not_durable(self, tmp_path) -> None:
+        assert LocalArtifactStore(root=tmp_path).durable
+        assert not ObjectArtifactStore(MemoryObjectClient()).durable
+
+    def test_json_round_trip(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        ref = store.put_json({"rows": [1, 2, 3]})
+
+        assert is_lazy_ref(ref)
+        assert store.load_json(ref) == {"rows": [1, 2, 3]}
+
+    def test_cached_json_is_not_shared(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        ref = store.put_json({"rows": [1, 2, 3]})
+        store.load_json(ref)["rows"].append(4)
+
+        assert store.load_json(ref) == {"rows": [1, 2, 3]}
+
+    def test_materialize_loads_nested_refs(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        plain = {"a": [1, {"b": 2}]}
+        value = {"q": {"rows": store.put_json([1, 2]), "total": 2}, "plain": plain}
+
+        loaded = materialize(value, store)
+        assert loaded == {"q": {"rows": [1, 2], "total": 2}, "plain": plain}
+        assert loaded["plain"] is plain
+        assert materialize(plain, store) is plain
+
+    async def test_amaterialize_loads_in_thread(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        plain = {"a": 1}
+
+        assert await amaterialize({"rows": store.put_json([1, 2])}, store) == {"rows": [1, 2]}
+        assert await amaterialize(plain, store) is plain
+
+
+class TestOffload:
+    def test_small_output_untouched(self, tmp_path) -> None:
+        output = {"a": 1}
+        assert offload_large_fields(output, 100, store=LocalArtifactStore(root=tmp_path)) is output
+
+    def test_largest_fields_moved_first(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        output = {"small": "x" * 10, "medium": "y" * 400, "big": "z" * 2000}
+
+        result = offload_large_fields(output, 1000, store=store)
+
+        assert is_lazy_ref(result["big"])
+        assert result["medium"] == output["medium"]
+        assert result["small"] == output["small"]
+
+    def test_context_fields_moved_last(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        output = {"result": "r" * 2000, "log": "l" * 1500}
+
+        result = offload_large_fields(output, 1000, keep={"result"}, store=store)
+
+        assert is_lazy_ref(result["log"])
+        assert is_lazy_ref(result["result"])
+        assert offload_large_fields(output, 2500, keep={"result"}, store=store)["result"] == output["result"]
+
+    async def test_async_offload(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        small = {"a": 1}
+
+        assert await aoffload_large_fields(small, 100, store=store) is small
+        result = await aoffload_large_fields({"big": "z" * 2000}, 1000, store=store)
+        assert is_lazy_ref(result["big"])
+
+
+class TestTemplateDereference:
+    @pytest.fixture
+    def store(self, tmp_path, monkeypatch: pytest.MonkeyPatch) -> LocalArtifactStore:
+        store = LocalArtifactStore(root=tmp_path)
+        monkeypatch.setattr(templates, "artifact_store", store)
+        return store
+
+    def test_single_template_loads_value(self, store: LocalArtifactStore) -> None:
+        scope = {"llm": {"text": store.put_json("a long transcript"), "model": "m"}}
+
+        assert resolve_templates("{{llm.text}}", scope) == "a long transcript"
+        assert resolve_templates("{{llm.model}}", scope) == "m"
+
+    def test_paths_into_offloaded_value(self, store: LocalArtifactStore) -> None:
+        scope = {"q": {"rows": store.put_json([{"id": 1}, {"id": 2}])}}
+
+        assert resolve_templates("{{q.rows.1.id}}", scope) == 2
+        assert resolve_templates("ids: {{ q.rows[0].id }}, {{ q.rows | length }}", scope) == "ids: 1, 2"
+
+    async def test_async_resolution_loads_value(self, store: LocalArtifactStore) -> None:
+        scope = {"llm": {"text": store.put_json("a long transcript")}, "n": 2}
+
+        assert await aresolve_templates({"t": "{{llm.text}}", "n": "{{n}}"}, scope) == {
+            "t": "a long transcript",
+            "n": 2,
+        }
+
+    def test_projection_keeps_reference(self, store: LocalArtifactStore) -> None:
+        ref = store.put_json({"id": 1, "blob": "x"})
+
+        assert project({"body": ref, "headers": {}}, {"body": {"id": None}}) == {"body": ref}
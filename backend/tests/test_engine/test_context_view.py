@@ -0,0 +1,78 @@
+"""Tests for the read-only context views handed to step handlers."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.engine.context_view import (
+    EMPTY_CONTEXT,
+    handler_context,
+    item_scope,
+    name_keys,
+    subscript_keys,
+)
+from app.engine.templates import resolve_templates
+from app.steps.registry import STEP_REGISTRY
+
+
+class TestHandlerContext:
+    async def test_full_view_is_read_only(self) -> None:
+        context = {"input": {"a": 1}}
+        view = await handler_context(context, None)
+
+        assert view["input"] == {"a": 1}
+        with pytest.raises(TypeError):
+            view["input"] = {}  # type: ignore[index]
+
+    async def test_full_view_does_not_copy(self) -> None:
+        context = {"input": {}}
+        view = await handler_context(context, None)
+        context["later"] = 1
+
+        assert view["later"] == 1
+
+    async def test_pruned_to_declared_keys(self) -> None:
+        context = {"input": {}, "a": 1, "b": 2}
+
+        assert dict(await handler_context(context, {"a", "missing"})) == {"a": 1}
+        assert await handler_context(context, set()) is EMPTY_CONTEXT
+
+    def test_config_only_handlers_get_empty_context(self) -> None:
+        assert STEP_REGISTRY["http_request"].context_keys({"url": "https://example.com"}) == set()
+
+    def test_condition_reads_expression_names(self) -> None:
+        keys = STEP_REGISTRY["condition"].context_keys({"expression": "check['ok'] and count > 1"})
+        assert keys == {"check", "count"}
+
+
+class TestItemScope:
+    def test_layers_item_over_context(self) -> None:
+        context = {"input": {"prefix": "x"}}
+        scope = item_scope(context, {"id": 7}, 3)
+
+        assert scope["_item"] == {"id": 7}
+        assert scope["_index"] == 3
+        assert scope["input"] is context["input"]
+        assert "_item" not in context
+
+    def test_templates_resolve_against_scope(self) -> None:
+        scope = item_scope({"input": {"prefix": "x"}}, {"id": 7}, 0)
+
+        assert resolve_templates("{{input.prefix}}-{{_item.id}}", scope) == "x-7"
+
+
+class TestRefAnalysis:
+    def test_subscript_and_get_keys(self) -> None:
+        code = "a = context['fetch']['rows']\nb = context.get('user', {})"
+        assert subscript_keys(code, "context") == {"fetch", "user"}
+
+    def test_other_uses_need_everything(self) -> None:
+        assert subscript_keys("result = list(context)", "context") is None
+        assert subscript_keys("k = 'x'\nresult = context[k]", "context") is None
+
+    def test_unused_name(self) -> None:
+        assert subscript_keys("result = input['x']", "context") == frozenset()
+
+    def test_name_keys(self) -> None:
+        assert name_keys("a['x'] > b") == {"a", "b"}
+        assert name_keys("a >") is None
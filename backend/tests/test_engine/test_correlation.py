@@ -0,0 +1,92 @@
+"""Tests for delivering external events to waiting runs."""
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.config import EventCorrelationSettings
+from app.engine.correlation import EventCorrelator
+
+
+def _correlator(launch: AsyncMock, **overrides) -> EventCorrelator:
+    return EventCorrelator(EventCorrelationSettings(**overrides), launch=launch)
+
+
+class TestHotIndex:
+    @pytest.mark.asyncio
+    async def test_unwatched_event_skips_database(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        wf_core_mock.get_event_waits = AsyncMock(return_value=[("s1", "paid", "o-1")])
+        wf_core_mock.claim_event_waits = AsyncMock(return_value=[])
+        correlator = _correlator(AsyncMock(), hot_index=True)
+        await correlator.start()
+
+        assert await correlator.deliver("paid", "o-2", {}) == (0, 0)
+        wf_core_mock.claim_event_waits.assert_not_awaited()
+        assert correlator.stats()["skipped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_registered_waits_are_delivered(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        wf_core_mock.get_event_waits = AsyncMock(return_value=[])
+        wf_core_mock.claim_event_waits = AsyncMock(return_value=[("s1", "r1", "wait")])
+        wf_core_mock.claim_paused_runs = AsyncMock(return_value=["r1"])
+        correlator = _correlator(AsyncMock(), hot_index=True)
+        await correlator.start()
+        correlator.register("paid", "o-1", "s1")
+
+        assert await correlator.deliver("paid", "o-1", {"amount": 3}) == (1, 1)
+        assert correlator.stats()["waiting_steps"] == 0
+
+    @pytest.mark.asyncio
+    async def test_without_hot_index_always_queries(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        wf_core_mock.claim_event_waits = AsyncMock(return_value=[])
+        correlator = _correlator(AsyncMock(), hot_index=False)
+        await correlator.start()
+
+        await correlator.deliver("paid", None, {})
+        wf_core_mock.claim_event_waits.assert_awaited_once()
+
+
+class TestDelivery:
+    @pytest.mark.asyncio
+    async def test_bulk_claims_and_resumes_each_run_once(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        claimed = [(f"s{i}", f"r{i}", "wait") for i in range(5)] + [("s5", "r0", "wait2")]
+        wf_core_mock.claim_event_waits = AsyncMock(return_value=claimed)
+        wf_core_mock.claim_paused_runs = AsyncMock(side_effect=lambda ids: ids)
+        wf_core_mock.create_run_event = AsyncMock()
+        launch = AsyncMock()
+        correlator = _correlator(launch, hot_index=False, run_batch_size=2)
+
+        assert await correlator.deliver("paid", "k", {"amount": 3}) == (6, 5)
+        await asyncio.gather(*correlator._background)
+
+        _name, _key, output = wf_core_mock.claim_event_waits.call_args.args
+        assert output == {"event_name": "paid", "correlation_key": "k", "payload": {"amount": 3}}
+        assert [call.args[0] for call in wf_core_mock.claim_paused_runs.call_args_list] == [
+            ["r0", "r1"],
+            ["r2", "r3"],
+            ["r4"],
+        ]
+        assert sorted(call.args[0] for call in launch.call_args_list) == [f"r{i}" for i in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_runs_no_longer_paused_are_not_launched(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        wf_core_mock.claim_event_waits = AsyncMock(return_value=[("s1", "r1", "wait")])
+        wf_core_mock.claim_paused_runs = AsyncMock(return_value=[])
+        launch = AsyncMock()
+        correlator = _correlator(launch, hot_index=False)
+
+        assert await correlator.deliver("paid", None, {}) == (1, 0)
+        launch.assert_not_awaited()
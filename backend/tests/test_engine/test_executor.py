@@ -263,6 +263,132 @@ class TestWaitForEventPause:
         assert waiting[0].step_id == "wait"
 
 
+class TestEventCorrelation:
+    """wait_for_event registers a correlated wait, honours timeouts and resumes with the event."""
+
+    def _workflow(self, **wait_config: Any) -> dict:
+        return {
+            "nodes": [
+                _node("wait", "wait_for_event", config={"event_name": "payment.received", **wait_config}),
+                _node("end", "transform", config={"mapping": {"amount": "{{wait.payload.amount}}"}}),
+            ],
+            "edges": [_edge("wait", "end")],
+        }
+
+    @pytest.mark.asyncio
+    async def test_wait_registers_resolved_key(self) -> None:
+        run, step_runs = _setup_mocks(
+            self._workflow(correlation_key="{{input.order_id}}"), run_input={"order_id": "o-7"}
+        )
+        correlator = MagicMock()
+        engine = WorkflowEngine(bus=_make_bus(), correlator=correlator)
+        await engine.execute_run(str(run.id))
+
+        assert run.status == "paused"
+        assert run.due_at is None
+        (waiting,) = step_runs
+        assert (waiting.event_name, waiting.correlation_key) == ("payment.received", "o-7")
+        correlator.register.assert_called_once_with("payment.received", "o-7", str(waiting.id))
+
+    @pytest.mark.asyncio
+    async def test_resumes_with_event_output(self) -> None:
+        run, step_runs = _setup_mocks(self._workflow())
+        engine = WorkflowEngine(bus=_make_bus(), correlator=MagicMock())
+        await engine.execute_run(str(run.id))
+
+        # What EventCorrelator.deliver does to the waiting step run.
+        (waiting,) = step_runs
+        waiting.status = "completed"
+        waiting.output = {"event_name": "payment.received", "payload": {"amount": 12}}
+        await engine.execute_run(str(run.id))
+
+        assert run.status == "completed"
+        assert run.context["end"] == {"amount": 12}
+
+    @pytest.mark.asyncio
+    async def test_times_out(self) -> None:
+        from datetime import UTC, datetime, timedelta
+
+        run, step_runs = _setup_mocks(self._workflow(timeout_seconds=60))
+        timers = MagicMock(inline_delay_seconds=1.0)
+        engine = WorkflowEngine(bus=_make_bus(), timers=timers, correlator=MagicMock())
+        await engine.execute_run(str(run.id))
+
+        assert run.status == "paused"
+        timers.schedule.assert_called_once_with(str(run.id), run.due_at)
+
+        (waiting,) = step_runs
+        waiting.output = {"due_at": (datetime.now(UTC) - timedelta(seconds=1)).isoformat()}
+        await engine.execute_run(str(run.id))
+
+        assert waiting.status == "failed"
+        assert "timed out" in waiting.error
+        assert run.status == "failed"
+
+
+class TestDurableDelay:
+    """Long delays suspend the run on a persisted timer instead of sleeping."""
+
+    def _workflow(self, seconds: float) -> dict:
+        return {
+            "nodes": [
+                _node("start", "transform", config={"output": {"x": 1}}),
+                _node("wait", "delay", config={"seconds": seconds}),
+                _node("side", "transform", config={"mapping": {"y": 2}}),
+                _node("end", "transform", config={"output": {"done": "yes"}}),
+            ],
+            "edges": [_edge("start", "wait"), _edge("start", "side"), _edge("wait", "end")],
+        }
+
+    @pytest.mark.asyncio
+    async def test_long_delay_suspends_with_due_at(self) -> None:
+        from datetime import UTC, datetime
+
+        run, step_runs = _setup_mocks(self._workflow(3600))
+        timers = MagicMock(inline_delay_seconds=1.0)
+        engine = WorkflowEngine(bus=_make_bus(), timers=timers)
+        await engine.execute_run(str(run.id))
+
+        assert run.status == "paused"
+        assert (run.due_at - datetime.now(UTC)).total_seconds() > 3500
+        timers.schedule.assert_called_once_with(str(run.id), run.due_at)
+        waiting = [sr for sr in step_runs if sr.status == "waiting"]
+        assert [sr.step_id for sr in waiting] == ["wait"]
+        # The step that finished alongside the delay is in the checkpoint.
+        assert run.context["side"] == {"y": 2}
+
+    @pytest.mark.asyncio
+    async def test_wakes_and_completes_once_due(self) -> None:
+        from datetime import UTC, datetime, timedelta
+
+        run, step_runs = _setup_mocks(self._workflow(3600))
+        engine = WorkflowEngine(bus=_make_bus(), timers=MagicMock(inline_delay_seconds=1.0))
+        await engine.execute_run(str(run.id))
+
+        # Resumed early: still waiting.
+        await engine.execute_run(str(run.id))
+        assert run.status == "paused"
+        assert len([sr for sr in step_runs if sr.step_id == "wait"]) == 1
+
+        waiting = next(sr for sr in step_runs if sr.status == "waiting")
+        waiting.output = {"due_at": (datetime.now(UTC) - timedelta(seconds=1)).isoformat()}
+        await engine.execute_run(str(run.id))
+
+        assert run.status == "completed"
+        assert run.due_at is None
+        assert waiting.status == "completed"
+        assert waiting.output == {"delayed_seconds": 3600.0}
+
+    @pytest.mark.asyncio
+    async def test_short_delay_runs_inline(self) -> None:
+        run, step_runs = _setup_mocks(self._workflow(0))
+        engine = WorkflowEngine(bus=_make_bus(), timers=MagicMock(inline_delay_seconds=1.0))
+        await engine.execute_run(str(run.id))
+
+        assert run.status == "completed"
+        assert not [sr for sr in step_runs if sr.status == "waiting"]
+
+
 class TestStepFailure:
     """Step failure with on_error=fail (default) stops the run."""
 
@@ -282,6 +408,271 @@ class TestStepFailure:
         assert run.status == "failed"
 
 
+class TestCircuitOpen:
+    """An open circuit fails the step immediately, without retries."""
+
+    @pytest.mark.asyncio
+    async def test_circuit_open_fails_fast(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from app.engine.exceptions import CircuitOpenError
+        from app.steps.base import StepHandler
+        from app.steps.registry import STEP_REGISTRY
+
+        class _Down(StepHandler):
+            calls = 0
+
+            async def execute(self, config: dict, context: dict) -> dict:
+                self.calls += 1
+                raise CircuitOpenError("down.example.com:443", 12.0)
+
+        handler = _Down()
+        monkeypatch.setitem(STEP_REGISTRY, "http_request", handler)
+        wf = {
+            "nodes": [_node("a", "http_request", config={"url": "https://down.example.com"}, max_attempts=3)],
+            "edges": [],
+        }
+        run, step_runs = _setup_mocks(wf)
+        bus = _make_bus()
+        events: list[dict] = []
+
+        async def capture(event: dict) -> None:
+            events.append(event)
+
+        bus.add_listener(capture)
+        await WorkflowEngine(bus=bus).execute_run(str(run.id))
+
+        assert run.status == "failed"
+        assert handler.calls == 1
+        assert [sr.status for sr in step_runs] == ["failed"]
+        failed = [e for e in events if e["event_type"] == "step.failed"]
+        assert failed[0]["payload"]["circuit"]["host"] == "down.example.com:443"
+
+
+class TestSingleFlight:
+    """Identical concurrent calls of an allowlisted step type share one execution."""
+
+    @pytest.mark.asyncio
+    async def test_identical_parallel_steps_coalesce(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from app.engine.singleflight import SingleFlight
+        from app.steps.base import StepHandler
+        from app.steps.registry import STEP_REGISTRY
+
+        class _Slow(StepHandler):
+            step_type = "http_request"
+            uses_context = False
+            calls = 0
+
+            async def execute(self, config: dict, context: dict) -> dict:
+                self.calls += 1
+                await asyncio.sleep(0.01)
+                return {"status_code": 200}
+
+        handler = _Slow()
+        monkeypatch.setitem(STEP_REGISTRY, "http_request", handler)
+        config = {"url": "https://api.example.com/prices", "method": "GET"}
+        wf = {
+            "nodes": [_node("a", "http_request", config=config), _node("b", "http_request", config=config)],
+            "edges": [],
+        }
+        run, _ = _setup_mocks(wf)
+        bus = _make_bus()
+        events: list[dict] = []
+
+        async def capture(event: dict) -> None:
+            events.append(event)
+
+        bus.add_listener(capture)
+        await WorkflowEngine(bus=bus, coalescer=SingleFlight(["http_request"])).execute_run(str(run.id))
+
+        assert run.status == "completed"
+        assert handler.calls == 1
+        completed = [e["payload"] for e in events if e["event_type"] == "step.completed"]
+        assert sorted(p.get("coalesced", False) for p in completed) == [False, True]
+
+    @pytest.mark.asyncio
+    async def test_same_config_with_different_context_is_not_shared(self) -> None:
+        from app.engine.singleflight import SingleFlight
+        from app.steps.base import StepHandler
+
+        class _Echo(StepHandler):
+            step_type = "http_request"
+            calls = 0
+
+            def context_keys(self, config: dict) -> set[str]:
+                return {"input"}
+
+            async def execute(self, config: dict, context: dict) -> dict:
+                self.calls += 1
+                await asyncio.sleep(0.01)
+                return {"name": context["input"]["name"]}
+
+        handler = _Echo()
+        engine = WorkflowEngine(bus=_make_bus(), coalescer=SingleFlight(["http_request"]))
+        config = {"url": "https://api.example.com/prices"}
+        # Two runs of the same workflow: same resolved config, different inputs.
+        results = await asyncio.gather(
+            engine._call_handler("http_request", handler, config, {"input": {"name": "a"}}),
+            engine._call_handler("http_request", handler, config, {"input": {"name": "b"}}),
+        )
+
+        assert handler.calls == 2
+        assert results == [({"name": "a"}, False), ({"name": "b"}, False)]
+
+
+class TestForEachArtifactItems:
+    """for_each reads an NDJSON artifact in chunks instead of a materialized list."""
+
+    @pytest.mark.asyncio
+    async def test_iterates_artifact_in_chunks(self, monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+        from app.artifacts import LocalArtifactStore
+        from app.engine import executor
+        from app.serialization import loads
+        from app.steps.base import StepHandler
+        from app.steps.registry import STEP_REGISTRY
+
+        store = LocalArtifactStore(tmp_path)
+        monkeypatch.setattr(executor, "artifact_store", store)
+        writer = store.open_writer("application/x-ndjson")
+        for i in range(5):
+            writer.write(f'{{"n": {i}}}\n'.encode())
+        ref = writer.commit()
+
+        batches: list[int] = []
+
+        class _Batch(StepHandler):
+            step_type = "batch_echo"
+            supports_batch = True
+
+            async def execute(self, config: dict, context: dict) -> dict:
+                return {"n": config["n"]}
+
+            async def execute_batch(self, configs: list, contexts: list) -> list:
+                batches.append(len(configs))
+                return await super().execute_batch(configs, contexts)
+
+        monkeypatch.setitem(STEP_REGISTRY, "batch_echo", _Batch())
+        wf = {
+            "nodes": [
+                _node(
+                    "loop", "for_each",
+                    config={
+                        "items": ref,
+                        "handler": "batch_echo",
+                        "item_config": {"n": "{{_item.n}}"},
+                        "chunk_size": 2,
+                    },
+                )
+            ],
+            "edges": [],
+        }
+        run, step_runs = _setup_mocks(wf)
+        await WorkflowEngine(bus=_make_bus()).execute_run(str(run.id))
+
+        assert run.status == "completed", run.error
+        assert batches == [2, 2, 1]
+        output = step_runs[0].output
+        assert output["count"] == 5
+        # Results are streamed to an NDJSON artifact rather than kept in a list.
+        results = [loads(line) for line in store.iter_lines(output["results"]["artifact_id"])]
+        assert [r["n"] for r in results] == [0, 1, 2, 3, 4]
+
+
+class TestOffloadedOutputs:
+    """Fields offloaded to the artifact store are loaded for code that reads the context."""
+
+    @pytest.mark.asyncio
+    async def test_inline_code_reads_offloaded_field(self, monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+        from app.artifacts import LocalArtifactStore, offload
+
+        store = LocalArtifactStore(tmp_path)
+        monkeypatch.setattr(offload, "artifact_store", store)
+        rows = [{"id": n, "name": f"row-{n}"} for n in range(5000)]
+        wf = {
+            "nodes": [
+                _node("q", "transform", config={"mapping": {"rows": "{{input.rows}}", "total": 5000}}),
+                _node("count", "inline_code", config={"code": "result = len(context['q']['rows'])"}),
+                _node("check", "condition", config={"expression": "q['rows'][0]['id'] == 0"}),
+            ],
+            "edges": [_edge("q", "count"), _edge("q", "check")],
+        }
+        run, step_runs = _setup_mocks(wf, run_input={"rows": rows})
+        await WorkflowEngine(bus=_make_bus()).execute_run(str(run.id))
+
+        q = next(sr for sr in step_runs if sr.step_id == "q")
+        assert q.output["rows"]["lazy"] is True
+        assert run.status == "completed"
+        count = next(sr for sr in step_runs if sr.step_id == "count")
+        assert count.output == {"result": 5000}
+        check = next(sr for sr in step_runs if sr.step_id == "check")
+        assert check.output["result"] is True
+
+
+class TestContextLiveness:
+    """Step outputs are evicted from the context once every consumer has run."""
+
+    @pytest.mark.asyncio
+    async def test_outputs_evicted_after_last_consumer(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from app.steps.base import StepHandler
+        from app.steps.registry import STEP_REGISTRY
+
+        class _Echo(StepHandler):
+            step_type = "echo"
+            uses_context = False
+
+            async def execute(self, config: dict, context: dict) -> dict:
+                return dict(config)
+
+        monkeypatch.setitem(STEP_REGISTRY, "echo", _Echo())
+        wf = {
+            "nodes": [
+                _node("a", "echo", config={"v": "big"}),
+                _node("b", "echo", config={"v": "{{a.v}}"}),
+                _node("c", "echo", config={"v": "{{a.v}}", "w": "{{b.v}}"}),
+                _node("d", "echo", config={"v": "{{c.w}}"}),
+            ],
+            "edges": [_edge("a", "b"), _edge("b", "c"), _edge("c", "d")],
+        }
+        run, step_runs = _setup_mocks(wf)
+        await WorkflowEngine(bus=_make_bus()).execute_run(str(run.id))
+
+        assert run.status == "completed", run.error
+        # a is still available to c, two steps after it ran.
+        assert next(sr for sr in step_runs if sr.step_id == "c").output == {"v": "big", "w": "big"}
+        assert run.context["a"] == {"_evicted": True}
+        assert run.context["b"] == {"_evicted": True}
+        assert run.context["c"] == {"_evicted": True}
+        # Nothing reads d, so it is kept as a run result.
+        assert run.context["d"] == {"v": "big"}
+
+    @pytest.mark.asyncio
+    async def test_context_keeps_only_referenced_paths(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        from app.steps.base import StepHandler
+        from app.steps.registry import STEP_REGISTRY
+
+        class _Echo(StepHandler):
+            step_type = "echo"
+            uses_context = False
+
+            async def execute(self, config: dict, context: dict) -> dict:
+                return dict(config)
+
+        monkeypatch.setitem(STEP_REGISTRY, "echo", _Echo())
+        wf = {
+            "nodes": [
+                _node("a", "echo", config={"headers": {"h": 1}, "body": {"id": 7, "blob": "x" * 100}}),
+                _node("b", "wait_for_approval", config={"prompt": "ok?"}),
+                _node("c", "echo", config={"id": "{{a.body.id}}"}),
+            ],
+            "edges": [_edge("a", "b"), _edge("b", "c")],
+        }
+        run, step_runs = _setup_mocks(wf)
+        await WorkflowEngine(bus=_make_bus()).execute_run(str(run.id))
+
+        assert run.status == "paused"
+        assert run.context["a"] == {"body": {"id": 7}}
+        # The step run still has the full output.
+        assert "headers" in next(sr for sr in step_runs if sr.step_id == "a").output
+
+
 class TestStepSkipOnError:
     """Step with on_error=skip allows the run to continue."""
 
@@ -2,10 +2,27 @@
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import pytest
 
+from app.engine.compact_graph import (
+    COMPACT_GRAPH_THRESHOLD,
+    CompactWorkflowGraph,
+    WorkflowGraphLike,
+    build_workflow_graph,
+)
 from app.engine.graph import WorkflowGraph
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+@pytest.fixture(params=[WorkflowGraph, CompactWorkflowGraph], ids=["dict", "compact"])
+def graph_cls(request: pytest.FixtureRequest) -> type[WorkflowGraphLike]:
+    """The graph backend under test; every test using it runs against both."""
+    return request.param
+
 
 def _node(nid: str, ntype: str = "http_request") -> dict:
     return {"id": nid, "type": ntype, "data": {"label": nid, "config": {}}}
@@ -18,16 +35,16 @@ def _edge(src: str, tgt: str, **kw: object) -> dict:
 
 
 class TestTopologicalSort:
-    def test_linear(self) -> None:
-        graph = WorkflowGraph(
+    def test_linear(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c")],
             [_edge("a", "b"), _edge("b", "c")],
         )
         order = graph.topological_sort()
         assert order.index("a") < order.index("b") < order.index("c")
 
-    def test_parallel(self) -> None:
-        graph = WorkflowGraph(
+    def test_parallel(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c")],
             [_edge("a", "c"), _edge("b", "c")],
         )
@@ -35,8 +52,8 @@ class TestTopologicalSort:
         assert order.index("a") < order.index("c")
         assert order.index("b") < order.index("c")
 
-    def test_cycle_raises(self) -> None:
-        graph = WorkflowGraph(
+    def test_cycle_raises(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b")],
             [_edge("a", "b"), _edge("b", "a")],
         )
@@ -45,15 +62,15 @@ class TestTopologicalSort:
 
 
 class TestHasCycle:
-    def test_no_cycle(self) -> None:
-        graph = WorkflowGraph(
+    def test_no_cycle(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b")],
             [_edge("a", "b")],
         )
         assert graph.has_cycle() is False
 
-    def test_with_cycle(self) -> None:
-        graph = WorkflowGraph(
+    def test_with_cycle(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c")],
             [_edge("a", "b"), _edge("b", "c"), _edge("c", "a")],
         )
@@ -61,16 +78,16 @@ class TestHasCycle:
 
 
 class TestExecutionLevels:
-    def test_linear_levels(self) -> None:
-        graph = WorkflowGraph(
+    def test_linear_levels(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c")],
             [_edge("a", "b"), _edge("b", "c")],
         )
         levels = graph.execution_levels()
         assert levels == [["a"], ["b"], ["c"]]
 
-    def test_parallel_levels(self) -> None:
-        graph = WorkflowGraph(
+    def test_parallel_levels(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c"), _node("d")],
             [_edge("a", "b"), _edge("a", "c"), _edge("b", "d"), _edge("c", "d")],
         )
@@ -81,7 +98,7 @@ class TestExecutionLevels:
 
 
 class TestExclusiveBranchNodes:
-    def test_diamond_merge_not_skipped(self) -> None:
+    def test_diamond_merge_not_skipped(self, graph_cls: type[WorkflowGraphLike]) -> None:
         """When branches merge at a common node, that node shouldn't be skipped."""
         nodes = [
             _node("cond", "condition"),
@@ -95,14 +112,14 @@ class TestExclusiveBranchNodes:
             _edge("yes", "merge"),
             _edge("no", "merge"),
         ]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         # Skipping the "false" branch should NOT include "merge"
         exclusive = graph.get_exclusive_branch_nodes("cond", "false")
         assert "no" in exclusive
         assert "merge" not in exclusive
 
-    def test_exclusive_without_merge(self) -> None:
+    def test_exclusive_without_merge(self, graph_cls: type[WorkflowGraphLike]) -> None:
         """When branches don't merge, exclusive == full branch."""
         nodes = [
             _node("cond", "condition"),
@@ -113,15 +130,15 @@ class TestExclusiveBranchNodes:
             _edge("cond", "yes", sourceHandle="true"),
             _edge("cond", "no", sourceHandle="false"),
         ]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         exclusive = graph.get_exclusive_branch_nodes("cond", "false")
         assert exclusive == {"no"}
 
 
 class TestSubgraph:
-    def test_subgraph_extraction(self) -> None:
-        graph = WorkflowGraph(
+    def test_subgraph_extraction(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c"), _node("d")],
             [_edge("a", "b"), _edge("b", "c"), _edge("c", "d")],
         )
@@ -131,36 +148,36 @@ class TestSubgraph:
 
 
 class TestNodeAccessors:
-    def test_get_node_type(self) -> None:
-        graph = WorkflowGraph([_node("a", "condition")], [])
+    def test_get_node_type(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls([_node("a", "condition")], [])
         assert graph.get_node_type("a") == "condition"
 
-    def test_get_node_label(self) -> None:
-        graph = WorkflowGraph([_node("a")], [])
+    def test_get_node_label(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls([_node("a")], [])
         assert graph.get_node_label("a") == "a"
 
-    def test_leaf_ids(self) -> None:
-        graph = WorkflowGraph(
+    def test_leaf_ids(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c")],
             [_edge("a", "b"), _edge("b", "c")],
         )
         assert graph.leaf_ids == ["c"]
 
-    def test_node_count(self) -> None:
-        graph = WorkflowGraph([_node("a"), _node("b")], [])
+    def test_node_count(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls([_node("a"), _node("b")], [])
         assert graph.node_count == 2
 
 
 class TestCriticalPath:
-    def test_linear_critical_path(self) -> None:
-        graph = WorkflowGraph(
+    def test_linear_critical_path(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c")],
             [_edge("a", "b"), _edge("b", "c")],
         )
         assert graph.get_critical_path() == ["a", "b", "c"]
 
-    def test_diamond_critical_path(self) -> None:
-        graph = WorkflowGraph(
+    def test_diamond_critical_path(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a"), _node("b"), _node("c"), _node("d"), _node("e")],
             [
                 _edge("a", "b"),
@@ -178,11 +195,80 @@ class TestCriticalPath:
 
 
 class TestGetNodesByType:
-    def test_finds_matching(self) -> None:
-        graph = WorkflowGraph(
+    def test_finds_matching(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
             [_node("a", "http_request"), _node("b", "condition"), _node("c", "http_request")],
             [],
         )
         http_nodes = graph.get_nodes_by_type("http_request")
         ids = {n["id"] for n in http_nodes}
         assert ids == {"a", "c"}
+
+
+class TestReachabilityIndex:
+    def _diamond(self, graph_cls: type[WorkflowGraphLike]) -> WorkflowGraphLike:
+        return graph_cls(
+            [_node("a"), _node("b"), _node("c"), _node("d"), _node("e")],
+            [_edge("a", "b"), _edge("a", "c"), _edge("b", "d"), _edge("c", "d"), _edge("d", "e")],
+        )
+
+    def test_upstream_ids(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = self._diamond(graph_cls)
+        assert graph.get_upstream_ids("a") == set()
+        assert graph.get_upstream_ids("d") == {"a", "b", "c"}
+        assert graph.get_upstream_ids("e") == {"a", "b", "c", "d"}
+
+    def test_is_upstream(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = self._diamond(graph_cls)
+        assert graph.is_upstream("a", "e")
+        assert graph.is_upstream("b", "d")
+        assert not graph.is_upstream("b", "c")
+        assert not graph.is_upstream("e", "a")
+        assert not graph.is_upstream("missing", "e")
+
+    def test_descendants(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = self._diamond(graph_cls)
+        assert graph._all_descendants("b") == {"d", "e"}
+        assert graph._all_descendants("e") == set()
+        assert graph._all_descendants("missing") == set()
+
+    def test_cyclic_graph_falls_back_to_walk(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        graph = graph_cls(
+            [_node("a"), _node("b"), _node("c")],
+            [_edge("a", "b"), _edge("b", "c"), _edge("c", "b")],
+        )
+        assert graph.get_upstream_ids("c") == {"a", "b", "c"}
+        assert graph.is_upstream("a", "c")
+
+    def test_wide_graph_matches_walk(self, graph_cls: type[WorkflowGraphLike]) -> None:
+        nodes = [_node(f"n{i}") for i in range(200)]
+        edges = [_edge(f"n{i}", f"n{j}") for i in range(200) for j in (2 * i + 1, 2 * i + 2) if j < 200]
+        graph = graph_cls(nodes, edges)
+
+        def walk(start: str, step: Callable[[str], list[str]]) -> set[str]:
+            seen: set[str] = set()
+            stack = list(step(start))
+            while stack:
+                current = stack.pop()
+                if current not in seen:
+                    seen.add(current)
+                    stack.extend(step(current))
+            return seen
+
+        for nid in ("n0", "n57", "n199"):
+            assert graph.get_upstream_ids(nid) == walk(nid, graph.get_upstream)
+            assert graph._all_descendants(nid) == walk(nid, graph.get_downstream)
+
+
+class TestBuildWorkflowGraph:
+    def test_small_definitions_use_dict_backend(self) -> None:
+        graph = build_workflow_graph([_node("a")], [])
+        assert type(graph).__name__ == "WorkflowGraph"
+
+    def test_large_definitions_use_compact_backend(self) -> None:
+        nodes = [_node(f"n{i}") for i in range(COMPACT_GRAPH_THRESHOLD)]
+        edges = [_edge(f"n{i}", f"n{i + 1}") for i in range(COMPACT_GRAPH_THRESHOLD - 1)]
+        graph = build_workflow_graph(nodes, edges)
+        assert isinstance(graph, CompactWorkflowGraph)
+        assert graph.is_upstream("n0", f"n{COMPACT_GRAPH_THRESHOLD - 1}")
+        assert [n["id"] for n in graph.get_ready_steps({"n0"})] == ["n1"]
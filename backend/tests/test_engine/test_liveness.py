@@ -0,0 +1,128 @@
+"""Tests for step-output liveness in the run context."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from app.engine.graph import WorkflowGraph
+from app.engine.liveness import ContextLiveness, is_evicted, node_reads, project
+
+
+def _node(nid: str, ntype: str, config: dict[str, Any]) -> dict[str, Any]:
+    return {"id": nid, "type": ntype, "data": {"label": nid, "config": config}}
+
+
+def _edge(src: str, tgt: str) -> dict[str, Any]:
+    return {"id": f"{src}-{tgt}", "source": src, "target": tgt}
+
+
+class TestNodeReads:
+    def test_template_paths(self) -> None:
+        reads = node_reads("http_request", {"url": "https://x/{{fetch.body.id}}", "body": "{{input.q}}"})
+        assert reads == {"fetch.body.id", "input.q"}
+
+    def test_template_expressions_read_names_whole(self) -> None:
+        reads = node_reads("http_request", {"url": "{{ a.x + b.y | string }}"})
+        assert reads == {"a", "b"}
+        assert node_reads("http_request", {"url": "{% for r in a.rows %}{{ r }}{% endfor %}"}) is None
+
+    def test_condition_expression_names(self) -> None:
+        assert node_reads("condition", {"expression": "check['ok'] == True"}) == {"check"}
+
+    def test_inline_code_subscripts(self) -> None:
+        reads = node_reads("inline_code", {"code": "result = context['rows'] + input['n']"})
+        assert reads == {"input", "rows"}
+
+    def test_for_each_uses_item_handler(self) -> None:
+        config = {"items": "{{fetch.rows}}", "handler": "http_request", "item_config": {"url": "{{_item.url}}"}}
+        assert node_reads("for_each", config) == {"fetch.rows", "_item.url"}
+
+    def test_unknown_reads(self) -> None:
+        assert node_reads("function_call", {"function": "f"}) is None
+        assert node_reads("inline_code", {"code": "result = dict(context)"}) is None
+        assert node_reads("no_such_step", {}) is None
+
+
+class TestProjection:
+    def test_keeps_only_referenced_paths(self) -> None:
+        output = {"status_code": 200, "headers": {"a": "b"}, "body": {"id": 7, "blob": "x" * 100}}
+        assert project(output, {"body": {"id": None}}) == {"body": {"id": 7}}
+
+    def test_lists_and_missing_keys(self) -> None:
+        output = {"rows": [{"a": 1, "b": 2}], "n": 1}
+        assert project(output, {"rows": {"0": None}, "missing": None}) == {"rows": [{"a": 1, "b": 2}]}
+
+    def test_paths_merged_across_consumers(self) -> None:
+        graph = WorkflowGraph(
+            [
+                _node("fetch", "http_request", {"url": "https://a"}),
+                _node("b", "http_request", {"url": "{{fetch.body.url}}"}),
+                _node("c", "http_request", {"url": "{{fetch.body.next.url}}", "body": "{{fetch.status_code}}"}),
+            ],
+            [_edge("fetch", "b"), _edge("fetch", "c")],
+        )
+        liveness = ContextLiveness(graph)
+        output = {
+            "status_code": 200,
+            "headers": {"x": "y"},
+            "body": {"url": "u", "next": {"url": "n", "extra": 1}, "other": 2},
+        }
+
+        assert liveness.project("fetch", output) == {
+            "status_code": 200,
+            "body": {"url": "u", "next": {"url": "n"}},
+        }
+        assert liveness.project("c", output) is output
+
+    def test_whole_reads_win(self) -> None:
+        graph = WorkflowGraph(
+            [
+                _node("fetch", "http_request", {"url": "https://a"}),
+                _node("b", "http_request", {"url": "{{fetch.body.url}}"}),
+                _node("c", "condition", {"expression": "fetch['status_code'] == 200"}),
+            ],
+            [_edge("fetch", "b"), _edge("fetch", "c")],
+        )
+        output = {"status_code": 200, "body": {"url": "u"}}
+
+        assert ContextLiveness(graph).project("fetch", output) is output
+
+
+class TestContextLiveness:
+    def _graph(self) -> WorkflowGraph:
+        nodes = [
+            _node("a", "http_request", {"url": "https://a"}),
+            _node("b", "http_request", {"url": "{{a.url}}"}),
+            _node("c", "http_request", {"url": "{{a.url}}/{{b.status}}"}),
+        ]
+        return WorkflowGraph(nodes, [_edge("a", "b"), _edge("b", "c")])
+
+    def test_dead_once_all_consumers_done(self) -> None:
+        liveness = ContextLiveness(self._graph())
+
+        assert liveness.consumers == {"a": {"b", "c"}, "b": {"c"}}
+        assert liveness.dead({"a", "b"}) == set()
+        assert liveness.dead({"a", "b", "c"}) == {"a", "b"}
+
+    def test_opaque_node_keeps_upstream_outputs(self) -> None:
+        graph = WorkflowGraph(
+            [
+                _node("a", "http_request", {"url": "https://a"}),
+                _node("b", "http_request", {"url": "https://b"}),
+                _node("f", "function_call", {"function": "f"}),
+            ],
+            [_edge("a", "b"), _edge("b", "f")],
+        )
+        liveness = ContextLiveness(graph)
+
+        assert liveness.dead({"a", "b"}) == set()
+        assert liveness.dead({"a", "b", "f"}) == {"a", "b"}
+
+    def test_evict_replaces_with_marker(self) -> None:
+        liveness = ContextLiveness(self._graph())
+        context = {"input": {}, "a": {"url": "https://a"}, "b": {"status": 200}, "c": {"status": 201}}
+
+        assert sorted(liveness.evict(context, {"a", "b", "c"})) == ["a", "b"]
+        assert is_evicted(context["a"]) and is_evicted(context["b"])
+        assert context["c"] == {"status": 201}
+        assert liveness.evict(context, {"a", "b", "c"}) == []
@@ -0,0 +1,146 @@
+"""Tests for request coalescing of identical in-flight step calls."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.engine.singleflight import SingleFlight, config_hash
+
+
+def _counting_call(result: dict, gate: asyncio.Event) -> tuple[list[int], object]:
+    calls: list[int] = []
+
+    async def fn() -> dict:
+        calls.append(1)
+        await gate.wait()
+        return result
+
+    return calls, fn
+
+
+class TestConfigHash:
+    def test_key_order_does_not_matter(self) -> None:
+        assert config_hash({"a": 1, "b": [1, 2]}) == config_hash({"b": [1, 2], "a": 1})
+
+    def test_different_configs_differ(self) -> None:
+        assert config_hash({"url": "https://a"}) != config_hash({"url": "https://b"})
+
+    def test_non_json_values_fall_back(self) -> None:
+        assert config_hash({"when": object}) == config_hash({"when": object})
+
+
+class TestAllowlist:
+    def test_side_effecting_types_rejected(self) -> None:
+        with pytest.raises(ValueError, match="webhook"):
+            SingleFlight(["http_request", "webhook"])
+
+    def test_allows_only_listed_types(self) -> None:
+        sf = SingleFlight(["http_request"])
+        assert sf.allows("http_request")
+        assert not sf.allows("llm_call")
+
+    def test_key_includes_step_type(self) -> None:
+        sf = SingleFlight(["http_request", "llm_call"])
+        assert sf.key("http_request", {"x": 1}) != sf.key("llm_call", {"x": 1})
+
+    def test_key_includes_context_view(self) -> None:
+        sf = SingleFlight(["http_request"])
+        assert sf.key("http_request", {"x": 1}, {}) == sf.key("http_request", {"x": 1})
+        assert sf.key("http_request", {"x": 1}, {"input": {"n": 1}}) != sf.key(
+            "http_request", {"x": 1}, {"input": {"n": 2}}
+        )
+
+
+class TestDo:
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_run_once(self) -> None:
+        sf = SingleFlight(["http_request"])
+        gate = asyncio.Event()
+        calls, fn = _counting_call({"items": [1]}, gate)
+
+        tasks = [asyncio.create_task(sf.do("k", fn)) for _ in range(3)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks)
+
+        assert len(calls) == 1
+        assert [coalesced for _, coalesced in results] == [False, True, True]
+        assert sf.stats()["coalesced"] == 2
+        assert len(sf) == 0
+
+    @pytest.mark.asyncio
+    async def test_callers_get_independent_copies(self) -> None:
+        sf = SingleFlight(["http_request"])
+        gate = asyncio.Event()
+        _, fn = _counting_call({"items": [1]}, gate)
+
+        tasks = [asyncio.create_task(sf.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        gate.set()
+        (first, _), (second, _) = await asyncio.gather(*tasks)
+
+        first["items"].append(2)
+        assert second["items"] == [1]
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_coalesced(self) -> None:
+        sf = SingleFlight(["http_request"])
+        gate = asyncio.Event()
+        gate.set()
+        calls, fn = _counting_call({}, gate)
+
+        await sf.do("k", fn)
+        _, coalesced = await sf.do("k", fn)
+
+        assert len(calls) == 2
+        assert coalesced is False
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self) -> None:
+        sf = SingleFlight(["http_request"])
+        gate = asyncio.Event()
+
+        async def fn() -> dict:
+            await gate.wait()
+            raise RuntimeError("boom")
+
+        tasks = [asyncio.create_task(sf.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_follower_survives_leader_cancellation(self) -> None:
+        sf = SingleFlight(["http_request"])
+        gate = asyncio.Event()
+        calls, fn = _counting_call({"ok": True}, gate)
+
+        leader = asyncio.create_task(sf.do("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(sf.do("k", fn))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+
+        assert await follower == ({"ok": True}, True)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_last_caller_cancelling_cancels_call(self) -> None:
+        sf = SingleFlight(["http_request"])
+        gate = asyncio.Event()
+        _, fn = _counting_call({}, gate)
+
+        caller = asyncio.create_task(sf.do("k", fn))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+        assert len(sf) == 0
@@ -0,0 +1,135 @@
+"""Tests for the timing wheel and the timer service that wakes delayed runs."""
+
+from __future__ import annotations
+
+import time
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.config import TimerSettings
+from app.engine.timers import TimerService, TimingWheel
+
+
+class TestTimingWheel:
+    def test_fires_on_due_tick(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=8, levels=2, start=0)
+        wheel.add("a", 3)
+
+        assert wheel.advance(2) == []
+        assert wheel.advance(3) == ["a"]
+        assert len(wheel) == 0
+
+    def test_cascades_from_higher_levels(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=8, levels=3, start=0)
+        dues = {"near": 5, "mid": 20, "far": 300}
+        for key, due in dues.items():
+            wheel.add(key, due)
+
+        fired: dict[str, int] = {}
+        for now in range(1, 400):
+            for key in wheel.advance(now):
+                fired[key] = now
+
+        assert fired == dues
+
+    def test_cancel_and_move(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=8, levels=2, start=0)
+        wheel.add("a", 5)
+        wheel.add("b", 5)
+        wheel.cancel("a")
+        wheel.add("b", 9)
+
+        assert wheel.advance(8) == []
+        assert wheel.advance(9) == ["b"]
+
+    def test_past_due_fires_on_next_advance(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=8, levels=2, start=10)
+        wheel.add("late", 4)
+
+        assert "late" in wheel
+        assert wheel.advance(10) == ["late"]
+
+    def test_beyond_horizon_rejected(self) -> None:
+        wheel = TimingWheel(tick=1.0, slots=8, levels=2, start=0)
+
+        assert wheel.horizon == 64
+        assert wheel.add("x", 63)
+        assert not wheel.add("y", 100)
+        assert "y" not in wheel
+
+
+def _service(launch: AsyncMock) -> TimerService:
+    return TimerService(TimerSettings(lookahead_seconds=300), launch=launch)
+
+
+class TestTimerService:
+    @pytest.mark.asyncio
+    async def test_poll_loads_due_runs_into_wheel(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        now = time.time()
+        soon = datetime.fromtimestamp(now + 5, UTC)
+        wf_core_mock.get_due_runs = AsyncMock(return_value=[("r1", soon)])
+        service = _service(AsyncMock())
+
+        assert await service.poll(now) == 1
+        before = wf_core_mock.get_due_runs.call_args.args[0]
+        assert before == datetime.fromtimestamp(now + 300, UTC)
+        assert service.stats()["pending"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fire_resumes_due_run(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        run = SimpleNamespace(status="paused", due_at=datetime.now(UTC) - timedelta(seconds=1))
+        wf_core_mock.get_run = AsyncMock(return_value=run)
+        wf_core_mock.claim_paused_runs = AsyncMock(return_value=["r1"])
+        wf_core_mock.create_run_event = AsyncMock()
+        launch = AsyncMock()
+        service = _service(launch)
+
+        assert await service.fire("r1")
+        wf_core_mock.claim_paused_runs.assert_awaited_once_with(["r1"])
+        launch.assert_awaited_once_with("r1")
+
+    @pytest.mark.asyncio
+    async def test_fire_does_not_launch_when_claim_lost(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        # Paused when read, then resumed elsewhere before the claim.
+        run = SimpleNamespace(status="paused", due_at=datetime.now(UTC) - timedelta(seconds=1))
+        wf_core_mock.get_run = AsyncMock(return_value=run)
+        wf_core_mock.claim_paused_runs = AsyncMock(return_value=[])
+        wf_core_mock.create_run_event = AsyncMock()
+        launch = AsyncMock()
+
+        assert not await _service(launch).fire("r1")
+        wf_core_mock.create_run_event.assert_not_awaited()
+        launch.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_fire_skips_runs_no_longer_waiting(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        run = SimpleNamespace(status="cancelled", due_at=datetime.now(UTC))
+        wf_core_mock.get_run = AsyncMock(return_value=run)
+        launch = AsyncMock()
+
+        assert not await _service(launch).fire("r1")
+        launch.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_fire_reschedules_when_moved_later(self) -> None:
+        from tests.test_engine.conftest import wf_core_mock
+
+        run = SimpleNamespace(status="paused", due_at=datetime.now(UTC) + timedelta(seconds=60))
+        wf_core_mock.get_run = AsyncMock(return_value=run)
+        launch = AsyncMock()
+        service = _service(launch)
+
+        assert not await service.fire("r1")
+        launch.assert_not_awaited()
+        assert service.stats()["pending"] == 1
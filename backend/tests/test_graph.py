@@ -2,9 +2,16 @@ from __future__ import annotations
 
 import pytest
 
+from app.engine.compact_graph import CompactWorkflowGraph, WorkflowGraphLike
 from app.engine.graph import WorkflowGraph
 
 
+@pytest.fixture(params=[WorkflowGraph, CompactWorkflowGraph], ids=["dict", "compact"])
+def graph_cls(request: pytest.FixtureRequest) -> type[WorkflowGraphLike]:
+    """The graph backend under test; every test using it runs against both."""
+    return request.param
+
+
 def _make_node(nid: str, ntype: str = "http_request") -> dict:
     return {"id": nid, "type": ntype, "data": {"label": nid, "config": {}}}
 
@@ -16,15 +23,15 @@ def _make_edge(source: str, target: str, **kwargs: object) -> dict:
 
 
 class TestWorkflowGraphBasic:
-    def test_single_node(self):
-        graph = WorkflowGraph([_make_node("a")], [])
+    def test_single_node(self, graph_cls: type[WorkflowGraphLike]):
+        graph = graph_cls([_make_node("a")], [])
         assert graph.root_ids == ["a"]
         assert graph.node_ids == {"a"}
 
-    def test_linear_chain(self):
+    def test_linear_chain(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b"), _make_node("c")]
         edges = [_make_edge("a", "b"), _make_edge("b", "c")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         assert graph.root_ids == ["a"]
         assert graph.get_downstream("a") == ["b"]
@@ -33,37 +40,37 @@ class TestWorkflowGraphBasic:
 
 
 class TestReadySteps:
-    def test_root_always_ready(self):
+    def test_root_always_ready(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b")]
         edges = [_make_edge("a", "b")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         ready = graph.get_ready_steps(set())
         assert len(ready) == 1
         assert ready[0]["id"] == "a"
 
-    def test_child_ready_after_parent(self):
+    def test_child_ready_after_parent(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b")]
         edges = [_make_edge("a", "b")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         ready = graph.get_ready_steps({"a"})
         assert len(ready) == 1
         assert ready[0]["id"] == "b"
 
-    def test_parallel_roots(self):
+    def test_parallel_roots(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b"), _make_node("c")]
         edges = [_make_edge("a", "c"), _make_edge("b", "c")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         ready = graph.get_ready_steps(set())
         ids = {n["id"] for n in ready}
         assert ids == {"a", "b"}
 
-    def test_join_needs_all_parents(self):
+    def test_join_needs_all_parents(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b"), _make_node("c")]
         edges = [_make_edge("a", "c"), _make_edge("b", "c")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         ready_after_a = graph.get_ready_steps({"a"})
         ready_ids = {n["id"] for n in ready_after_a}
@@ -74,16 +81,16 @@ class TestReadySteps:
         assert len(ready) == 1
         assert ready[0]["id"] == "c"
 
-    def test_all_done_returns_empty(self):
+    def test_all_done_returns_empty(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b")]
         edges = [_make_edge("a", "b")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         assert graph.get_ready_steps({"a", "b"}) == []
 
 
 class TestBranchNodes:
-    def test_branch_via_source_handle(self):
+    def test_branch_via_source_handle(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [
             _make_node("cond", "condition"),
             _make_node("yes"),
@@ -93,7 +100,7 @@ class TestBranchNodes:
             _make_edge("cond", "yes", sourceHandle="true"),
             _make_edge("cond", "no", sourceHandle="false"),
         ]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         true_branch = graph.get_branch_nodes("cond", "true")
         assert "yes" in true_branch
@@ -103,7 +110,7 @@ class TestBranchNodes:
         assert "no" in false_branch
         assert "yes" not in false_branch
 
-    def test_branch_via_edge_data_condition(self):
+    def test_branch_via_edge_data_condition(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [
             _make_node("cond", "condition"),
             _make_node("yes"),
@@ -113,7 +120,7 @@ class TestBranchNodes:
             _make_edge("cond", "yes", data={"condition": "true"}),
             _make_edge("cond", "no", data={"condition": "false"}),
         ]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         true_branch = graph.get_branch_nodes("cond", "true")
         assert "yes" in true_branch
@@ -121,7 +128,7 @@ class TestBranchNodes:
         false_branch = graph.get_branch_nodes("cond", "false")
         assert "no" in false_branch
 
-    def test_branch_includes_descendants(self):
+    def test_branch_includes_descendants(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [
             _make_node("cond", "condition"),
             _make_node("yes"),
@@ -133,23 +140,23 @@ class TestBranchNodes:
             _make_edge("cond", "no", sourceHandle="false"),
             _make_edge("yes", "yes_child"),
         ]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         true_branch = graph.get_branch_nodes("cond", "true")
         assert true_branch == {"yes", "yes_child"}
 
 
 class TestUpstreamIds:
-    def test_upstream_linear(self):
+    def test_upstream_linear(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b"), _make_node("c")]
         edges = [_make_edge("a", "b"), _make_edge("b", "c")]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         assert graph.get_upstream_ids("c") == {"a", "b"}
         assert graph.get_upstream_ids("b") == {"a"}
         assert graph.get_upstream_ids("a") == set()
 
-    def test_upstream_diamond(self):
+    def test_upstream_diamond(self, graph_cls: type[WorkflowGraphLike]):
         nodes = [_make_node("a"), _make_node("b"), _make_node("c"), _make_node("d")]
         edges = [
             _make_edge("a", "b"),
@@ -157,6 +164,6 @@ class TestUpstreamIds:
             _make_edge("b", "d"),
             _make_edge("c", "d"),
         ]
-        graph = WorkflowGraph(nodes, edges)
+        graph = graph_cls(nodes, edges)
 
         assert graph.get_upstream_ids("d") == {"a", "b", "c"}
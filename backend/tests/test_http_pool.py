@@ -0,0 +1,422 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.config import HttpClientSettings
+from app.engine.exceptions import CircuitOpenError
+from app.http import HttpClientPool
+from app.http.breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitState
+from app.http.hedging import LatencyTracker
+from app.http.pool import host_key
+from app.http.ratelimit import AdaptiveConcurrency, RateLimiter, TokenBucket, parse_retry_after
+
+
+def _pool(handler, **overrides) -> HttpClientPool:
+    config = HttpClientSettings(**overrides)
+    return HttpClientPool(config=config, transport=httpx.MockTransport(handler))
+
+
+class TestHostKey:
+    def test_default_ports(self):
+        assert host_key("https://api.example.com/x") == "api.example.com:443"
+        assert host_key("http://api.example.com/x") == "api.example.com:80"
+        assert host_key("http://localhost:8080/") == "localhost:8080"
+
+
+class TestHttpClientPool:
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self):
+        active = {"a.test": 0, "b.test": 0}
+        peak = {"a.test": 0, "b.test": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            host = request.url.host
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+            await asyncio.sleep(0.01)
+            active[host] -= 1
+            return httpx.Response(200)
+
+        pool = _pool(handler, max_connections_per_host=2)
+        await asyncio.gather(
+            *(pool.request("GET", f"https://{host}/") for host in ("a.test", "b.test") * 5)
+        )
+
+        assert peak == {"a.test": 2, "b.test": 2}
+        stats = pool.stats()
+        assert stats["requests"] == 10
+        host = stats["hosts"]["a.test:443"]
+        assert (host["in_flight"], host["waiting"], host["requests"]) == (0, 0, 5)
+
+    @pytest.mark.asyncio
+    async def test_stream_holds_host_slot(self):
+        pool = _pool(lambda request: httpx.Response(200, content=b"abc"))
+        async with pool.stream("GET", "https://a.test/") as response:
+            assert pool.stats()["hosts"]["a.test:443"]["in_flight"] == 1
+            assert await response.aread() == b"abc"
+        assert pool.stats()["hosts"]["a.test:443"]["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_are_counted(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("boom", request=request)
+
+        pool = _pool(handler)
+        with pytest.raises(httpx.ConnectError):
+            await pool.request("GET", "https://a.test/")
+        assert pool.stats()["errors"] == 1
+        assert pool.stats()["hosts"]["a.test:443"]["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_close_and_reopen(self):
+        pool = _pool(lambda request: httpx.Response(204))
+        await pool.start()
+        first = pool.client
+        assert pool.stats()["open"] is True
+
+        await pool.aclose()
+        assert pool.stats()["open"] is False
+
+        response = await pool.request("GET", "https://a.test/")
+        assert response.status_code == 204
+        assert pool.client is not first
+
+    def test_http2_falls_back_without_h2(self, monkeypatch):
+        monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+        pool = HttpClientPool(config=HttpClientSettings(http2=True))
+        assert pool.http2 is False
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        clock = _Clock()
+        bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == pytest.approx(0.5)
+        assert bucket.reserve() == pytest.approx(1.0)
+
+        clock.now = 10.0
+        assert bucket.reserve() == 0.0
+
+    def test_zero_rate_is_unlimited(self):
+        bucket = TokenBucket(rate=0.0, burst=1)
+        assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+class TestAdaptiveConcurrency:
+    def test_additive_increase_multiplicative_decrease(self):
+        clock = _Clock()
+        aimd = AdaptiveConcurrency(maximum=16, minimum=2, clock=clock)
+        aimd.on_overload()
+        assert aimd.limit == 8.0
+        aimd.on_overload()  # within cooldown: a burst of failures counts once
+        assert aimd.limit == 8.0
+
+        clock.now = 5.0
+        aimd.on_overload()
+        aimd.on_overload()
+        assert aimd.limit == 4.0
+
+        for _ in range(4):
+            aimd.on_success()
+        assert 4.9 < aimd.limit < 5.0
+
+    def test_limit_stays_within_bounds(self):
+        clock = _Clock()
+        aimd = AdaptiveConcurrency(maximum=4, minimum=2, clock=clock)
+        for i in range(10):
+            clock.now = float(i * 10)
+            aimd.on_overload()
+        assert aimd.limit == 2.0
+        for _ in range(100):
+            aimd.on_success()
+        assert aimd.limit == 4.0
+
+
+class TestRetryAfter:
+    def test_seconds_and_dates(self):
+        assert parse_retry_after("5") == 5.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after("99999") == 300.0
+        assert parse_retry_after(
+            "Wed, 21 Oct 2015 07:28:10 GMT", now=lambda: 1445412480.0
+        ) == pytest.approx(10.0)
+
+
+class TestRateLimitedPool:
+    @pytest.mark.asyncio
+    async def test_overload_shrinks_host_concurrency(self):
+        pool = _pool(lambda request: httpx.Response(429), max_connections_per_host=8)
+        await pool.request("GET", "https://a.test/")
+        host = pool.stats()["hosts"]["a.test:443"]
+        assert host["concurrency_limit"] == 4.0
+        assert host["throttled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_host(self):
+        pool = _pool(lambda request: httpx.Response(503, headers={"Retry-After": "30"}))
+        await pool.request("GET", "https://a.test/")
+        assert pool.stats()["hosts"]["a.test:443"]["blocked_for_seconds"] > 29
+
+    @pytest.mark.asyncio
+    async def test_scoped_policies_get_separate_buckets(self):
+        pool = _pool(lambda request: httpx.Response(200))
+        policy = {"scope": "org-1", "requests_per_second": 50, "burst": 1}
+        await pool.request("GET", "https://a.test/", rate_limit=policy)
+        await pool.request("GET", "https://a.test/")
+
+        hosts = pool.stats()["hosts"]
+        assert hosts["org-1:a.test:443@50/1"]["rate_per_second"] == 50
+        assert hosts["a.test:443"]["rate_per_second"] == 0
+
+    @pytest.mark.asyncio
+    async def test_policies_do_not_reconfigure_each_other(self):
+        pool = _pool(lambda request: httpx.Response(200))
+        await pool.request("GET", "https://a.test/", rate_limit={"requests_per_second": 50})
+        await pool.request("GET", "https://a.test/", rate_limit={"requests_per_second": 5})
+
+        hosts = pool.stats()["hosts"]
+        assert hosts["a.test:443@50/10"]["rate_per_second"] == 50
+        assert hosts["a.test:443@5/10"]["rate_per_second"] == 5
+
+    def test_idle_limiters_evicted_least_recently_used_first(self):
+        limiter = RateLimiter(HttpClientSettings(rate_limit_max_hosts=2))
+        a = limiter.limiter("a.test:443")
+        limiter.limiter("b.test:443")
+        assert limiter.limiter("a.test:443") is a
+        a.waiting = 1  # in use: never evicted
+        limiter.limiter("c.test:443")
+        limiter.limiter("d.test:443")
+
+        assert sorted(limiter.stats()) == ["a.test:443", "d.test:443"]
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_spaces_requests(self):
+        loop = asyncio.get_running_loop()
+        sent: list[float] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(loop.time())
+            return httpx.Response(200)
+
+        pool = _pool(handler)
+        policy = {"requests_per_second": 50, "burst": 1}
+        await asyncio.gather(
+            *(pool.request("GET", "https://a.test/", rate_limit=policy) for _ in range(4))
+        )
+        assert sent[-1] - sent[0] >= 0.05
+
+
+def _breaker_config(**overrides) -> HttpClientSettings:
+    defaults = {
+        "breaker_min_calls": 4,
+        "breaker_failure_rate": 0.5,
+        "breaker_window_seconds": 10.0,
+        "breaker_open_seconds": 5.0,
+    }
+    return HttpClientSettings(**(defaults | overrides))
+
+
+class TestCircuitBreaker:
+    def test_opens_on_failure_rate_and_fails_fast(self):
+        clock = _Clock()
+        breaker = CircuitBreaker("a.test:443", _breaker_config(), clock=clock)
+        for ok in (True, False, True):
+            breaker.before_call()
+            breaker.record(ok)
+        assert breaker.state is CircuitState.CLOSED
+
+        breaker.before_call()
+        breaker.record(False)
+        assert breaker.state is CircuitState.OPEN
+
+        clock.now = 2.0
+        with pytest.raises(CircuitOpenError) as info:
+            breaker.before_call()
+        assert info.value.retry_in_seconds == pytest.approx(3.0)
+        assert breaker.stats()["short_circuited"] == 1
+
+    def test_half_open_probe_closes_or_reopens(self):
+        clock = _Clock()
+        breaker = CircuitBreaker("a.test:443", _breaker_config(breaker_min_calls=1), clock=clock)
+        breaker.before_call()
+        breaker.record(False)
+        assert breaker.state is CircuitState.OPEN
+
+        clock.now = 6.0
+        breaker.before_call()
+        assert breaker.state is CircuitState.HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()  # only one probe at a time
+        breaker.record(False)
+        assert breaker.state is CircuitState.OPEN
+
+        clock.now = 12.0
+        breaker.before_call()
+        breaker.record(True)
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_old_outcomes_leave_the_window(self):
+        clock = _Clock()
+        breaker = CircuitBreaker("a.test:443", _breaker_config(), clock=clock)
+        for _ in range(3):
+            breaker.record(False)
+        clock.now = 20.0
+        breaker.record(False)
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.stats()["calls_in_window"] == 1
+
+    def test_idle_breakers_evicted_least_recently_used_first(self):
+        registry = CircuitBreakerRegistry(_breaker_config(breaker_max_hosts=2))
+        a = registry.breaker("a.test:443")
+        registry.breaker("b.test:443")
+        assert registry.breaker("a.test:443") is a
+        a.record(False)  # a recent failure: never evicted
+        registry.breaker("c.test:443")
+        registry.breaker("d.test:443")
+
+        assert sorted(registry.stats()) == ["a.test:443", "d.test:443"]
+
+
+class TestBreakerInPool:
+    @pytest.mark.asyncio
+    async def test_pool_short_circuits_downed_host(self):
+        calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            raise httpx.ConnectError("refused", request=request)
+
+        pool = HttpClientPool(
+            config=_breaker_config(breaker_min_calls=2),
+            transport=httpx.MockTransport(handler),
+        )
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await pool.request("GET", "https://down.test/")
+        with pytest.raises(CircuitOpenError):
+            await pool.request("GET", "https://down.test/")
+
+        assert calls == 2
+        assert pool.stats()["breakers"]["down.test:443"]["state"] == "open"
+        # Other hosts are unaffected.
+        with pytest.raises(httpx.ConnectError):
+            await pool.request("GET", "https://up.test/")
+
+    @pytest.mark.asyncio
+    async def test_429_does_not_trip_breaker(self):
+        pool = HttpClientPool(
+            config=_breaker_config(breaker_min_calls=1),
+            transport=httpx.MockTransport(lambda request: httpx.Response(429)),
+        )
+        await pool.request("GET", "https://a.test/")
+        assert pool.stats()["breakers"]["a.test:443"]["state"] == "closed"
+
+
+class TestHedging:
+    @staticmethod
+    def _slow_first(first_delay: float):
+        calls = {"n": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls["n"] += 1
+            n = calls["n"]
+            await asyncio.sleep(first_delay if n == 1 else 0)
+            return httpx.Response(200, json={"attempt": n})
+
+        return handler, calls
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        handler, calls = self._slow_first(1.0)
+        pool = _pool(handler)
+        response, meta = await pool.hedged_request("GET", "https://a.test/", hedge={"delay_ms": 10})
+
+        assert response.json() == {"attempt": 2}
+        assert meta["hedged"] is True
+        assert meta["winner"] == "hedge"
+        assert calls["n"] == 2
+        assert pool.stats()["hedging"] == {"requests": 1, "hedges": 1, "hedge_wins": 1}
+        # The cancelled primary releases its host slot.
+        await asyncio.sleep(0)
+        assert pool.stats()["hosts"]["a.test:443"]["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        handler, calls = self._slow_first(0)
+        pool = _pool(handler)
+        _, meta = await pool.hedged_request("GET", "https://a.test/", hedge={"delay_ms": 200})
+        assert meta["hedged"] is False
+        assert calls["n"] == 1
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_hedges(self):
+        handler, calls = self._slow_first(0.05)
+        pool = _pool(handler, hedge_budget_ratio=0.0)
+        pool.hedge_budget.hedges = 2  # burst already spent
+        _, meta = await pool.hedged_request("GET", "https://a.test/", hedge={"delay_ms": 1})
+        assert meta["hedged"] is False
+        assert meta["budget_exhausted"] is True
+        assert calls["n"] == 1
+
+    @pytest.mark.asyncio
+    async def test_non_idempotent_methods_are_sent_once(self):
+        handler, calls = self._slow_first(0.05)
+        pool = _pool(handler)
+        _, meta = await pool.hedged_request("POST", "https://a.test/", hedge={"delay_ms": 1})
+        assert meta["hedged"] is False
+        assert calls["n"] == 1
+
+    @pytest.mark.asyncio
+    async def test_put_and_delete_need_opt_in(self):
+        handler, calls = self._slow_first(0.05)
+        pool = _pool(handler)
+        _, meta = await pool.hedged_request("PUT", "https://a.test/", hedge={"delay_ms": 1})
+        assert meta["hedged"] is False
+        assert calls["n"] == 1
+
+        handler, calls = self._slow_first(1.0)
+        pool = _pool(handler)
+        _, meta = await pool.hedged_request(
+            "DELETE", "https://a.test/", hedge={"delay_ms": 10, "idempotent": True}
+        )
+        assert meta["hedged"] is True
+        assert calls["n"] == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_hedge_falls_back_to_primary(self):
+        calls = {"n": 0}
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise httpx.ConnectError("boom", request=request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200)
+
+        pool = _pool(handler)
+        response, meta = await pool.hedged_request("GET", "https://a.test/", hedge={"delay_ms": 1})
+        assert response.status_code == 200
+        assert meta["winner"] == "primary"
+
+    def test_latency_percentile(self):
+        tracker = LatencyTracker()
+        assert tracker.percentile("h", 95) is None
+        for ms in range(1, 101):
+            tracker.record("h", ms / 1000)
+        assert tracker.percentile("h", 95) == pytest.approx(0.095)
+        assert tracker.percentile("h", 50) == pytest.approx(0.050)
@@ -0,0 +1,262 @@
+"""Tests for zstd compression of large JSONB values."""
+
+from __future__ import annotations
+
+import json
+import uuid
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from app.artifacts import LocalArtifactStore, MemoryObjectClient, ObjectArtifactStore
+from app.config import JsonbCompressionSettings
+from app.db import compression
+from app.db.compression import JsonbCompressor, LazyJSON, is_compressed
+from app.db.custom.core import WfCore
+
+needs_zstd = pytest.mark.skipif(compression.zstd is None, reason="needs compression.zstd")
+
+
+def _config(**overrides) -> JsonbCompressionSettings:
+    defaults = {"enabled": True, "threshold_bytes": 256, "training_samples": 8}
+    return JsonbCompressionSettings(**{**defaults, **overrides})
+
+
+def _output(i: int) -> dict:
+    return {
+        "rows": [{"id": n, "status": "active", "owner": f"user-{i}"} for n in range(40)],
+        "total": 40,
+    }
+
+
+class _Codec:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def decode(self, value: dict) -> dict:
+        self.calls += 1
+        return {"decoded": value["size"]}
+
+
+class _EnvelopeCodec:
+    """Stands in for ``JsonbCompressor`` without zstd: envelopes hold plain JSON."""
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.scopes: list[str | None] = []
+        self.decoded = 0
+
+    async def encode(self, value: Any, scope: str | None = None) -> Any:
+        self.scopes.append(scope)
+        return {"_zstd": 1, "dict": None, "size": 0, "data": json.dumps(value)}
+
+    async def load_dictionaries(self, values: Any) -> None:
+        pass
+
+    def decode(self, value: Any) -> Any:
+        if not is_compressed(value):
+            return value
+        self.decoded += 1
+        return json.loads(value["data"])
+
+    def lazy(self, value: Any) -> Any:
+        return LazyJSON(value, self) if is_compressed(value) else value  # type: ignore[arg-type]
+
+
+class _Row(SimpleNamespace):
+    def to_dict(self) -> dict[str, Any]:
+        return dict(vars(self))
+
+
+class _FakeManager:
+    """The slice of a matrx_orm manager ``WfCore`` uses, over a dict."""
+
+    def __init__(self, **defaults: Any) -> None:
+        self.rows: dict[str, _Row] = {}
+        self._defaults = defaults
+
+    async def create_item(self, **data: Any) -> _Row:
+        row = _Row(**{"id": str(uuid.uuid4()), **self._defaults, **data})
+        self.rows[row.id] = row
+        return row
+
+    async def update_item(self, item_id: str, **updates: Any) -> _Row:
+        vars(self.rows[item_id]).update(updates)
+        return self.rows[item_id]
+
+    async def load_by_id(self, item_id: str) -> _Row | None:
+        return self.rows.get(item_id)
+
+    async def filter_items(self, **filters: Any) -> list[_Row]:
+        return [
+            row for row in self.rows.values()
+            if all(getattr(row, key) == value for key, value in filters.items())
+        ]
+
+
+def _core() -> tuple[WfCore, _EnvelopeCodec]:
+    codec = _EnvelopeCodec()
+    core = WfCore(compressor=codec)  # type: ignore[arg-type]
+    now = datetime.now(UTC)
+    core.runs = _FakeManager(status="running", trigger_type="manual", created_at=now)
+    core.step_runs = _FakeManager(
+        status="completed", step_type="transform", attempt=1, created_at=now
+    )
+    return core, codec
+
+
+async def _create_run(core: WfCore, context: dict) -> str:
+    run = await core.create_run(
+        {"org_id": "org", "user_id": "user", "workflow_id": "wf-1", "context": context}
+    )
+    return run.id
+
+
+class TestWfCore:
+    async def test_run_context_stored_compressed(self) -> None:
+        core, codec = _core()
+        context = _output(0)
+
+        run = await core.create_run(
+            {"org_id": "org", "user_id": "user", "workflow_id": "wf-1", "context": context}
+        )
+        updated = await core.update_run(run.id, {"context": {**context, "total": 41}})
+
+        assert is_compressed(core.runs.rows[run.id].context)
+        assert codec.scopes == ["wf-1", "wf-1"]
+        assert run.context == context
+        assert updated.context["total"] == 41
+        # Responses to writes reuse the context just written instead of decoding it.
+        assert codec.decoded == 0
+        assert (await core.get_run(run.id)).context["total"] == 41
+        assert codec.decoded == 1
+
+    async def test_step_run_output_scoped_to_its_workflow(self) -> None:
+        core, codec = _core()
+        run_id = await _create_run(core, {})
+
+        step_run = await core.create_step_run(
+            {"run_id": run_id, "step_id": "a", "output": _output(0)}
+        )
+        await core.update_step_run(str(step_run.id), {"output": _output(1)})
+
+        assert codec.scopes == ["wf-1", "wf-1", "wf-1"]
+        assert step_run.org_id == "org"
+        assert is_compressed(core.step_runs.rows[step_run.id].output)
+
+    async def test_get_step_runs_decodes_lazily(self) -> None:
+        core, codec = _core()
+        run_id = await _create_run(core, {})
+        await core.create_step_run({"run_id": run_id, "step_id": "a", "output": _output(0)})
+
+        [item] = await core.get_step_runs({"run_id": run_id})
+
+        assert isinstance(item.output, LazyJSON)
+        assert codec.decoded == 0
+        assert item.output["total"] == 40
+        assert codec.decoded == 1
+
+    async def test_get_step_runs_for_run_decodes(self) -> None:
+        core, _ = _core()
+        run_id = await _create_run(core, {})
+        await core.create_step_run({"run_id": run_id, "step_id": "a", "output": _output(0)})
+
+        [response] = await core.get_step_runs_for_run(run_id)
+
+        assert response.output == _output(0)
+
+
+class TestPassThrough:
+    async def test_disabled_stores_values_unchanged(self, tmp_path) -> None:
+        codec = JsonbCompressor(_config(enabled=False), LocalArtifactStore(root=tmp_path))
+        value = _output(0)
+
+        assert await codec.encode(value, "wf") is value
+        assert codec.decode(value) is value
+        assert codec.lazy(value) is value
+
+    def test_is_compressed(self) -> None:
+        assert is_compressed({"_zstd": 1, "data": ""})
+        assert not is_compressed({"_zstd": 2, "data": ""})
+        assert not is_compressed({"rows": []})
+        assert not is_compressed(None)
+
+
+class TestLazyJSON:
+    def test_decodes_once_on_first_access(self) -> None:
+        codec = _Codec()
+        lazy = LazyJSON({"_zstd": 1, "size": 12}, codec)  # type: ignore[arg-type]
+
+        assert codec.calls == 0
+        assert lazy["decoded"] == 12
+        assert dict(lazy) == {"decoded": 12}
+        assert len(lazy) == 1
+        assert codec.calls == 1
+
+
+@needs_zstd
+class TestCompression:
+    async def test_round_trip_above_threshold(self, tmp_path) -> None:
+        codec = JsonbCompressor(_config(), LocalArtifactStore(root=tmp_path))
+        value = _output(0)
+
+        stored = await codec.encode(value, "wf")
+
+        assert is_compressed(stored)
+        assert stored["dict"] is None
+        assert codec.decode(stored) == value
+        assert dict(codec.lazy(stored)) == value
+
+    async def test_small_values_skipped(self, tmp_path) -> None:
+        codec = JsonbCompressor(_config(), LocalArtifactStore(root=tmp_path))
+
+        assert await codec.encode({"ok": True}, "wf") == {"ok": True}
+        assert codec.stats()["skipped"] == 1
+
+    async def test_dictionary_trained_per_workflow(self, tmp_path) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        codec = JsonbCompressor(_config(), store)
+        for i in range(8):
+            await codec.encode(_output(i), "wf")
+
+        stored = await codec.encode(_output(99), "wf")
+        other = await codec.encode(_output(99), "other")
+
+        assert stored["dict"] is not None
+        assert store.exists(stored["dict"])
+        assert other["dict"] is None
+        # A fresh compressor (a restart) loads the dictionary from the store.
+        assert JsonbCompressor(_config(), store).decode(stored) == _output(99)
+
+    async def test_dictionaries_preloaded_for_decoding(self, tmp_path, monkeypatch) -> None:
+        store = LocalArtifactStore(root=tmp_path)
+        codec = JsonbCompressor(_config(), store)
+        for i in range(9):
+            stored = await codec.encode(_output(i), "wf")
+        assert stored["dict"] is not None
+
+        restarted = JsonbCompressor(_config(), store)
+        await restarted.load_dictionaries([stored, {"plain": True}])
+        monkeypatch.setattr(store, "read_bytes", lambda _id: pytest.fail("read on decode"))
+
+        assert restarted.decode(stored) == _output(8)
+
+    async def test_no_dictionary_on_non_durable_store(self) -> None:
+        codec = JsonbCompressor(_config(), ObjectArtifactStore(MemoryObjectClient()))
+        for i in range(9):
+            stored = await codec.encode(_output(i), "wf")
+
+        assert stored["dict"] is None
+        assert codec.stats()["dictionaries"] == 0
+
+    async def test_stats_report_ratio(self, tmp_path) -> None:
+        codec = JsonbCompressor(_config(), LocalArtifactStore(root=tmp_path))
+        await codec.encode(_output(0), "wf")
+
+        stats = codec.stats()
+        assert stats["compressed"] == 1
+        assert stats["bytes_in"] > stats["bytes_out"]
+        assert stats["ratio"] > 1
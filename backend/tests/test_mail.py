@@ -0,0 +1,292 @@
+"""Tests for the pooled SMTP client against a local SMTP stand-in."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+from email import message_from_bytes
+from email.message import EmailMessage
+
+import pytest
+
+from app.config import SmtpSettings
+from app.engine.exceptions import NonRetriableError, RetriableError
+from app.mail import SmtpError, SmtpPool, SmtpPoolRegistry
+from app.mail.smtp import dot_stuff
+from app.steps.send_email import SendEmailHandler
+
+
+class FakeSmtpServer:
+    """A small SMTP server speaking just enough of RFC 5321 for the client."""
+
+    def __init__(self, pipelining: bool = True, auth: bool = False) -> None:
+        self.pipelining = pipelining
+        self.auth = auth
+        self.messages: list[dict] = []
+        self.commands: list[str] = []
+        self.connections = 0
+        self.authenticated: list[str] = []
+        self._server: asyncio.Server | None = None
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def __aenter__(self) -> FakeSmtpServer:
+        self._server = await asyncio.start_server(self._session, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+
+        def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+
+        reply("220 fake ESMTP")
+        sender: str | None = None
+        recipients: list[str] = []
+        while line := await reader.readline():
+            command = line.decode().rstrip("\r\n")
+            self.commands.append(command)
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                extensions = ["fake"]
+                if self.pipelining:
+                    extensions.append("PIPELINING")
+                if self.auth:
+                    extensions.append("AUTH PLAIN LOGIN")
+                for ext in extensions[:-1]:
+                    reply(f"250-{ext}")
+                reply(f"250 {extensions[-1]}")
+            elif verb == "AUTH":
+                _, user, _ = base64.b64decode(command.split()[2]).split(b"\0")
+                self.authenticated.append(user.decode())
+                reply("235 ok")
+            elif verb == "MAIL":
+                sender = command[len("MAIL FROM:<") : -1]
+                recipients = []
+                reply("250 ok" if "blocked" not in sender else "550 sender blocked")
+            elif verb == "RCPT":
+                rcpt = command[len("RCPT TO:<") : -1]
+                if "reject" in rcpt:
+                    reply("550 no such user")
+                elif "busy" in rcpt:
+                    reply("451 try later")
+                else:
+                    recipients.append(rcpt)
+                    reply("250 ok")
+            elif verb == "DATA":
+                if sender is None or not recipients or "blocked" in sender:
+                    reply("554 no valid recipients")
+                    continue
+                reply("354 go ahead")
+                data = bytearray()
+                while (chunk := await reader.readline()) != b".\r\n":
+                    data += chunk
+                self.messages.append(
+                    {"sender": sender, "recipients": recipients, "data": bytes(data)}
+                )
+                reply("250 queued")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                reply("250 ok")
+            elif verb == "QUIT":
+                reply("221 bye")
+                break
+            else:
+                reply("502 not implemented")
+            await writer.drain()
+        writer.close()
+
+
+def _config(server: FakeSmtpServer, **overrides: object) -> SmtpSettings:
+    return SmtpSettings(
+        host="127.0.0.1",
+        port=server.port,
+        from_address="flows@example.com",
+        timeout_seconds=5,
+        **overrides,
+    )
+
+
+def _message(to: str = "alice@example.com", **headers: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "flows@example.com"
+    message["To"] = to
+    message["Subject"] = "Hello"
+    for name, value in headers.items():
+        message[name] = value
+    message.set_content("Hi there")
+    return message
+
+
+class TestDotStuff:
+    def test_escapes_leading_dots_and_terminates(self) -> None:
+        assert dot_stuff(b"a\n.b\n") == b"a\r\n..b\r\n.\r\n"
+
+    def test_adds_missing_line_ending(self) -> None:
+        assert dot_stuff(b"a") == b"a\r\n.\r\n"
+
+
+class TestSmtpPool:
+    @pytest.mark.asyncio
+    async def test_connection_reused_across_messages(self) -> None:
+        async with FakeSmtpServer() as server:
+            pool = SmtpPool(_config(server))
+            for _ in range(3):
+                await pool.send(_message())
+            await pool.aclose()
+
+        assert server.connections == 1
+        assert len(server.messages) == 3
+        assert sum(c.startswith("EHLO") for c in server.commands) == 1
+
+    @pytest.mark.asyncio
+    async def test_envelope_includes_bcc_but_headers_do_not(self) -> None:
+        async with FakeSmtpServer() as server:
+            pool = SmtpPool(_config(server))
+            await pool.send(_message(Cc="bob@example.com", Bcc="carol@example.com"))
+            await pool.aclose()
+
+        sent = server.messages[0]
+        assert sent["recipients"] == ["alice@example.com", "bob@example.com", "carol@example.com"]
+        assert message_from_bytes(sent["data"])["Bcc"] is None
+
+    @pytest.mark.asyncio
+    async def test_partial_rejection_is_reported(self) -> None:
+        async with FakeSmtpServer() as server:
+            pool = SmtpPool(_config(server))
+            result = await pool.send(_message("alice@example.com, reject@example.com"))
+            await pool.aclose()
+
+        assert result["rejected"] == {"reject@example.com": "550 no such user"}
+        assert server.messages[0]["recipients"] == ["alice@example.com"]
+
+    @pytest.mark.parametrize("pipelining", [True, False])
+    @pytest.mark.asyncio
+    async def test_refused_transaction_keeps_connection(self, pipelining: bool) -> None:
+        async with FakeSmtpServer(pipelining=pipelining) as server:
+            pool = SmtpPool(_config(server))
+            with pytest.raises(SmtpError) as exc_info:
+                await pool.send(_message("reject@example.com"))
+            await pool.send(_message())
+            await pool.aclose()
+
+        assert exc_info.value.code == 550
+        assert server.connections == 1
+        assert len(server.messages) == 1
+        assert "RSET" in server.commands
+
+    @pytest.mark.asyncio
+    async def test_connection_recycled_after_max_messages(self) -> None:
+        async with FakeSmtpServer() as server:
+            pool = SmtpPool(_config(server, max_messages_per_connection=2))
+            for _ in range(3):
+                await pool.send(_message())
+            await pool.aclose()
+
+        assert server.connections == 2
+
+    @pytest.mark.asyncio
+    async def test_send_many_uses_pool_connections(self) -> None:
+        async with FakeSmtpServer() as server:
+            pool = SmtpPool(_config(server, pool_size=3))
+            results = await pool.send_many(_message(f"user{i}@example.com") for i in range(12))
+            await pool.aclose()
+
+        assert len(server.messages) == 12
+        assert server.connections <= 3
+        assert all(isinstance(r, dict) for r in results)
+        assert pool.stats()["sent"] == 12
+
+    @pytest.mark.asyncio
+    async def test_authenticates_with_plain(self) -> None:
+        async with FakeSmtpServer(auth=True) as server:
+            pool = SmtpPool(_config(server, username="bot", password="secret"))
+            await pool.send(_message())
+            await pool.aclose()
+
+        assert server.authenticated == ["bot"]
+
+
+class TestSmtpPoolRegistry:
+    def test_named_provider_overrides_defaults(self) -> None:
+        registry = SmtpPoolRegistry(
+            SmtpSettings(host="smtp.example.com", providers={"bulk": {"host": "bulk.example.com"}})
+        )
+        assert registry.pool().stats()["host"] == "smtp.example.com"
+        assert registry.pool("bulk").stats()["host"] == "bulk.example.com"
+        assert registry.pool("bulk") is registry.pool("bulk")
+
+    @pytest.mark.asyncio
+    async def test_named_provider_with_credentials(self) -> None:
+        async with FakeSmtpServer(auth=True) as server:
+            # As parsed from SMTP_PROVIDERS: plain JSON values, port as a string.
+            provider = {"port": str(server.port), "username": "bulk", "password": "secret"}
+            registry = SmtpPoolRegistry(SmtpSettings(host="127.0.0.1", providers={"bulk": provider}))
+            await registry.pool("bulk").send(_message())
+            await registry.aclose()
+
+        assert server.authenticated == ["bulk"]
+
+    def test_unknown_provider(self) -> None:
+        with pytest.raises(KeyError):
+            SmtpPoolRegistry(SmtpSettings()).pool("missing")
+
+
+class TestSendEmailHandler:
+    @pytest.mark.asyncio
+    async def test_sends_message(self) -> None:
+        async with FakeSmtpServer() as server:
+            registry = SmtpPoolRegistry(_config(server))
+            handler = SendEmailHandler(mail=registry)
+            output = await handler.execute(
+                {"to": ["alice@example.com"], "subject": "Report", "body": "Done"}, {}
+            )
+            await registry.aclose()
+
+        assert output["status"] == "sent"
+        assert output["message_id"]
+        parsed = message_from_bytes(server.messages[0]["data"])
+        assert parsed["Subject"] == "Report"
+        assert parsed["From"] == "flows@example.com"
+
+    @pytest.mark.asyncio
+    async def test_smtp_errors_map_to_retry_semantics(self) -> None:
+        async with FakeSmtpServer() as server:
+            registry = SmtpPoolRegistry(_config(server))
+            handler = SendEmailHandler(mail=registry)
+            with pytest.raises(RetriableError):
+                await handler.execute({"to": "busy@example.com", "subject": "s", "body": "b"}, {})
+            with pytest.raises(NonRetriableError):
+                await handler.execute({"to": "reject@example.com", "subject": "s", "body": "b"}, {})
+            await registry.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_smtp_fails_fast(self) -> None:
+        handler = SendEmailHandler(mail=SmtpPoolRegistry(SmtpSettings(host="")))
+        with pytest.raises(NonRetriableError, match="SMTP_HOST"):
+            await handler.execute({"to": "a@example.com", "subject": "s", "body": "b"}, {})
+
+    @pytest.mark.asyncio
+    async def test_execute_batch_returns_results_in_order(self) -> None:
+        async with FakeSmtpServer() as server:
+            registry = SmtpPoolRegistry(_config(server, pool_size=2))
+            handler = SendEmailHandler(mail=registry)
+            configs = [
+                {"to": to, "subject": "s", "body": "b"}
+                for to in ("a@example.com", "reject@example.com", "c@example.com")
+            ]
+            results = await handler.execute_batch(configs, [{}] * 3)
+            await registry.aclose()
+
+        assert [r["sent_to"] if isinstance(r, dict) else None for r in results] == [
+            "a@example.com",
+            None,
+            "c@example.com",
+        ]
+        assert isinstance(results[1], NonRetriableError)
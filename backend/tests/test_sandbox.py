@@ -0,0 +1,161 @@
+"""Tests for the inline_code sandbox worker pool."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.config import SandboxSettings
+from app.sandbox import SandboxError, SandboxLimitExceededError, SandboxPool, SandboxTimeoutError
+from app.sandbox.worker import CodeCache
+from app.steps.inline_code import InlineCodeHandler
+
+
+def _pool(**overrides: object) -> SandboxPool:
+    return SandboxPool(SandboxSettings(workers=1, **overrides))
+
+
+class TestSandboxPool:
+    @pytest.mark.asyncio
+    async def test_runs_snippet_in_worker(self) -> None:
+        pool = _pool()
+        try:
+            await pool.start()
+            result = await pool.run("result = input['x'] + 1", {"input": {"x": 2}}, timeout=5)
+        finally:
+            await pool.aclose()
+
+        assert result == {"result": 3}
+        assert pool.stats()["executions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_snippet_errors_are_reported(self) -> None:
+        pool = _pool()
+        try:
+            with pytest.raises(SandboxError, match="ZeroDivisionError"):
+                await pool.run("result = 1 / 0", {}, timeout=5)
+            with pytest.raises(SandboxError, match="NameError"):
+                await pool.run("result = open('/etc/passwd')", {}, timeout=5)
+            # The worker survives ordinary snippet errors.
+            assert await pool.run("result = 1", {}, timeout=5) == {"result": 1}
+        finally:
+            await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_worker(self) -> None:
+        pool = _pool(cpu_seconds=0)
+        try:
+            with pytest.raises(SandboxTimeoutError):
+                await pool.run("while True:\n    pass", {}, timeout=0.5)
+            assert pool.stats()["timeouts"] == 1
+            assert await pool.run("result = 'ok'", {}, timeout=5) == {"result": "ok"}
+        finally:
+            await pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_cpu_limit(self) -> None:
+        pool = _pool(cpu_seconds=1)
+        try:
+            with pytest.raises(SandboxLimitExceededError) as exc_info:
+                await pool.run("while True:\n    pass", {}, timeout=30)
+        finally:
+            await pool.aclose()
+
+        assert exc_info.value.limit == "cpu"
+
+    @pytest.mark.asyncio
+    async def test_memory_limit(self) -> None:
+        pool = _pool(memory_mb=64)
+        try:
+            with pytest.raises(SandboxLimitExceededError) as exc_info:
+                await pool.run("result = [0] * 100_000_000", {}, timeout=30)
+        finally:
+            await pool.aclose()
+
+        assert exc_info.value.limit == "memory"
+
+    @pytest.mark.asyncio
+    async def test_workers_recycled_after_max_executions(self) -> None:
+        pool = _pool(max_executions_per_worker=2)
+        try:
+            for _ in range(3):
+                await pool.run("result = 1", {}, timeout=5)
+        finally:
+            await pool.aclose()
+
+        assert pool.stats()["recycled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cpu_bound_snippet_does_not_block_loop(self) -> None:
+        pool = _pool(cpu_seconds=0)
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        try:
+            await pool.start()
+            task = asyncio.create_task(ticker())
+            await pool.run("result = sum(i * i for i in range(3_000_000))", {}, timeout=30)
+            task.cancel()
+        finally:
+            await pool.aclose()
+
+        assert ticks > 5
+
+
+class TestCodeCache:
+    def test_same_source_compiled_once(self) -> None:
+        cache = CodeCache(4)
+        first, cached_first = cache.compile("result = 1")
+        second, cached_second = cache.compile("result = 1")
+
+        assert first is second
+        assert (cached_first, cached_second) == (False, True)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = CodeCache(2)
+        cache.compile("a = 1")
+        cache.compile("b = 2")
+        cache.compile("a = 1")
+        cache.compile("c = 3")
+
+        assert len(cache) == 2
+        assert cache.compile("a = 1")[1] is True
+        assert cache.compile("b = 2")[1] is False
+
+    def test_syntax_errors_are_not_cached(self) -> None:
+        cache = CodeCache(2)
+        with pytest.raises(SyntaxError):
+            cache.compile("result =")
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_reuses_compiled_snippets(self) -> None:
+        pool = _pool()
+        try:
+            for i in range(3):
+                await pool.run("result = input['i']", {"input": {"i": i}}, timeout=5)
+        finally:
+            await pool.aclose()
+
+        assert pool.stats()["code_cache_hits"] == 2
+
+
+class TestInlineCodeSandbox:
+    @pytest.mark.asyncio
+    async def test_handler_returns_snippet_vars(self) -> None:
+        pool = _pool()
+        try:
+            handler = InlineCodeHandler(sandbox=pool)
+            context = {"input": {"v": 4}}
+            result = await handler.execute({"code": "doubled = input['v'] * 2\nresult = doubled"}, context)
+        finally:
+            await pool.aclose()
+
+        assert result == {"result": 8, "doubled": 8}
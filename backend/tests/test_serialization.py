@@ -0,0 +1,70 @@
+"""Tests for the orjson serialization layer."""
+
+from __future__ import annotations
+
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+
+from app.serialization import dumps, dumps_str, json_size, loads
+
+
+class TestDumps:
+    def test_round_trip(self) -> None:
+        value = {"a": [1, 2.5, None, True], "b": {"c": "é"}}
+        assert loads(dumps(value)) == value
+
+    def test_non_json_values(self) -> None:
+        when = datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC)
+        run_id = uuid.UUID(int=1)
+
+        assert loads(dumps({"when": when, "id": run_id, 1: object.__name__})) == {
+            "when": "2026-01-02T03:04:05+00:00",
+            "id": str(run_id),
+            "1": "object",
+        }
+
+    def test_sorted_keys(self) -> None:
+        assert dumps_str({"b": 1, "a": 2}, sort_keys=True) == '{"a":2,"b":1}'
+
+
+class TestJsonSize:
+    @pytest.mark.parametrize(
+        "value",
+        [
+            {},
+            [],
+            "plain",
+            'quote " and \\ backslash',
+            "tab\tnewline\n",
+            "ünïcode ✓",
+            {"nested": {"list": [1, -2, 3.25, None, False, True, "x"]}, 7: (1, 2)},
+            {"when": datetime(2026, 1, 1, tzinfo=UTC)},
+        ],
+    )
+    def test_matches_encoded_size(self, value: object) -> None:
+        assert json_size(value, limit=10_000) == len(dumps(value))
+        assert json_size(value) == len(dumps(value))
+
+    def test_stops_early_past_limit(self) -> None:
+        visited = 0
+
+        class CountingDict(dict):
+            def items(self):  # type: ignore[override]
+                nonlocal visited
+                visited += 1
+                return super().items()
+
+        big = [CountingDict(text="x" * 100) for _ in range(1000)]
+
+        assert json_size(big, limit=500) > 500
+        assert visited < 10
+
+    def test_cycles_exceed_limit(self) -> None:
+        cyclic: list = []
+        cyclic.append(cyclic)
+
+        assert json_size(cyclic, limit=1000) > 1000
+        with pytest.raises(TypeError):
+            json_size(cyclic)
@@ -1,13 +1,33 @@
 from __future__ import annotations
 
-from unittest.mock import AsyncMock, MagicMock, patch
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+from unittest.mock import AsyncMock, MagicMock
 
+import httpx
 import pytest
 
+from app.artifacts import LocalArtifactStore
+from app.config import HttpClientSettings, settings
+from app.http import HttpClientPool, HttpResponseCache
+from app.http.cache import CachedResponse
+from app.http.streaming import ResponseTooLargeError
 from app.steps.base import StepHandler
+from app.steps.database_query import DatabaseQueryHandler
 from app.steps.http_request import HttpRequestHandler
 from app.steps.inline_code import InlineCodeHandler
 from app.steps.llm_call import LLMCallHandler
+from app.steps.transform import TransformHandler
+from app.steps.webhook_batch import WebhookBatchHandler
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def _mock_pool(respond: Callable[[httpx.Request], httpx.Response]) -> HttpClientPool:
+    return HttpClientPool(transport=httpx.MockTransport(respond))
 
 
 class TestStepHandlerBase:
@@ -20,12 +40,25 @@ class TestStepHandlerBase:
         result = handler.validate_output(output)
         assert result == output
 
-    def test_validate_output_too_large(self):
-        """Test validate_output with output that's too large."""
+    def test_validate_output_too_large(self, tmp_path):
+        """Test validate_output moves oversized fields to the artifact store."""
+        handler = HttpRequestHandler()
+        store = LocalArtifactStore(root=tmp_path)
+        large_output = {"status_code": 200, "data": "x" * (handler.MAX_OUTPUT_SIZE + 1)}
+
+        result = handler.validate_output(large_output, artifacts=store)
+
+        assert result["status_code"] == 200
+        assert result["data"]["lazy"] is True
+        assert store.load_json(result["data"]) == large_output["data"]
+
+    def test_validate_output_not_serializable(self):
+        """Test validate_output rejects output that can't be stored."""
         handler = HttpRequestHandler()
-        large_output = {"data": "x" * (handler.MAX_OUTPUT_SIZE + 1)}
-        with pytest.raises(ValueError, match="Step output too large"):
-            handler.validate_output(large_output)
+        circular: dict = {}
+        circular["self"] = circular
+        with pytest.raises(ValueError, match="not JSON serializable"):
+            handler.validate_output(circular)
 
     def test_validate_output_within_limit(self):
         """Test validate_output with output within size limit."""
@@ -34,25 +67,32 @@ class TestStepHandlerBase:
         result = handler.validate_output(output)
         assert result == output
 
+    def test_http_request_coalesces_only_safe_methods(self):
+        """Only GET/HEAD requests may share an in-flight call."""
+        handler = HttpRequestHandler()
+        assert handler.can_coalesce({"url": "https://example.com"})
+        assert handler.can_coalesce({"url": "https://example.com", "method": "head"})
+        assert not handler.can_coalesce({"url": "https://example.com", "method": "POST"})
+
+    def test_handlers_reading_context_never_coalesce(self):
+        """Same config, different context: the outputs can differ."""
+        assert not TransformHandler().can_coalesce({"mapping": {"x": "{{input.x}}"}})
+        assert LLMCallHandler().can_coalesce({"prompt": "hi"})
+
 
 class TestHttpRequestHandler:
     """Test HTTP Request handler."""
 
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_http_get_request(self, mock_client_class):
+    async def test_http_get_request(self):
         """Test basic GET request."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.headers = {"content-type": "application/json"}
-        mock_response.json.return_value = {"message": "success"}
-        mock_response.raise_for_status = MagicMock()
+        seen: list[httpx.Request] = []
 
-        mock_client = AsyncMock()
-        mock_client.request = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        def respond(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(200, json={"message": "success"})
 
-        handler = HttpRequestHandler()
+        handler = HttpRequestHandler(http=_mock_pool(respond))
         config = {"url": "https://api.example.com/data", "method": "GET"}
         context = {}
 
@@ -60,25 +100,20 @@ class TestHttpRequestHandler:
 
         assert result["status_code"] == 200
         assert result["body"] == {"message": "success"}
-        mock_client.request.assert_called_once_with(
-            "GET", "https://api.example.com/data", headers={}, json=None
-        )
+        assert len(seen) == 1
+        assert seen[0].method == "GET"
+        assert str(seen[0].url) == "https://api.example.com/data"
 
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_http_post_request(self, mock_client_class):
+    async def test_http_post_request(self):
         """Test POST request with body."""
-        mock_response = MagicMock()
-        mock_response.status_code = 201
-        mock_response.headers = {"content-type": "text/plain"}
-        mock_response.text = "Created"
-        mock_response.raise_for_status = MagicMock()
+        seen: list[httpx.Request] = []
 
-        mock_client = AsyncMock()
-        mock_client.request.return_value = mock_response
-        mock_client_class.return_value.__aenter__.return_value = mock_client
+        def respond(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(201, text="Created", headers={"content-type": "text/plain"})
 
-        handler = HttpRequestHandler()
+        handler = HttpRequestHandler(http=_mock_pool(respond))
         config = {
             "url": "https://api.example.com/users",
             "method": "POST",
@@ -91,12 +126,406 @@ class TestHttpRequestHandler:
 
         assert result["status_code"] == 201
         assert result["body"] == "Created"
-        mock_client.request.assert_called_once_with(
-            "POST", "https://api.example.com/users",
-            headers={"Authorization": "Bearer token"},
-            json={"name": "John"}
+        assert seen[0].method == "POST"
+        assert seen[0].headers["Authorization"] == "Bearer token"
+        assert json.loads(seen[0].content) == {"name": "John"}
+
+    @pytest.mark.asyncio
+    async def test_requests_share_the_pool_client(self):
+        """Repeated executions reuse one pooled client instead of opening new ones."""
+        pool = _mock_pool(lambda request: httpx.Response(200, json={}))
+        handler = HttpRequestHandler(http=pool)
+
+        await handler.execute({"url": "https://api.example.com/a"}, {})
+        client = pool.client
+        await handler.execute({"url": "https://api.example.com/b"}, {})
+
+        assert pool.client is client
+        assert pool.stats()["hosts"]["api.example.com:443"]["requests"] == 2
+
+    @pytest.mark.asyncio
+    async def test_hedge_metadata_in_output(self):
+        """Hedged requests report what happened in the step output."""
+        pool = _mock_pool(lambda request: httpx.Response(200, json={}))
+        handler = HttpRequestHandler(http=pool)
+
+        plain = await handler.execute({"url": "https://api.example.com/a"}, {})
+        hedged = await handler.execute(
+            {"url": "https://api.example.com/a", "hedge": {"delay_ms": 500}}, {}
+        )
+
+        assert "hedge" not in plain
+        assert hedged["hedge"]["hedged"] is False
+        assert hedged["hedge"]["winner"] == "primary"
+
+
+class TestHttpResponseStreaming:
+    """Large HTTP responses are capped and can spill to the artifact store."""
+
+    @pytest.mark.asyncio
+    async def test_declared_oversize_aborts_early(self):
+        pool = _mock_pool(lambda request: httpx.Response(200, content=b"x" * 2048))
+        handler = HttpRequestHandler(http=pool)
+        with pytest.raises(ResponseTooLargeError):
+            await handler.execute(
+                {"url": "https://api.example.com/big", "max_response_bytes": 1024}, {}
+            )
+
+    @pytest.mark.asyncio
+    async def test_streamed_oversize_aborts(self):
+        async def chunks():
+            for _ in range(10):
+                yield b"x" * 512
+
+        pool = _mock_pool(lambda request: httpx.Response(200, content=chunks()))
+        handler = HttpRequestHandler(http=pool)
+        with pytest.raises(ResponseTooLargeError):
+            await handler.execute(
+                {"url": "https://api.example.com/big", "max_response_bytes": 1024}, {}
+            )
+        assert pool.stats()["hosts"]["api.example.com:443"]["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_large_body_spills_to_artifact(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings.http_client, "inline_response_bytes", 16)
+        payload = {"rows": list(range(100))}
+        pool = _mock_pool(lambda request: httpx.Response(200, json=payload))
+        store = LocalArtifactStore(root=tmp_path)
+        handler = HttpRequestHandler(http=pool, artifacts=store)
+
+        result = await handler.execute(
+            {"url": "https://api.example.com/rows", "spill_to_artifact": True}, {}
         )
 
+        ref = result["body_artifact"]
+        assert result["body"] is None
+        assert ref["uri"].startswith("artifact://")
+        assert ref["content_type"] == "application/json"
+        assert json.loads(store.read_bytes(ref["artifact_id"])) == payload
+        assert ref["size_bytes"] == len(store.read_bytes(ref["artifact_id"]))
+
+    @pytest.mark.asyncio
+    async def test_small_body_stays_inline(self, tmp_path):
+        pool = _mock_pool(lambda request: httpx.Response(200, json={"ok": True}))
+        store = LocalArtifactStore(root=tmp_path)
+        handler = HttpRequestHandler(http=pool, artifacts=store)
+
+        result = await handler.execute(
+            {"url": "https://api.example.com/ok", "spill_to_artifact": True}, {}
+        )
+
+        assert result["body"] == {"ok": True}
+        assert "body_artifact" not in result
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.asyncio
+    async def test_aborted_spill_leaves_no_partial_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings.http_client, "inline_response_bytes", 16)
+
+        async def chunks():
+            for _ in range(10):
+                yield b"x" * 512
+
+        pool = _mock_pool(lambda request: httpx.Response(200, content=chunks()))
+        store = LocalArtifactStore(root=tmp_path)
+        handler = HttpRequestHandler(http=pool, artifacts=store)
+        with pytest.raises(ResponseTooLargeError):
+            await handler.execute(
+                {
+                    "url": "https://api.example.com/big",
+                    "spill_to_artifact": True,
+                    "max_response_bytes": 2048,
+                },
+                {},
+            )
+        assert list(tmp_path.iterdir()) == []
+
+class TestHttpResponseCache:
+    """Opt-in response caching honours Cache-Control and validators."""
+
+    @staticmethod
+    def _handler(respond, **overrides):
+        seen: list[httpx.Request] = []
+
+        def record(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return respond(request)
+
+        cache = HttpResponseCache(config=HttpClientSettings(**overrides))
+        return HttpRequestHandler(http=_mock_pool(record), cache=cache), cache, seen
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_skips_network(self):
+        handler, cache, seen = self._handler(
+            lambda request: httpx.Response(
+                200, json={"price": 1}, headers={"Cache-Control": "max-age=60"}
+            )
+        )
+        config = {"url": "https://api.example.com/prices", "cache": True}
+
+        first = await handler.execute(config, {})
+        second = await handler.execute(config, {})
+
+        assert first["cache"] == {"status": "miss", "stored": True}
+        assert second["cache"]["status"] == "hit"
+        assert second["body"] == {"price": 1}
+        assert len(seen) == 1
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_etag_revalidation(self):
+        def respond(request: httpx.Request) -> httpx.Response:
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304, headers={"ETag": '"v1"'})
+            return httpx.Response(200, json={"v": 1}, headers={"ETag": '"v1"'})
+
+        handler, _, seen = self._handler(respond)
+        config = {"url": "https://api.example.com/config", "cache": True}
+
+        await handler.execute(config, {})
+        second = await handler.execute(config, {})
+
+        assert second["cache"]["status"] == "revalidated"
+        assert second["status_code"] == 200
+        assert second["body"] == {"v": 1}
+        assert seen[1].headers["If-None-Match"] == '"v1"'
+
+    @pytest.mark.asyncio
+    async def test_no_store_and_non_get_are_not_cached(self):
+        handler, cache, _seen = self._handler(
+            lambda request: httpx.Response(200, json={}, headers={"Cache-Control": "no-store"})
+        )
+        got = await handler.execute({"url": "https://api.example.com/a", "cache": True}, {})
+        posted = await handler.execute(
+            {"url": "https://api.example.com/a", "method": "POST", "cache": True}, {}
+        )
+
+        assert got["cache"] == {"status": "miss", "stored": False}
+        assert posted["cache"] == {"status": "bypass"}
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_step_ttl_applies_without_headers(self):
+        handler, _, seen = self._handler(lambda request: httpx.Response(200, text="ok"))
+        config = {"url": "https://api.example.com/a", "cache": {"ttl_seconds": 60}}
+        await handler.execute(config, {})
+        assert (await handler.execute(config, {}))["cache"]["status"] == "hit"
+        assert len(seen) == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_by_bytes(self):
+        cache = HttpResponseCache(config=HttpClientSettings(cache_max_bytes=10))
+        for name in ("a", "b", "c"):
+            await cache.put(name, CachedResponse(200, {}, b"12345", "utf-8", 60))
+        assert len(cache) == 2
+        assert await cache.get("a") is None
+        assert cache.stats()["bytes"] == 10
+
+    @pytest.mark.asyncio
+    async def test_shared_tier_fills_local(self):
+        class _DictShared:
+            def __init__(self) -> None:
+                self.data: dict = {}
+
+            async def get(self, key):
+                return self.data.get(key)
+
+            async def set(self, key, value):
+                self.data[key] = value
+
+            async def delete(self, key):
+                self.data.pop(key, None)
+
+        shared = _DictShared()
+        await HttpResponseCache(shared=shared).put("k", CachedResponse(200, {}, b"x", "utf-8", 60))
+        fresh = HttpResponseCache(shared=shared)
+        entry = await fresh.get("k")
+        assert entry is not None and entry.body == b"x"
+        assert len(fresh) == 1
+
+class TestWebhookBatchHandler:
+    """Test bulk webhook delivery."""
+
+    @pytest.mark.asyncio
+    async def test_delivers_to_every_target(self):
+        """String and object targets are posted with step defaults and overrides."""
+        seen: dict[str, httpx.Request] = {}
+
+        def respond(request: httpx.Request) -> httpx.Response:
+            seen[str(request.url)] = request
+            return httpx.Response(200, text="ok")
+
+        handler = WebhookBatchHandler(http=_mock_pool(respond))
+        config = {
+            "targets": [
+                "https://a.example.com/hook",
+                {"url": "https://b.example.com/hook", "payload": {"custom": True}, "secret": "s3"},
+            ],
+            "payload": {"event": "created"},
+            "concurrency": 2,
+        }
+        result = await handler.execute(config, {})
+
+        assert result["total"] == 2
+        assert result["delivered"] == 2
+        assert result["results"][0] == {"url": "https://a.example.com/hook", "attempts": 1, "status_code": 200}
+        assert json.loads(seen["https://a.example.com/hook"].content) == {"event": "created"}
+        assert json.loads(seen["https://b.example.com/hook"].content) == {"custom": True}
+        assert seen["https://b.example.com/hook"].headers["x-webhook-secret"] == "s3"
+
+    @pytest.mark.asyncio
+    async def test_retries_overload_but_not_client_errors(self):
+        """5xx and 429 are retried per target; other 4xx fail at once."""
+        attempts: dict[str, int] = {}
+
+        def respond(request: httpx.Request) -> httpx.Response:
+            host = request.url.host
+            attempts[host] = attempts.get(host, 0) + 1
+            if host == "flaky.example.com" and attempts[host] < 3:
+                return httpx.Response(503)
+            if host == "gone.example.com":
+                return httpx.Response(410)
+            return httpx.Response(204)
+
+        handler = WebhookBatchHandler(http=_mock_pool(respond))
+        config = {
+            "targets": ["https://flaky.example.com", "https://gone.example.com"],
+            "max_attempts": 3,
+            "backoff_seconds": 0,
+        }
+        result = await handler.execute(config, {})
+
+        flaky, gone = result["results"]
+        assert flaky == {"url": "https://flaky.example.com", "attempts": 3, "status_code": 204}
+        assert gone["attempts"] == 1
+        assert gone["error"] == "HTTP 410"
+        assert (result["delivered"], result["failed"]) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self):
+        """No more than ``concurrency`` deliveries are in flight at once."""
+        in_flight = 0
+        peak = 0
+
+        async def respond(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return httpx.Response(200)
+
+        handler = WebhookBatchHandler(http=_mock_pool(respond))
+        targets = [f"https://h{i}.example.com" for i in range(20)]
+        result = await handler.execute({"targets": targets, "concurrency": 4}, {})
+
+        assert result["delivered"] == 20
+        assert peak <= 4
+
+    @pytest.mark.asyncio
+    async def test_fail_on_error_raises_non_retriable(self):
+        """Failures raise only when asked to, and never trigger a step retry."""
+        from app.engine.exceptions import NonRetriableError
+
+        handler = WebhookBatchHandler(http=_mock_pool(lambda request: httpx.Response(400)))
+        config = {"targets": ["https://a.example.com"], "fail_on_error": True}
+        with pytest.raises(NonRetriableError, match="1 of 1"):
+            await handler.execute(config, {})
+
+    @pytest.mark.asyncio
+    async def test_invalid_url_fails_only_its_target(self):
+        """A target the client cannot even send to is reported, not raised."""
+        handler = WebhookBatchHandler(http=_mock_pool(lambda request: httpx.Response(200)))
+        targets = ["https://ok.example.com", "https://bad\x00.example.com"]
+        config = {"targets": targets, "max_attempts": 3}
+        result = await handler.execute(config, {})
+
+        assert result["delivered"] == 1
+        bad = result["results"][1]
+        assert bad["attempts"] == 1
+        assert bad["error"].startswith("InvalidURL")
+
+
+class _FakeCursor:
+    """The slice of asyncpg's cursor API the handler uses."""
+
+    def __init__(self, rows: list[dict]) -> None:
+        self._rows = rows
+
+    def __await__(self):
+        async def _self() -> _FakeCursor:
+            return self
+
+        return _self().__await__()
+
+    async def fetch(self, n: int) -> list[dict]:
+        return self._rows[:n]
+
+    async def __aiter__(self):
+        for row in self._rows:
+            yield row
+
+
+class _FakeStatement:
+    def __init__(self, rows: list[dict], columns: bool = True) -> None:
+        self.rows = rows
+        self.columns = columns
+
+    def get_attributes(self) -> tuple:
+        return ("col",) if self.columns else ()
+
+    def get_statusmsg(self) -> str:
+        return "UPDATE 3"
+
+    async def fetch(self, *args: object) -> list[dict]:
+        return []
+
+    def cursor(self, *args: object, prefetch: int | None = None) -> _FakeCursor:
+        return _FakeCursor(self.rows)
+
+
+class _FakeQueryPool:
+    def __init__(self, statement: _FakeStatement) -> None:
+        self.statement = statement
+
+    @asynccontextmanager
+    async def acquire(self):
+        conn = MagicMock()
+        conn.prepare = AsyncMock(return_value=self.statement)
+        conn.transaction = MagicMock(return_value=AsyncMock())
+        yield conn
+
+
+class TestDatabaseQueryHandler:
+    """Test database_query over the managed pool."""
+
+    @pytest.mark.asyncio
+    async def test_rows_capped_by_max_rows(self):
+        rows = [{"id": i} for i in range(5)]
+        handler = DatabaseQueryHandler(pool=_FakeQueryPool(_FakeStatement(rows)))
+        result = await handler.execute({"query": "SELECT id FROM t", "max_rows": 3}, {})
+
+        assert result == {"rows": rows[:3], "count": 3, "truncated": True}
+
+    @pytest.mark.asyncio
+    async def test_statement_without_rows_returns_status(self):
+        handler = DatabaseQueryHandler(pool=_FakeQueryPool(_FakeStatement([], columns=False)))
+        result = await handler.execute({"query": "UPDATE t SET x = 1", "params": []}, {})
+
+        assert result == {"rows": [], "count": 0, "status": "UPDATE 3"}
+
+    @pytest.mark.asyncio
+    async def test_stream_writes_ndjson_artifact(self, tmp_path):
+        rows = [{"id": i, "name": f"n{i}"} for i in range(4)]
+        store = LocalArtifactStore(tmp_path)
+        handler = DatabaseQueryHandler(pool=_FakeQueryPool(_FakeStatement(rows)), artifacts=store)
+        result = await handler.execute({"query": "SELECT * FROM t", "stream": True}, {})
+
+        assert result["rows"] is None
+        assert result["count"] == 4
+        lines = list(store.iter_lines(result["rows_artifact"]["artifact_id"]))
+        assert [json.loads(line) for line in lines] == rows
+
 
 class TestInlineCodeHandler:
     """Test Inline Code handler."""
@@ -110,9 +539,17 @@ class TestInlineCodeHandler:
 
         result = await handler.execute(config, context)
 
-        assert result["result"] == 10
-        assert "context" in result
-        assert "input" in result
+        assert result == {"result": 10}
+
+    def test_inline_code_context_keys(self):
+        """Only the context keys a snippet subscripts are sent to the sandbox."""
+        handler = InlineCodeHandler()
+
+        assert handler.context_keys({"code": "result = context['fetch']['n'] + input['x']"}) == {
+            "input",
+            "fetch",
+        }
+        assert handler.context_keys({"code": "result = len(context)"}) is None
 
     @pytest.mark.asyncio
     async def test_inline_code_missing_result(self):
@@ -155,23 +592,17 @@ class TestLLMCallHandler:
     """Test LLM Call handler."""
 
     @pytest.mark.asyncio
-    @patch("httpx.AsyncClient")
-    async def test_openai_llm_call(self, mock_client_class):
+    async def test_openai_llm_call(self):
         """Test OpenAI LLM call."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "choices": [{"message": {"content": "Hello, world!"}}],
-            "model": "gpt-4",
-            "usage": {"total_tokens": 10}
-        }
-        mock_response.raise_for_status = MagicMock()
-
-        mock_client = AsyncMock()
-        mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value.__aenter__.return_value = mock_client
-
-        handler = LLMCallHandler()
+        def respond(request: httpx.Request) -> httpx.Response:
+            assert request.url.host == "api.openai.com"
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": "Hello, world!"}}],
+                "model": "gpt-4",
+                "usage": {"total_tokens": 10}
+            })
+
+        handler = LLMCallHandler(http=_mock_pool(respond))
         config = {
             "provider": "openai",
             "model": "gpt-4",
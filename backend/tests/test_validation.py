@@ -1,7 +1,14 @@
 from __future__ import annotations
 
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
 import pytest
 
+from app.api import workflows as workflows_api
+from app.types.schemas import WorkflowPatch, WorkflowUpdate
+from app.validation.cache import ValidationCache, definition_hash
+from app.validation.incremental import IncrementalValidationState
 from app.validation.workflow import validate_workflow
 
 
@@ -187,3 +194,178 @@ class TestValidateWorkflow:
         result = validate_workflow(definition)
         ref_errors = [e for e in result.errors if "references" in e and "not an upstream" in e]
         assert ref_errors == []
+
+
+class TestValidationCache:
+    def _definition(self) -> dict:
+        return {"nodes": [_make_node("a"), _make_node("b")], "edges": [_make_edge("a", "b")]}
+
+    def test_hash_is_key_order_independent(self):
+        a = {"nodes": [{"id": "x", "type": "delay"}], "edges": []}
+        b = {"edges": [], "nodes": [{"type": "delay", "id": "x"}]}
+        assert definition_hash(a) == definition_hash(b)
+
+    def test_identical_content_validated_once(self):
+        cache = ValidationCache()
+        with patch(
+            "app.validation.cache.validate_workflow", side_effect=validate_workflow
+        ) as spy:
+            first = cache.validate(self._definition())
+            second = cache.validate(self._definition())
+        assert first.valid and second.valid
+        assert spy.call_count == 1
+
+    def test_cached_result_is_not_shared_mutable_state(self):
+        cache = ValidationCache()
+        first = cache.validate({"nodes": [], "edges": []})
+        first.errors.append("mutated")
+        second = cache.validate({"nodes": [], "edges": []})
+        assert "mutated" not in second.errors
+
+    def test_published_lookup_skips_hashing(self):
+        cache = ValidationCache()
+        definition = self._definition()
+        cache.mark_published("wf-1", 1, definition_hash(definition))
+        with patch("app.validation.cache.definition_hash") as hasher:
+            result = cache.validate_published("wf-1", 1, definition)
+        assert result.valid
+        hasher.assert_not_called()
+
+
+class TestIncrementalValidation:
+    def _ref_node(self, nid: str, ref: str) -> dict:
+        return {"id": nid, "type": "http_request", "data": {"config": {"url": f"{{{{{ref}.url}}}}"}}}
+
+    def _assert_matches_full(self, state: IncrementalValidationState) -> None:
+        full = validate_workflow({"nodes": list(state.nodes.values()), "edges": list(state.edges.values())})
+        result = state.result()
+        assert result.valid == full.valid
+        assert sorted(result.errors) == sorted(full.errors)
+
+    def test_seed_matches_full_validation(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), self._ref_node("b", "missing")],
+            "edges": [_make_edge("a", "b")],
+        })
+        self._assert_matches_full(state)
+        assert not state.result().valid
+
+    def test_added_edge_creating_cycle(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), _make_node("b"), _make_node("c")],
+            "edges": [_make_edge("a", "b"), _make_edge("b", "c")],
+        })
+        assert state.result().valid
+        state.apply(WorkflowPatch(added_edges=[_make_edge("c", "a")]))
+        assert "Workflow graph contains a cycle." in state.result().errors
+        self._assert_matches_full(state)
+
+        state.apply(WorkflowPatch(removed_edge_ids=["c-a"]))
+        assert state.result().valid
+
+    def test_config_change_only_rechecks_node(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), _make_node("b"), _make_node("c")],
+            "edges": [_make_edge("a", "b"), _make_edge("b", "c")],
+        })
+        rechecked = state.apply(WorkflowPatch(updated_nodes=[self._ref_node("b", "c")]))
+        assert rechecked == {"b"}
+        assert any("'c' which is not an upstream" in e for e in state.result().errors)
+        self._assert_matches_full(state)
+
+    def test_removing_edge_rechecks_descendants(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), _make_node("b"), self._ref_node("c", "a")],
+            "edges": [_make_edge("a", "b"), _make_edge("b", "c")],
+        })
+        assert state.result().valid
+        rechecked = state.apply(WorkflowPatch(
+            removed_edge_ids=["a-b"],
+            added_nodes=[_make_node("z")],
+            added_edges=[_make_edge("z", "b")],
+        ))
+        assert "c" in rechecked
+        self._assert_matches_full(state)
+        assert any("'a' which is not an upstream" in e for e in state.result().errors)
+
+    def test_removing_node_drops_connected_edges(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), _make_node("b"), self._ref_node("c", "b")],
+            "edges": [_make_edge("a", "b"), _make_edge("b", "c")],
+        })
+        state.apply(WorkflowPatch(removed_node_ids=["b"], added_edges=[_make_edge("a", "c")]))
+        assert set(state.edges) == {"a-c"}
+        self._assert_matches_full(state)
+
+    def test_dangling_edge_resolved_by_later_node(self):
+        state = IncrementalValidationState({"nodes": [_make_node("a")], "edges": []})
+        state.apply(WorkflowPatch(added_edges=[_make_edge("a", "b")]))
+        assert any("does not exist" in e for e in state.result().errors)
+        state.apply(WorkflowPatch(added_nodes=[_make_node("b")]))
+        assert state.result().valid
+
+    def test_resent_edge_id_breaks_old_cycle(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), _make_node("b"), _make_node("c")],
+            "edges": [
+                _make_edge("a", "b"),
+                {"id": "e1", "source": "b", "target": "a"},
+                _make_edge("b", "c"),
+            ],
+        })
+        assert "Workflow graph contains a cycle." in state.result().errors
+        state.apply(WorkflowPatch(added_edges=[{"id": "e1", "source": "a", "target": "c"}]))
+        assert state.result().valid, state.result().errors
+        self._assert_matches_full(state)
+
+    def test_resent_edge_id_rechecks_old_target(self):
+        state = IncrementalValidationState({
+            "nodes": [_make_node("a"), self._ref_node("b", "a"), _make_node("c")],
+            "edges": [{"id": "e0", "source": "a", "target": "b"}, _make_edge("b", "c")],
+        })
+        assert state.result().valid
+        rechecked = state.apply(
+            WorkflowPatch(added_edges=[{"id": "e0", "source": "a", "target": "c"}])
+        )
+        assert "b" in rechecked
+        assert any("'a' which is not an upstream" in e for e in state.result().errors)
+        self._assert_matches_full(state)
+
+    def test_removing_node_drops_its_dangling_edges(self):
+        state = IncrementalValidationState({"nodes": [_make_node("a")], "edges": []})
+        state.apply(WorkflowPatch(added_edges=[_make_edge("a", "b")]))
+        state.apply(WorkflowPatch(removed_node_ids=["a"], added_nodes=[_make_node("z")]))
+        assert state.edges == {}
+        self._assert_matches_full(state)
+
+    def test_state_hash_changes_per_patch(self):
+        state = IncrementalValidationState({"nodes": [_make_node("a")], "edges": []})
+        before = state.state_hash
+        state.apply(WorkflowPatch(updated_nodes=[_make_node("a", "delay")]))
+        assert state.state_hash != before
+
+
+class TestIncrementalValidationEndpoints:
+    async def test_patch_after_put_validates_new_definition(self):
+        old = {"nodes": [_make_node("a"), _make_node("b")], "edges": [_make_edge("a", "b")]}
+        new = {"nodes": [_make_node("a"), _make_node("c")], "edges": [_make_edge("a", "c")]}
+        stored = SimpleNamespace(status="draft", definition=old)
+
+        async def update_workflow(workflow_id: str, **fields: object) -> SimpleNamespace:
+            stored.definition = fields["definition"]
+            return stored
+
+        wf_core = SimpleNamespace(
+            get_workflow=AsyncMock(return_value=stored),
+            update_workflow=AsyncMock(side_effect=update_workflow),
+        )
+        with patch.object(workflows_api, "wf_core", wf_core):
+            await workflows_api.validate_workflow_endpoint("wf-put")
+            await workflows_api.update_workflow_endpoint("wf-put", WorkflowUpdate(definition=new))
+            result = await workflows_api.validate_workflow_patch_endpoint(
+                "wf-put",
+                WorkflowPatch(added_nodes=[_make_node("d")], added_edges=[_make_edge("c", "d")]),
+            )
+
+        # Applied to the state seeded before the PUT, the edge would dangle from a missing "c".
+        assert result.valid, result.errors
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from app.db.custom.cache import WorkflowDefinitionCache
+
+
+class _Workflow:
+    def __init__(self, wid: str, status: str = "published", version: int = 1) -> None:
+        self.id = wid
+        self.status = status
+        self.version = version
+
+
+class _DictShared:
+    def __init__(self) -> None:
+        self.data: dict[str, Any] = {}
+
+    async def get(self, key: str) -> Any | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        self.data[key] = value
+
+    async def delete(self, key: str) -> None:
+        self.data.pop(key, None)
+
+
+class TestWorkflowDefinitionCache:
+    @pytest.mark.asyncio
+    async def test_published_workflow_is_cached(self):
+        cache = WorkflowDefinitionCache()
+        wf = _Workflow("a")
+        await cache.put(wf)
+        assert await cache.get("a") is wf
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_drafts_are_not_cached(self):
+        cache = WorkflowDefinitionCache()
+        await cache.put(_Workflow("a", status="draft"))
+        assert await cache.get("a") is None
+        assert len(cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_new_version_replaces_old(self):
+        cache = WorkflowDefinitionCache()
+        await cache.put(_Workflow("a", version=1))
+        v2 = _Workflow("a", version=2)
+        await cache.put(v2)
+        assert await cache.get("a") is v2
+        assert len(cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        cache = WorkflowDefinitionCache(max_entries=2)
+        await cache.put(_Workflow("a"))
+        await cache.put(_Workflow("b"))
+        await cache.get("a")  # touch a so b is least recently used
+        await cache.put(_Workflow("c"))
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self):
+        cache = WorkflowDefinitionCache()
+        await cache.put(_Workflow("a"))
+        await cache.invalidate("a")
+        assert await cache.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_shared_tier_fills_local(self):
+        shared = _DictShared()
+        wf = _Workflow("a", version=3)
+        await WorkflowDefinitionCache(shared=shared).put(wf)
+
+        fresh = WorkflowDefinitionCache(shared=shared)
+        assert await fresh.get("a") is wf
+        assert "a" in fresh
+
+        await fresh.invalidate("a")
+        assert shared.data == {}
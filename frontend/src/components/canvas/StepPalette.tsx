@@ -11,6 +11,7 @@ const STEP_TYPES: { type: StepType; label: string; color: string }[] = [
   { type: "wait_for_event", label: "Wait for Event", color: "bg-pink-600" },
   { type: "send_email", label: "Send Email", color: "bg-teal-600" },
   { type: "webhook", label: "Webhook", color: "bg-indigo-600" },
+  { type: "webhook_batch", label: "Webhook Batch", color: "bg-indigo-700" },
   { type: "delay", label: "Delay", color: "bg-slate-600" },
   { type: "for_each", label: "For Each", color: "bg-emerald-600" },
 ];
@@ -9,6 +9,7 @@ export type StepType =
   | "wait_for_event"
   | "send_email"
   | "webhook"
+  | "webhook_batch"
   | "delay"
   | "for_each";
 